@@ -0,0 +1,5 @@
+import time
+
+# main imports the package before its heavy dependencies, so /ready reports
+# the whole cold start
+startup_started = time.perf_counter()
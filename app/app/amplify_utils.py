@@ -0,0 +1,303 @@
+import logging
+
+import time
+from typing import Dict, List
+
+import sqlalchemy
+from sqlalchemy import Column, Connection, Engine, Table
+
+from app.config import Settings
+from app.logging_utils import span
+
+logger = logging.getLogger(__name__)
+
+SOURCE_TABLE = "_amplify_source"
+ROW_NUMBER_COLUMN = "_amplify_rn"
+INTEGER_LIMITS = [
+    (sqlalchemy.types.SmallInteger, 2**15 - 1),
+    (sqlalchemy.types.BigInteger, 2**63 - 1),
+    (sqlalchemy.types.Integer, 2**31 - 1),
+]
+
+
+def is_generated_key(column: Column) -> bool:
+    # serial and identity keys are left to the database, like in generate_values
+    return (
+        column.primary_key
+        and isinstance(column.type, sqlalchemy.types.Integer)
+        and (column.server_default is not None or column.identity is not None)
+    )
+
+
+def get_key_columns(table: Table, unique_columns: List[str]) -> List[Column]:
+    # a shifted foreign key would point at rows that do not exist, and an
+    # unshifted one would repeat the unique values
+    for name in unique_columns:
+        column = table.columns.get(name)
+        if column is not None and column.foreign_keys:
+            raise ValueError(
+                "Unique column {} is a foreign key and cannot be amplified".format(name)
+            )
+    primary_key = [
+        column for column in table.primary_key.columns if not is_generated_key(column)
+    ]
+    if primary_key and all(column.foreign_keys for column in primary_key):
+        raise ValueError(
+            "Primary key of table {} consists of foreign keys and cannot be "
+            "amplified".format(table.name)
+        )
+
+    return [
+        column
+        for column in table.columns
+        if (column.primary_key or column.name in unique_columns)
+        and not is_generated_key(column)
+        and not column.foreign_keys
+    ]
+
+
+def get_integer_limit(column_type: sqlalchemy.types.TypeEngine) -> int | None:
+    for type_class, limit in INTEGER_LIMITS:
+        if isinstance(column_type, type_class):
+            return limit
+    return None
+
+
+def get_key_expression(
+    column: Column, name: str, type_name: str, bounds: Dict, factor: int
+) -> str:
+    # every copy is shifted by the width of the original key range, so the
+    # copies never overlap each other or the source rows
+    if bounds["min"] is None:
+        return name
+
+    if isinstance(column.type, (sqlalchemy.types.Integer, sqlalchemy.types.Numeric)):
+        width = bounds["max"] - bounds["min"] + 1
+        limit = get_integer_limit(column.type)
+        if limit is not None and bounds["max"] + width * (factor - 1) > limit:
+            raise ValueError(
+                "Column {} would overflow {} after {} copies".format(
+                    column.name, type_name, factor - 1
+                )
+            )
+        return "{} + copy_number * {}".format(name, width)
+
+    if isinstance(column.type, (sqlalchemy.types.Date, sqlalchemy.types.DateTime)):
+        days = (bounds["max"] - bounds["min"]).days + 1
+        return "CAST({} + copy_number * {} * INTERVAL '1 day' AS {})".format(
+            name, days, type_name
+        )
+
+    if isinstance(column.type, sqlalchemy.types.String):
+        length = getattr(column.type, "length", None)
+        if length is not None and bounds["length"] + len(str(factor)) + 1 > length:
+            raise ValueError(
+                "Column {} is too short to append a copy number".format(column.name)
+            )
+        return "{} || '_' || copy_number".format(name)
+
+    raise ValueError(
+        "Unique column {} of type {} cannot be amplified".format(column.name, type_name)
+    )
+
+
+def get_perturbed_expression(
+    column: Column, name: str, type_name: str, settings: Settings
+) -> str:
+    if column.foreign_keys:
+        return name
+
+    jitter = "(random() * 2 - 1)"
+    if isinstance(column.type, sqlalchemy.types.Integer):
+        return "CAST(round({} * (1 + {} * {})) AS {})".format(
+            name, jitter, settings.amplify_perturb_ratio, type_name
+        )
+    if isinstance(column.type, (sqlalchemy.types.Float, sqlalchemy.types.Numeric)):
+        return "CAST({} * (1 + {} * {}) AS {})".format(
+            name, jitter, settings.amplify_perturb_ratio, type_name
+        )
+    if isinstance(column.type, (sqlalchemy.types.Date, sqlalchemy.types.DateTime)):
+        return "CAST({} + round({} * {}) * INTERVAL '1 day' AS {})".format(
+            name, jitter, settings.amplify_perturb_days, type_name
+        )
+    return name
+
+
+def get_key_bounds(conn: Connection, columns: List[Column]) -> Dict[str, Dict]:
+    if len(columns) == 0:
+        return {}
+
+    preparer = conn.dialect.identifier_preparer
+    selects = []
+    for column in columns:
+        name = preparer.quote(column.name)
+        length = (
+            "max(length({}))".format(name)
+            if isinstance(column.type, sqlalchemy.types.String)
+            else "NULL"
+        )
+        selects.append("min({0}), max({0}), {1}".format(name, length))
+
+    row = conn.execute(
+        sqlalchemy.text(
+            "SELECT {} FROM {}".format(", ".join(selects), preparer.quote(SOURCE_TABLE))
+        )
+    ).first()
+    assert row is not None
+    return {
+        column.name: {
+            "min": row[i * 3],
+            "max": row[i * 3 + 1],
+            "length": row[i * 3 + 2],
+        }
+        for i, column in enumerate(columns)
+    }
+
+
+def get_amplify_statement(
+    conn: Connection,
+    table: Table,
+    factor: int,
+    unique_columns: List[str],
+    settings: Settings,
+    perturb: bool,
+) -> sqlalchemy.TextClause:
+    preparer = conn.dialect.identifier_preparer
+    key_columns = get_key_columns(table, unique_columns)
+    bounds = get_key_bounds(conn, key_columns)
+
+    names = []
+    expressions = []
+    for column in table.columns:
+        if is_generated_key(column):
+            continue
+        name = preparer.quote(column.name)
+        type_name = column.type.compile(dialect=conn.dialect)
+        names.append(name)
+        if column.name in bounds:
+            expressions.append(
+                get_key_expression(column, name, type_name, bounds[column.name], factor)
+            )
+        elif perturb:
+            expressions.append(
+                get_perturbed_expression(column, name, type_name, settings)
+            )
+        else:
+            expressions.append(name)
+
+    return sqlalchemy.text(
+        "INSERT INTO {} ({}) SELECT {} FROM {} CROSS JOIN "
+        "generate_series(:first_copy, :last_copy) AS copies(copy_number) "
+        "WHERE {} >= :first_row AND {} < :last_row".format(
+            preparer.format_table(table),
+            ", ".join(names),
+            ", ".join(expressions),
+            preparer.quote(SOURCE_TABLE),
+            ROW_NUMBER_COLUMN,
+            ROW_NUMBER_COLUMN,
+        )
+    )
+
+
+def get_batches(source_rows: int, copies: int, batch_rows: int) -> List[Dict]:
+    # small tables are multiplied several copies at a time, large ones are
+    # split into row ranges of one copy
+    batches = []
+    if source_rows <= batch_rows:
+        step = max(1, batch_rows // source_rows)
+        for first_copy in range(1, copies + 1, step):
+            batches.append(
+                {
+                    "first_copy": first_copy,
+                    "last_copy": min(first_copy + step - 1, copies),
+                    "first_row": 0,
+                    "last_row": source_rows,
+                }
+            )
+        return batches
+
+    for copy in range(1, copies + 1):
+        for first_row in range(0, source_rows, batch_rows):
+            batches.append(
+                {
+                    "first_copy": copy,
+                    "last_copy": copy,
+                    "first_row": first_row,
+                    "last_row": min(first_row + batch_rows, source_rows),
+                }
+            )
+    return batches
+
+
+def amplify_table(
+    table: Table,
+    engine: Engine,
+    factor: int,
+    unique_columns: List[str],
+    settings: Settings,
+    perturb: bool = False,
+) -> Dict:
+    logger.info("Amplifying table {} {} times".format(table.name, factor))
+
+    preparer = engine.dialect.identifier_preparer
+    started = time.perf_counter()
+    with engine.connect() as conn:
+        # the copies are read from a numbered snapshot, so every batch sees
+        # the original rows only
+        conn.execute(
+            sqlalchemy.text(
+                "CREATE TEMPORARY TABLE {} ON COMMIT PRESERVE ROWS AS "
+                "SELECT *, row_number() OVER () - 1 AS {} FROM {}".format(
+                    preparer.quote(SOURCE_TABLE),
+                    ROW_NUMBER_COLUMN,
+                    preparer.format_table(table),
+                )
+            )
+        )
+        conn.execute(
+            sqlalchemy.text(
+                "CREATE INDEX ON {} ({})".format(
+                    preparer.quote(SOURCE_TABLE), ROW_NUMBER_COLUMN
+                )
+            )
+        )
+        try:
+            source_rows = conn.execute(
+                sqlalchemy.text(
+                    "SELECT count(*) FROM {}".format(preparer.quote(SOURCE_TABLE))
+                )
+            ).scalar_one()
+            if source_rows == 0:
+                raise ValueError("Table {} is empty".format(table.name))
+
+            statement = get_amplify_statement(
+                conn, table, factor, unique_columns, settings, perturb
+            )
+            conn.commit()
+
+            batches = get_batches(source_rows, factor - 1, settings.amplify_batch_rows)
+            for batch in batches:
+                rows = (batch["last_copy"] - batch["first_copy"] + 1) * (
+                    batch["last_row"] - batch["first_row"]
+                )
+                with span("amplify_batch", table=table.name, rows=rows):
+                    conn.execute(statement, batch)
+                    conn.commit()
+        except Exception as e:
+            logger.error("Error amplifying table {}: {}".format(table.name, e))
+            conn.rollback()
+            raise e
+        finally:
+            conn.execute(
+                sqlalchemy.text(
+                    "DROP TABLE IF EXISTS {}".format(preparer.quote(SOURCE_TABLE))
+                )
+            )
+            conn.commit()
+
+    return {
+        "source_rows": source_rows,
+        "rows_inserted": source_rows * (factor - 1),
+        "batches": len(batches),
+        "elapsed_seconds": round(time.perf_counter() - started, 3),
+    }
@@ -0,0 +1,93 @@
+import logging
+
+import sys
+from typing import Dict, List
+
+from prometheus_client import Counter, Gauge, Histogram
+
+from app.config import Settings
+
+logger = logging.getLogger(__name__)
+
+ROW_WIDTH_SAMPLE = 50
+# new measurements weigh half, so one slow commit does not halve the batch
+SMOOTHING = 0.5
+MAX_STEP = 2
+
+batch_size_rows = Gauge(
+    "datagen_batch_size_rows", "Batch size chosen for the next insert", ["table"]
+)
+batch_row_bytes = Gauge(
+    "datagen_batch_row_bytes", "Measured in-memory width of a generated row", ["table"]
+)
+batch_insert_seconds = Histogram(
+    "datagen_batch_insert_seconds", "Insert and commit time of one batch", ["table"]
+)
+rows_inserted_total = Counter(
+    "datagen_rows_inserted", "Rows inserted by generation jobs", ["table"]
+)
+
+
+def measure_row_bytes(rows: List[Dict]) -> float:
+    sample = rows[:ROW_WIDTH_SAMPLE]
+    if len(sample) == 0:
+        return 0
+    total = sum(
+        sys.getsizeof(row) + sum(sys.getsizeof(value) for value in row.values())
+        for row in sample
+    )
+    return total / len(sample)
+
+
+class AdaptiveBatcher:
+    def __init__(self, name: str, initial_size: int, settings: Settings):
+        self.name = name
+        self.target_seconds = settings.batch_target_seconds
+        self.memory_bytes = settings.batch_memory_bytes
+        # an explicitly small starting size is kept reachable
+        self.min_size = min(settings.min_batch_size, initial_size)
+        self.max_size = settings.max_batch_size
+        self.size = max(self.min_size, min(initial_size, self.max_size))
+        self.row_seconds: float | None = None
+        self.row_bytes: float | None = None
+
+        batch_size_rows.labels(name).set(self.size)
+
+    def smooth(self, previous: float | None, value: float) -> float:
+        if previous is None:
+            return value
+        return previous * (1 - SMOOTHING) + value * SMOOTHING
+
+    def observe(self, rows: List[Dict], seconds: float) -> int:
+        if len(rows) == 0:
+            return self.size
+
+        row_bytes = measure_row_bytes(rows)
+        self.row_seconds = self.smooth(self.row_seconds, seconds / len(rows))
+        self.row_bytes = self.smooth(self.row_bytes, row_bytes)
+        batch_insert_seconds.labels(self.name).observe(seconds)
+        batch_row_bytes.labels(self.name).set(self.row_bytes)
+        rows_inserted_total.labels(self.name).inc(len(rows))
+
+        wanted = self.target_seconds / max(self.row_seconds, 1e-9)
+        # step gradually, the latency of a batch is not linear in its size
+        wanted = max(self.size / MAX_STEP, min(wanted, self.size * MAX_STEP))
+        # the memory budget is a hard limit
+        if self.row_bytes > 0:
+            wanted = min(wanted, self.memory_bytes / self.row_bytes)
+        size = int(max(self.min_size, min(wanted, self.max_size)))
+
+        if size != self.size:
+            logger.info(
+                "Batch size for %s changed from %d to %d (%.3fs per batch, %.0f bytes per row)",
+                self.name,
+                self.size,
+                size,
+                seconds,
+                self.row_bytes,
+                extra={"table": self.name, "batch_size": size},
+            )
+            self.size = size
+            batch_size_rows.labels(self.name).set(size)
+
+        return self.size
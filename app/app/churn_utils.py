@@ -0,0 +1,287 @@
+import asyncio
+import logging
+
+import random
+import time
+from collections import defaultdict
+from typing import Dict, List
+
+import sqlalchemy
+from sqlalchemy import Column, Table
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.config import Settings
+from app.data_content_utils import (
+    generate_single_value,
+    generate_values,
+    get_faker,
+    get_unique_counters,
+)
+from app.models import ChurnPayload
+from app.workload_utils import summarize_latencies
+
+logger = logging.getLogger(__name__)
+
+OPERATIONS = ["update", "delete", "insert"]
+UPDATABLE_TYPES = (
+    sqlalchemy.types.Integer,
+    sqlalchemy.types.Float,
+    sqlalchemy.types.String,
+    sqlalchemy.types.Date,
+)
+
+
+def get_churn_key(table: Table) -> Column:
+    key_columns = list(table.primary_key.columns)
+    if len(key_columns) != 1 or not isinstance(
+        key_columns[0].type, sqlalchemy.types.Integer
+    ):
+        raise ValueError(
+            "Table {} needs a single integer primary key for churn".format(table.name)
+        )
+    return key_columns[0]
+
+
+def has_generated_key(key: Column) -> bool:
+    # reflected serial keys default to nextval(), identity keys have an identity
+    return key.server_default is not None or key.identity is not None
+
+
+def get_update_column(table: Table, unique_columns: List[str]) -> Column:
+    for column in table.columns:
+        if (
+            not column.primary_key
+            and column.name not in unique_columns
+            and not column.foreign_keys
+            and isinstance(column.type, UPDATABLE_TYPES)
+        ):
+            return column
+    # rewriting the key still leaves a dead tuple behind
+    return get_churn_key(table)
+
+
+def pick_key(low: int, high: int, hot_ratio: float, hot_share: float) -> int:
+    # the hot rows are the start of the key range, they take hot_share of
+    # the traffic, so their pages collect dead tuples fastest
+    hot_high = low + max(0, int((high - low + 1) * hot_ratio) - 1)
+    if random.random() < hot_share:
+        return random.randint(low, hot_high)
+    return random.randint(low, high)
+
+
+async def get_churn_target(
+    table: Table, unique_columns: List[str], engine: AsyncEngine, settings: Settings
+) -> Dict:
+    key = get_churn_key(table)
+    statement = sqlalchemy.select(
+        sqlalchemy.func.min(key), sqlalchemy.func.max(key), sqlalchemy.func.count()
+    ).select_from(table)
+    async with engine.connect() as conn:
+        low, high, row_count = (await conn.execute(statement)).one()
+    if row_count == 0:
+        raise ValueError("Table {} is empty".format(table.name))
+
+    update_column = get_update_column(table, unique_columns)
+    return {
+        "table": table,
+        "key": key,
+        "low": low,
+        "high": high,
+        # keys the database does not generate are counted on from the highest
+        "next_key": None if has_generated_key(key) else high + 1,
+        "unique_columns": unique_columns,
+        "update_column": update_column,
+        # new rows continue after the generated unique values
+        "counters": get_unique_counters(
+            table.columns, unique_columns, settings, row_count
+        ),
+        "statements": {
+            "update": sqlalchemy.update(table)
+            .where(key == sqlalchemy.bindparam("key"))
+            .values({update_column.name: sqlalchemy.bindparam("value")}),
+            "delete": sqlalchemy.delete(table).where(
+                key == sqlalchemy.bindparam("key")
+            ),
+            # recycled unique values are skipped, not retried; the new key
+            # widens the range the updates and deletes pick from
+            "insert": insert(table).on_conflict_do_nothing().returning(key),
+        },
+    }
+
+
+def has_text_columns(targets: List[Dict]) -> bool:
+    return any(
+        isinstance(column.type, sqlalchemy.types.Text)
+        for target in targets
+        for column in target["table"].columns
+    )
+
+
+class ChurnWorkload:
+    def __init__(
+        self,
+        engine: AsyncEngine,
+        payload: ChurnPayload,
+        targets: List[Dict],
+        settings: Settings,
+    ):
+        self.engine = engine
+        self.payload = payload
+        self.targets = targets
+        self.settings = settings
+        self.fake = get_faker()
+        self.weights = [
+            payload.update_weight,
+            payload.delete_weight,
+            payload.insert_weight,
+        ]
+        self.stop_event = asyncio.Event()
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.error_messages: Dict[str, str] = {}
+        self.rows_affected: Dict[str, int] = defaultdict(int)
+        self.started: float | None = None
+        self.result: Dict | None = None
+        self.error: str | None = None
+
+    @property
+    def running(self) -> bool:
+        # from its registration, so a second start is refused before this
+        # one's task gets to run
+        return self.result is None and self.error is None
+
+    def stop(self):
+        self.stop_event.set()
+
+    def get_params(self, target: Dict, operation: str) -> Dict:
+        if operation == "insert":
+            row = generate_values(
+                target["table"].columns,
+                self.fake,
+                1,
+                self.settings,
+                target["unique_columns"],
+                target["counters"],
+            )[0]
+            if target["next_key"] is not None:
+                row[target["key"].name] = target["next_key"]
+                target["next_key"] += 1
+            return row
+
+        key = pick_key(
+            target["low"],
+            target["high"],
+            self.payload.hot_ratio,
+            self.payload.hot_share,
+        )
+        if operation == "delete":
+            return {"key": key}
+
+        column = target["update_column"]
+        value = (
+            key
+            if column.primary_key
+            else generate_single_value(column, self.fake, self.settings)
+        )
+        return {"key": key, "value": value}
+
+    async def execute(self, target: Dict, operation: str) -> int:
+        params = self.get_params(target, operation)
+        async with self.engine.begin() as conn:
+            result = await conn.execute(target["statements"][operation], params)
+            if operation != "insert":
+                return result.rowcount
+            key = result.scalar_one_or_none()
+        if key is None:
+            return 0
+        target["high"] = max(target["high"], key)
+        return 1
+
+    async def run_client(self, deadline: float, interval: float | None):
+        next_start = time.perf_counter() + random.uniform(0, interval or 0)
+
+        while not self.stop_event.is_set() and time.perf_counter() < deadline:
+            if interval is not None:
+                delay = next_start - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                next_start += interval
+
+            operation = random.choices(OPERATIONS, weights=self.weights)[0]
+            target = random.choice(self.targets)
+            started = time.perf_counter()
+            try:
+                self.rows_affected[operation] += await self.execute(target, operation)
+                self.latencies[operation].append((time.perf_counter() - started) * 1000)
+            except Exception as e:
+                self.errors[operation] += 1
+                self.error_messages[operation] = str(e).splitlines()[0]
+
+    def summarize(self) -> Dict:
+        duration_seconds = time.perf_counter() - (self.started or time.perf_counter())
+        all_latencies = [
+            value for values in self.latencies.values() for value in values
+        ]
+        summary = summarize_latencies(
+            all_latencies, sum(self.errors.values()), duration_seconds
+        )
+        summary["duration_seconds"] = round(duration_seconds, 3)
+        summary["operations"] = {}
+        for operation in OPERATIONS:
+            summary["operations"][operation] = {
+                **summarize_latencies(
+                    self.latencies[operation],
+                    self.errors[operation],
+                    duration_seconds,
+                ),
+                "rows_affected": self.rows_affected[operation],
+            }
+            if operation in self.error_messages:
+                summary["operations"][operation]["last_error"] = self.error_messages[
+                    operation
+                ]
+        return summary
+
+    def get_status(self) -> Dict:
+        if not self.running:
+            status: Dict = {"name": self.payload.name, "running": False}
+            if self.result is not None:
+                status["result"] = self.result
+            if self.error is not None:
+                status["error"] = self.error
+            return status
+        return {
+            "name": self.payload.name,
+            "running": self.running,
+            "transactions": sum(len(values) for values in self.latencies.values()),
+            "errors": sum(self.errors.values()),
+        }
+
+    async def run(self) -> Dict:
+        logger.info(
+            "Running churn {} on {} at {} tps".format(
+                self.payload.name,
+                ", ".join(target["table"].name for target in self.targets),
+                self.payload.target_rate,
+            )
+        )
+
+        interval = (
+            self.payload.clients / self.payload.target_rate
+            if self.payload.target_rate
+            else None
+        )
+        self.started = time.perf_counter()
+        deadline = self.started + self.payload.duration_seconds
+        await asyncio.gather(
+            *[self.run_client(deadline, interval) for _ in range(self.payload.clients)]
+        )
+        self.result = self.summarize()
+
+        logger.info(
+            "Churn {} finished: {} transactions, {} errors".format(
+                self.payload.name, self.result["transactions"], self.result["errors"]
+            )
+        )
+        return self.result
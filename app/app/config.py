@@ -1,7 +1,18 @@
 from datetime import datetime
+from typing import List
 
 from pydantic_settings import BaseSettings, SettingsConfigDict
-from pydantic import Field
+from pydantic import BaseModel, Field
+
+
+class DbTarget(BaseModel):
+    # unset connection fields fall back to the primary database settings
+    name: str
+    host: str
+    port: int = 5432
+    db_name: str | None = None
+    user: str | None = None
+    password: str | None = None
 
 
 class Settings(BaseSettings):
@@ -10,6 +21,14 @@ class Settings(BaseSettings):
     db_name: str = Field(alias="POSTGRES_DB")
     db_user: str = Field(alias="POSTGRES_USER")
     db_password: str = Field(alias="POSTGRES_PASSWORD")
+    db_connect_retries: int = 10
+    db_connect_backoff: float = 0.5
+    db_connect_max_backoff: float = 10
+    ready_timeout: float = 2
+    db_targets: List[DbTarget] = []
+
+    log_level: str = "INFO"
+    log_format: str = "json"
 
     null_probability: float = 0.1
     min_int: int = 0
@@ -20,9 +39,55 @@ class Settings(BaseSettings):
     string_length: int = 255
     text_min_word_count: int = 2
     text_max_word_count: int = 30
+    text_corpus_size: int = 2_000_000
+    text_corpus_file: str | None = None
+    text_corpus_markov: bool = False
+    text_markov_sentences: int = 5_000
     min_date: datetime = datetime(2000, 1, 1)
+    max_date: datetime = datetime(2025, 1, 1)
+    seed: int | None = None
 
     batch_size: int = 10_000
+    adaptive_batching: bool = True
+    batch_target_seconds: float = 1.0
+    batch_memory_bytes: int = 64 * 1024**2
+    min_batch_size: int = 100
+    max_batch_size: int = 100_000
+    generation_workers: int = 4
+    partition_load_concurrency: int = 4
+    maintenance_concurrency: int = 4
+    index_build_concurrency: int = 4
+
+    throttle_probe_interval: float = 1.0
+    throttle_probe_sql: str = "SELECT 1"
+    throttle_max_replication_lag_bytes: int = 64 * 1024**2
+    throttle_max_checkpoint_ratio: float = 0.8
+    throttle_max_probe_ms: float = 50
+    throttle_backoff_seconds: float = 0.5
+    throttle_max_backoff_seconds: float = 10
+
+    scale_factor_rows: int = 100_000
+    size_sample_rows: int = 1_000
+
+    estimate_sample_rows: int = 10_000
+    estimate_max_seconds: float | None = None
+    estimate_max_wal_bytes: int | None = None
+    estimate_max_total_bytes: int | None = None
+    estimate_enforce_limits: bool = False
+
+    amplify_batch_rows: int = 100_000
+    amplify_perturb_ratio: float = 0.1
+    amplify_perturb_days: int = 30
+
+    explain_misestimate_factor: float = 10
+    explain_buffers_factor: float = 2
+    index_advisor_max_candidates: int = 20
+    index_advisor_runtime_repeats: int = 3
+
+    profile_dir: str = "profiles"
+    profile_interval: float = 0.005
+    profile_top_allocations: int = 30
+    profile_traceback_depth: int = 1
 
     model_config = SettingsConfigDict(env_file="../../.env", env_file_encoding="utf-8")
 
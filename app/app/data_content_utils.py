@@ -1,42 +1,70 @@
+import asyncio
+import contextvars
 import logging
 
 import random
+import time
 from collections import defaultdict
+from concurrent.futures import Executor
 from datetime import timedelta
-from typing import List
-from faker import Faker
+from typing import Any, Awaitable, Callable, Dict, List, TYPE_CHECKING
 import sqlalchemy
 from sqlalchemy import (
     Engine,
     Table,
 )
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
 from sqlalchemy.sql.base import ReadOnlyColumnCollection
+from sqlalchemy.sql.expression import TableClause
 
+from app.batching_utils import AdaptiveBatcher
 from app.config import Settings
+from app.logging_utils import span
+from app.job_utils import get_batch_seed, get_checkpoint_statement, load_counters
+from app.models import ColumnOrdering
+from app.ordering_utils import apply_ordering
+from app.random_utils import get_random, random_var
+from app.text_corpus_utils import generate_texts
 
-logger = logging.getLogger()
-logging.basicConfig(level=logging.DEBUG)
+logger = logging.getLogger(__name__)
 
+if TYPE_CHECKING:
+    from faker import Faker
 
-def generate_single_value(field, fake: Faker, settings: Settings):
+    # the throttle measures rows with sizing_utils, which generates with this module
+    from app.throttle_utils import Throttle
+
+
+def get_faker() -> "Faker":
+    # Faker loads every locale provider, so it is only imported on first use
+    from faker import Faker
+
+    return Faker()
+
+
+def seed_generators(fake: "Faker", settings: Settings):
+    if settings.seed is None:
+        return
+
+    random.seed(settings.seed)
+    fake.seed_instance(settings.seed)
+
+
+def generate_single_value(field, fake: "Faker", settings: Settings):
     if isinstance(field.type, sqlalchemy.types.Integer):
-        return random.randint(settings.min_int, settings.max_int)
+        return get_random().randint(settings.min_int, settings.max_int)
     elif isinstance(field.type, sqlalchemy.types.String) and "email" in field.name:
         return fake.email()[: field.type.length]
     elif isinstance(field.type, sqlalchemy.types.Date):
-        return fake.date()
+        # asyncpg binds DATE parameters from date objects only, not strings
+        return fake.date_object()
     elif isinstance(field.type, sqlalchemy.types.Float):
         return round(
-            random.uniform(settings.min_float, settings.max_float),
+            get_random().uniform(settings.min_float, settings.max_float),
             settings.float_precision,
         )
     elif isinstance(field.type, sqlalchemy.types.Text):
-        word_count = random.randint(
-            settings.text_min_word_count, settings.text_max_word_count
-        )
-        result = " ".join(fake.words(nb=word_count))[: field.type.length]
-        return result
+        return generate_texts(fake, settings, 1, field.type.length)[0]
 
     result = (
         fake.word()[: field.type.length]
@@ -48,16 +76,29 @@ def generate_single_value(field, fake: Faker, settings: Settings):
 
 def generate_values(
     fields: ReadOnlyColumnCollection,
-    fake: Faker,
+    fake: "Faker",
     row_number: int,
     settings: Settings,
     unique_columns: List[str],
+    previous_value: defaultdict | None = None,
+    total_rows: int | None = None,
 ):
     if len(fields) == 0:
         raise ValueError("No fields provided for value generation")
 
     rows = []
-    previous_value: defaultdict = defaultdict()
+    # unique counters are passed in when one table is generated chunk by chunk
+    if previous_value is None:
+        previous_value = defaultdict()
+    # text is sliced from the preloaded corpus for the whole chunk at once
+    text_values = {
+        field.name: iter(generate_texts(fake, settings, row_number, field.type.length))
+        for field in fields
+        if isinstance(field.type, sqlalchemy.types.Text)
+        and "email" not in field.name
+        and field.name not in unique_columns
+    }
+
     for _ in range(row_number):
         generated_values = {}
         for field in fields:
@@ -89,7 +130,7 @@ def generate_values(
                         and field.type.length is not None
                         else settings.string_length
                     )
-                    max_counter_length = len(str(row_number))
+                    max_counter_length = len(str(total_rows or row_number))
                     dummy_value = "dummy_value_"[: length - max_counter_length]
                     if field.name not in previous_value:
                         previous_value[field.name] = settings.min_int
@@ -109,9 +150,12 @@ def generate_values(
             if isinstance(field.type, sqlalchemy.types.Integer) and field.primary_key:
                 continue
 
-            value = generate_single_value(field, fake, settings)
+            if field.name in text_values:
+                value = next(text_values[field.name])
+            else:
+                value = generate_single_value(field, fake, settings)
 
-            if field.nullable and random.random() < settings.null_probability:
+            if field.nullable and get_random().random() < settings.null_probability:
                 value = None
 
             generated_values[field.name] = value
@@ -119,6 +163,29 @@ def generate_values(
     return rows
 
 
+def get_unique_counters(
+    fields: ReadOnlyColumnCollection,
+    unique_columns: List[str],
+    settings: Settings,
+    row_offset: int = 0,
+) -> defaultdict:
+    # parallel loaders of one table start their counters at their own offset
+    previous_value: defaultdict = defaultdict()
+    if row_offset == 0:
+        return previous_value
+
+    for field in fields:
+        if field.name not in unique_columns:
+            continue
+        if isinstance(field.type, sqlalchemy.types.Date):
+            previous_value[field.name] = settings.min_date + timedelta(days=row_offset)
+        elif isinstance(
+            field.type, (sqlalchemy.types.Integer, sqlalchemy.types.String)
+        ):
+            previous_value[field.name] = settings.min_int + row_offset
+    return previous_value
+
+
 def get_row_count(table: Table, engine: Engine):
     logger.info("Getting row count for table {}".format(table.name))
     try:
@@ -137,31 +204,163 @@ def get_row_count(table: Table, engine: Engine):
         raise e
 
 
-def insert_generated_values(
+async def get_row_count_async(table: Table, engine: AsyncEngine):
+    try:
+        stmt = sqlalchemy.select(sqlalchemy.func.count()).select_from(table)
+        with span("count", table=table.name) as fields:
+            async with engine.connect() as conn:
+                total_count = (await conn.execute(stmt)).scalar()
+            fields["rows"] = total_count
+
+        return total_count
+    except Exception as e:
+        logger.error("Error getting row count for table {}: {}".format(table.name, e))
+        raise e
+
+
+async def insert_generated_values(
     table: Table,
     row_number: int,
-    session: Session,
+    session: AsyncSession | None,
     settings: Settings,
     unique_columns: List[str],
-) -> List:
+    executor: Executor | None = None,
+    target: TableClause | None = None,
+    column_values: Dict[str, Callable[[int, int], List]] | None = None,
+    row_offset: int = 0,
+    job: Dict | None = None,
+    ordering: Dict[str, ColumnOrdering] | None = None,
+    throttle: "Throttle | None" = None,
+    write_batch: Callable[[List[Dict]], Awaitable[None]] | None = None,
+) -> int:
     logger.info("Generating and inserting values")
 
-    fake = Faker()
+    loop = asyncio.get_running_loop()
+    fake = get_faker()
+    previous_value = get_unique_counters(
+        table.columns, unique_columns, settings, row_offset
+    )
+    insert_target = target if target is not None else table
+    plan_rows = job["plan_rows"] if job is not None else row_offset + row_number
+    batch_size = settings.batch_size
+    start = 0
+    first_batch = 0
+    if job is not None:
+        # a resumed job continues after its last committed batch
+        batch_size = job["batch_size"]
+        start = job["rows_inserted"]
+        first_batch = job["last_batch"] + 1
+        if job["counter_state"]:
+            previous_value = load_counters(job["counter_state"], table.columns)
+    else:
+        seed_generators(fake, settings)
+    batcher = (
+        AdaptiveBatcher(insert_target.name, batch_size, settings)
+        if settings.adaptive_batching
+        else None
+    )
 
-    values = generate_values(table.columns, fake, row_number, settings, unique_columns)
+    def generate_rows(start_row: int, count: int):
+        rows = generate_values(
+            table.columns,
+            fake,
+            count,
+            settings,
+            unique_columns,
+            previous_value,
+            row_offset + row_number,
+        )
+        # forced values, e.g. partition keys that must fall into one partition
+        for name, get_values in (column_values or {}).items():
+            for row, value in zip(rows, get_values(start_row, count)):
+                row[name] = value
+        if ordering:
+            # positions are counted over the whole plan, so parallel loaders
+            # of one table continue each other's order
+            apply_ordering(
+                rows,
+                table,
+                ordering,
+                row_offset + start_row,
+                plan_rows,
+                settings,
+                unique_columns,
+                set(column_values or {}),
+            )
+        return rows, dict(previous_value)
 
-    chunk_values = [
-        values[i : i + settings.batch_size]
-        for i in range(0, len(values), settings.batch_size)
-    ]
-    for chunk in chunk_values:
-        try:
-            session.execute(sqlalchemy.insert(table), chunk)
-            session.commit()
+    def build_chunk(start_row: int, batch: int, count: int):
+        if job is None:
+            return generate_rows(start_row, count)
+
+        # runs in a copied context, so the generator is this batch's only
+        batch_seed = get_batch_seed(job["seed"], batch)
+        random_var.set(random.Random(batch_seed))
+        fake.seed_instance(batch_seed)
+        return generate_rows(start_row, count)
 
-            logger.info("Inserted {} rows".format(len(chunk)))
+    def timed_build_chunk(start_row: int, batch: int, count: int):
+        with span("generate_batch", table=insert_target.name, batch=batch, rows=count):
+            return build_chunk(start_row, batch, count)
+
+    def generate_chunk(start_row: int, batch: int):
+        if start_row >= row_number:
+            return None
+        size = batcher.size if batcher is not None else batch_size
+        # CPU-bound, runs in the executor so the event loop keeps serving
+        # requests; the context carries the request and job ids into the logs
+        return loop.run_in_executor(
+            executor,
+            contextvars.copy_context().run,
+            timed_build_chunk,
+            start_row,
+            batch,
+            min(size, row_number - start_row),
+        )
+
+    inserted = 0
+    batch = first_batch
+    next_chunk = generate_chunk(start, batch)
+    while next_chunk is not None:
+        chunk, counters = await next_chunk
+        chunk_start = start + inserted
+        # generate the following chunk while this one is being inserted, its
+        # size comes from the batches measured so far
+        next_chunk = generate_chunk(chunk_start + len(chunk), batch + 1)
+        try:
+            if throttle is not None:
+                # outside the timing, waiting is not insert latency
+                with span("throttle", table=insert_target.name, batch=batch):
+                    await throttle.wait(chunk)
+            started = time.perf_counter()
+            stage_fields: Dict[str, Any] = {
+                "table": insert_target.name,
+                "batch": batch,
+                "rows": len(chunk),
+            }
+            if write_batch is not None:
+                # the writer commits on its own, jobs are not checkpointed
+                await write_batch(chunk)
+            else:
+                assert session is not None
+                with span("insert_batch", **stage_fields):
+                    await session.execute(sqlalchemy.insert(insert_target), chunk)
+                    if job is not None:
+                        await session.execute(
+                            get_checkpoint_statement(
+                                job["id"], batch, chunk_start + len(chunk), counters
+                            )
+                        )
+                with span("commit_batch", **stage_fields):
+                    await session.commit()
+            if batcher is not None:
+                batcher.observe(chunk, time.perf_counter() - started)
+            inserted += len(chunk)
+            batch += 1
         except Exception as e:
+            if next_chunk is not None:
+                await next_chunk
             logger.error("Error inserting rows: {}".format(e))
             raise e
 
-    return values
+    return inserted
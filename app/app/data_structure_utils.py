@@ -1,9 +1,10 @@
 import logging
 
-from typing import List
+from typing import Any, Dict, List
 
 import sqlalchemy
 from sqlalchemy import (
+    Connection,
     Engine,
     MetaData,
     Table,
@@ -17,10 +18,15 @@ from sqlalchemy import (
 )
 
 from app.config import Settings
-from app.models import Field
+from app.index_utils import forget_indexes, save_indexes
+from app.models import Field, IndexSpec, PartitionSpec
+from app.partition_utils import (
+    create_partitions,
+    forget_partitions,
+    get_partition_layout,
+)
 
-logger = logging.getLogger()
-logging.basicConfig(level=logging.DEBUG)
+logger = logging.getLogger(__name__)
 
 
 def get_existing_table(table_name: str, db_metadata: MetaData) -> Table | None:
@@ -36,6 +42,26 @@ def get_existing_table(table_name: str, db_metadata: MetaData) -> Table | None:
     return None
 
 
+def normalize_table_name(name: str) -> str:
+    # as Postgres stores it: unquoted names are folded to lower case
+    name = name.split("(")[0]
+    if len(name) > 1 and name.startswith('"') and name.endswith('"'):
+        return name[1:-1]
+    return name.lower()
+
+
+def reflect_tables(conn: Connection, table_names: List[str], metadata: MetaData):
+    logger.info("Reflecting tables {}".format(table_names))
+
+    inspector = sqlalchemy.inspect(conn)
+    existing = [name for name in table_names if inspector.has_table(name)]
+    for name in table_names:
+        # drop stale definitions, so dropped or recreated tables are re-read
+        if name in metadata.tables:
+            metadata.remove(metadata.tables[name])
+    metadata.reflect(conn, only=existing)
+
+
 def get_columns_definition(fields: List[Field], settings: Settings) -> list[Column]:
     logger.info("Generating columns definition")
 
@@ -76,13 +102,29 @@ def create_table(
     sqlalchemy_columns: list[Column],
     engine: Engine,
     metadata: MetaData,
+    partition: PartitionSpec | None = None,
+    indexes: List[IndexSpec] | None = None,
 ):
     logger.info("Creating table {}".format(table_name))
 
+    table_options: Dict[str, Any] = {}
+    layout = []
+    if partition is not None:
+        table_options["postgresql_partition_by"] = "{} ({})".format(
+            partition.strategy.value.upper(),
+            engine.dialect.identifier_preparer.quote(partition.column),
+        )
+        column = next(c for c in sqlalchemy_columns if c.name == partition.column)
+        layout = get_partition_layout(table_name, partition, column.type)
+
     try:
         with engine.begin() as conn:
-            table = Table(table_name, metadata, *sqlalchemy_columns)
+            table = Table(table_name, metadata, *sqlalchemy_columns, **table_options)
             metadata.create_all(conn)
+            if partition is not None:
+                create_partitions(conn, table, partition, layout)
+            if indexes:
+                save_indexes(conn, table_name, indexes)
 
             logger.info("Table {} is created".format(table_name))
     except Exception as e:
@@ -99,8 +141,36 @@ def drop_table(table: Table, metadata: MetaData, engine: Engine):
         with engine.begin() as conn:
             metadata.drop_all(conn, [table], checkfirst=True)
             metadata.remove(table)
+            # partitions and indexes are dropped with their parent
+            forget_partitions(conn, table.name)
+            forget_indexes(conn, table.name)
 
             logger.info("Table {} dropped".format(table.name))
     except Exception as e:
         logger.error("Error dropping table {}: {}".format(table.name, e))
         raise e
+
+
+def create_table_like(
+    source_table: Table, table_name: str, engine: Engine, metadata: MetaData
+) -> Table:
+    logger.info("Creating table {} like {}".format(table_name, source_table.name))
+
+    preparer = engine.dialect.identifier_preparer
+    statement = (
+        "CREATE TABLE {} (LIKE {} INCLUDING DEFAULTS INCLUDING IDENTITY "
+        "INCLUDING CONSTRAINTS INCLUDING INDEXES)".format(
+            preparer.quote(table_name), preparer.format_table(source_table)
+        )
+    )
+    try:
+        with engine.begin() as conn:
+            conn.execute(sqlalchemy.text(statement))
+            table = Table(table_name, metadata, autoload_with=conn)
+
+            logger.info("Table {} is created".format(table_name))
+    except Exception as e:
+        logger.error("Error creating table: {}".format(e))
+        raise
+
+    return table
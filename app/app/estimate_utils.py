@@ -0,0 +1,215 @@
+import logging
+
+import time
+from typing import Dict, List, TYPE_CHECKING
+
+import sqlalchemy
+from sqlalchemy import Connection, Engine, MetaData, Table
+
+from app.config import Settings
+from app.data_content_utils import generate_values
+from app.index_utils import get_index_statement, get_indexes
+from app.logging_utils import span
+from app.models import ColumnOrdering, IndexSpec
+from app.ordering_utils import apply_ordering
+
+logger = logging.getLogger(__name__)
+
+if TYPE_CHECKING:
+    from faker import Faker
+
+MAX_NAME_LENGTH = 63
+ESTIMATE_PREFIX = "_estimate_"
+
+WAL_LSN_QUERY = sqlalchemy.text("SELECT pg_current_wal_lsn()")
+WAL_BYTES_QUERY = sqlalchemy.text(
+    "SELECT pg_wal_lsn_diff(pg_current_wal_lsn(), CAST(:start AS pg_lsn))::bigint"
+)
+COPY_SIZES_QUERY = sqlalchemy.text(
+    """
+    SELECT pg_table_size(CAST(:table_name AS regclass)),
+           pg_indexes_size(CAST(:table_name AS regclass))
+    """
+)
+
+
+def get_copy_table(table: Table) -> Table:
+    name = "{}{}".format(ESTIMATE_PREFIX, table.name)[:MAX_NAME_LENGTH]
+    return table.to_metadata(MetaData(), name=name)
+
+
+def get_copy_statement(table: Table, copy: Table, dialect) -> str:
+    preparer = dialect.identifier_preparer
+    # without defaults, a serial column would draw from the real sequence,
+    # and nextval is not rolled back
+    return (
+        "CREATE TABLE {} (LIKE {} INCLUDING ALL EXCLUDING DEFAULTS EXCLUDING IDENTITY)"
+    ).format(preparer.format_table(copy), preparer.format_table(table))
+
+
+def generate_sample(
+    table: Table,
+    fake: "Faker",
+    sample_rows: int,
+    row_number: int,
+    settings: Settings,
+    unique_columns: List[str],
+    ordering: Dict[str, ColumnOrdering] | None = None,
+) -> List[Dict]:
+    rows = generate_values(
+        table.columns, fake, sample_rows, settings, unique_columns, None, row_number
+    )
+    if ordering:
+        apply_ordering(
+            rows, table, ordering, 0, row_number, settings, unique_columns, set()
+        )
+    return rows
+
+
+def fill_generated_keys(rows: List[Dict], table: Table):
+    # keys Postgres would fill in, the copy has no sequence for them
+    missing = [column.name for column in table.columns if column.name not in rows[0]]
+    for position, row in enumerate(rows, start=1):
+        for name in missing:
+            row[name] = position
+
+
+def get_copy_sizes(conn: Connection, copy: Table) -> Dict[str, int]:
+    table_name = conn.dialect.identifier_preparer.format_table(copy)
+    row = conn.execute(COPY_SIZES_QUERY, {"table_name": table_name}).one()
+    return {"table_bytes": row[0], "indexes_bytes": row[1]}
+
+
+def measure_sample(
+    table: Table, engine: Engine, rows: List[Dict], indexes: List[Dict]
+) -> Dict:
+    copy = get_copy_table(table)
+    dialect = engine.dialect
+
+    # nothing is committed: the copy, its rows and its indexes are rolled back,
+    # but the WAL they produced has been written and can be measured
+    with engine.connect() as conn:
+        transaction = conn.begin()
+        try:
+            conn.execute(sqlalchemy.text(get_copy_statement(table, copy, dialect)))
+            start_lsn = conn.execute(WAL_LSN_QUERY).scalar_one()
+
+            started = time.perf_counter()
+            conn.execute(sqlalchemy.insert(copy), rows)
+            insert_seconds = time.perf_counter() - started
+
+            started = time.perf_counter()
+            for position, index_row in enumerate(indexes):
+                name = "{}_{}".format(copy.name[: MAX_NAME_LENGTH - 4], position)
+                index = IndexSpec(**index_row["definition"])
+                conn.execute(
+                    sqlalchemy.text(
+                        get_index_statement(copy, name, index, dialect, False)
+                    )
+                )
+            index_seconds = time.perf_counter() - started
+            wal_bytes = conn.execute(WAL_BYTES_QUERY, {"start": start_lsn}).scalar_one()
+            sizes = get_copy_sizes(conn, copy)
+        finally:
+            transaction.rollback()
+
+    return {
+        "insert_seconds": insert_seconds,
+        "index_seconds": index_seconds,
+        "wal_bytes": wal_bytes,
+        **sizes,
+    }
+
+
+def extrapolate(
+    sample_rows: int, row_number: int, generate_seconds: float, measured: Dict
+) -> Dict:
+    scale = row_number / sample_rows
+    # generation of the next batch overlaps the insert of the current one,
+    # so the slower of the two sets the pace
+    load_seconds = max(generate_seconds, measured["insert_seconds"]) * scale
+    index_seconds = measured["index_seconds"] * scale
+    table_bytes = int(measured["table_bytes"] * scale)
+    indexes_bytes = int(measured["indexes_bytes"] * scale)
+
+    return {
+        "row_number": row_number,
+        "sample_rows": sample_rows,
+        "generate_rows_per_second": round(sample_rows / max(generate_seconds, 1e-9)),
+        "insert_rows_per_second": round(
+            sample_rows / max(measured["insert_seconds"], 1e-9)
+        ),
+        "estimated_seconds": round(load_seconds + index_seconds, 1),
+        "estimated_index_seconds": round(index_seconds, 1),
+        "estimated_wal_bytes": int(measured["wal_bytes"] * scale),
+        "estimated_table_bytes": table_bytes,
+        "estimated_indexes_bytes": indexes_bytes,
+        "estimated_total_bytes": table_bytes + indexes_bytes,
+    }
+
+
+def estimate_table(
+    table: Table,
+    engine: Engine,
+    fake: "Faker",
+    row_number: int,
+    settings: Settings,
+    unique_columns: List[str],
+    ordering: Dict[str, ColumnOrdering] | None = None,
+) -> Dict:
+    logger.info(
+        "Estimating generation of {} rows for {}".format(row_number, table.name)
+    )
+
+    sample_rows = min(settings.estimate_sample_rows, row_number)
+    with span("estimate_generate", table=table.name, rows=sample_rows):
+        started = time.perf_counter()
+        rows = generate_sample(
+            table, fake, sample_rows, row_number, settings, unique_columns, ordering
+        )
+        generate_seconds = time.perf_counter() - started
+    fill_generated_keys(rows, table)
+
+    # built indexes come with the LIKE copy and are kept up during the insert,
+    # as in a real load; only the pending ones are built after it
+    indexes = get_indexes(engine, table.name, pending_only=True)
+    with span("estimate_insert", table=table.name, rows=sample_rows):
+        measured = measure_sample(table, engine, rows, indexes)
+
+    return extrapolate(sample_rows, row_number, generate_seconds, measured)
+
+
+def get_totals(estimates: Dict[str, Dict]) -> Dict:
+    keys = [
+        "row_number",
+        "estimated_seconds",
+        "estimated_wal_bytes",
+        "estimated_total_bytes",
+    ]
+    # the tables of one request are loaded one after the other
+    totals = {
+        key: sum(estimate[key] for estimate in estimates.values()) for key in keys
+    }
+    totals["estimated_seconds"] = round(totals["estimated_seconds"], 1)
+    return totals
+
+
+def get_exceeded_limits(totals: Dict, settings: Settings) -> List[str]:
+    limits = [
+        ("estimated_seconds", "ESTIMATE_MAX_SECONDS", settings.estimate_max_seconds),
+        (
+            "estimated_wal_bytes",
+            "ESTIMATE_MAX_WAL_BYTES",
+            settings.estimate_max_wal_bytes,
+        ),
+        (
+            "estimated_total_bytes",
+            "ESTIMATE_MAX_TOTAL_BYTES",
+            settings.estimate_max_total_bytes,
+        ),
+    ]
+    return [
+        "{} {} is over {} {}".format(key, totals[key], name, limit)
+        for key, name, limit in limits
+        if limit is not None and totals[key] > limit
+    ]
@@ -0,0 +1,214 @@
+import logging
+
+from typing import Dict, List, Tuple
+
+import sqlalchemy
+from sqlalchemy import Engine
+
+from app.config import Settings
+from app.state_utils import explain_runs
+
+logger = logging.getLogger(__name__)
+
+SCAN_NODE_SUFFIX = "Scan"
+# passwords of the primary database and of every fan-out target
+SECRET_SETTINGS: Dict = {"db_password": True, "db_targets": {"__all__": {"password"}}}
+
+
+def explain_query(engine: Engine, sql: str) -> Dict:
+    logger.info("Running EXPLAIN ANALYZE")
+
+    statement = sqlalchemy.text(
+        "EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {}".format(sql.strip().rstrip(";"))
+    )
+    try:
+        with engine.connect() as conn:
+            result = conn.execute(statement).scalar_one()
+            # ANALYZE executes the statement, never keep what it changed
+            conn.rollback()
+    except Exception as e:
+        logger.error("Error running EXPLAIN ANALYZE: {}".format(e))
+        raise e
+
+    return result[0]
+
+
+def flatten_plan(plan: Dict, path: str = "0") -> List[Dict]:
+    # both row counts are per loop, totals keep them comparable for the inner
+    # side of a nested loop
+    loops = plan.get("Actual Loops", 1) or 1
+    plan_rows = plan.get("Plan Rows")
+    nodes = [
+        {
+            "path": path,
+            "node_type": plan["Node Type"],
+            "relation": plan.get("Relation Name"),
+            "index": plan.get("Index Name"),
+            "plan_rows": plan_rows * loops if plan_rows is not None else None,
+            "actual_rows": plan.get("Actual Rows", 0) * loops,
+            "shared_hit_blocks": plan.get("Shared Hit Blocks", 0),
+            "shared_read_blocks": plan.get("Shared Read Blocks", 0),
+        }
+    ]
+    for i, child in enumerate(plan.get("Plans", [])):
+        nodes.extend(flatten_plan(child, "{}.{}".format(path, i)))
+    return nodes
+
+
+def find_misestimates(nodes: List[Dict], factor: float) -> List[Dict]:
+    result = []
+    for node in nodes:
+        if node["plan_rows"] is None:
+            continue
+        # +1 keeps empty results from dividing by zero
+        ratio = (node["actual_rows"] + 1) / (node["plan_rows"] + 1)
+        if ratio >= factor or ratio <= 1 / factor:
+            result.append(
+                {
+                    "path": node["path"],
+                    "node_type": node["node_type"],
+                    "relation": node["relation"],
+                    "plan_rows": node["plan_rows"],
+                    "actual_rows": node["actual_rows"],
+                    "ratio": round(ratio, 3),
+                }
+            )
+    return result
+
+
+def get_scan_types(nodes: List[Dict]) -> Dict[str, List[str]]:
+    result: Dict[str, List[str]] = {}
+    for node in nodes:
+        if node["relation"] is None or not node["node_type"].endswith(SCAN_NODE_SUFFIX):
+            continue
+        result.setdefault(node["relation"], []).append(node["node_type"])
+    return {relation: sorted(types) for relation, types in result.items()}
+
+
+def get_total_read_blocks(explain: Dict) -> int:
+    # buffer counters of the root node include all of its children
+    plan = explain["Plan"]
+    return plan.get("Shared Read Blocks", 0) + plan.get("Temp Read Blocks", 0)
+
+
+def diff_plans(old_explain: Dict, new_explain: Dict, settings: Settings) -> Dict:
+    old_nodes = flatten_plan(old_explain["Plan"])
+    new_nodes = flatten_plan(new_explain["Plan"])
+
+    old_by_path = {node["path"]: node for node in old_nodes}
+    new_by_path = {node["path"]: node for node in new_nodes}
+    node_changes = []
+    for path in sorted(old_by_path.keys() | new_by_path.keys()):
+        old = old_by_path.get(path)
+        new = new_by_path.get(path)
+        old_key = (old["node_type"], old["relation"], old["index"]) if old else None
+        new_key = (new["node_type"], new["relation"], new["index"]) if new else None
+        if old_key != new_key:
+            node_changes.append(
+                {
+                    "path": path,
+                    "old": dict(zip(("node_type", "relation", "index"), old_key))
+                    if old_key
+                    else None,
+                    "new": dict(zip(("node_type", "relation", "index"), new_key))
+                    if new_key
+                    else None,
+                }
+            )
+
+    old_scans = get_scan_types(old_nodes)
+    new_scans = get_scan_types(new_nodes)
+    scan_changes = {
+        relation: {"old": old_scans.get(relation), "new": new_scans.get(relation)}
+        for relation in sorted(old_scans.keys() | new_scans.keys())
+        if old_scans.get(relation) != new_scans.get(relation)
+    }
+
+    old_read = get_total_read_blocks(old_explain)
+    new_read = get_total_read_blocks(new_explain)
+    read_blowup = new_read > max(old_read, 1) * settings.explain_buffers_factor
+
+    return {
+        "plan_changed": len(node_changes) > 0,
+        "node_changes": node_changes,
+        "scan_changes": scan_changes,
+        "misestimates": find_misestimates(
+            new_nodes, settings.explain_misestimate_factor
+        ),
+        "execution_time_ms": [
+            old_explain.get("Execution Time"),
+            new_explain.get("Execution Time"),
+        ],
+        "shared_read_blocks": [old_read, new_read],
+        "buffer_read_blowup": read_blowup,
+    }
+
+
+def save_explain_run(
+    engine: Engine,
+    label: str,
+    sql: str,
+    explain: Dict,
+    dataset: Dict,
+    settings: Settings,
+) -> int:
+    logger.info("Saving EXPLAIN run {}".format(label))
+
+    stmt = (
+        sqlalchemy.insert(explain_runs)
+        .values(
+            label=label,
+            sql=sql,
+            planning_time_ms=explain.get("Planning Time"),
+            execution_time_ms=explain.get("Execution Time"),
+            plan=explain,
+            dataset=dataset,
+            settings=settings.model_dump(mode="json", exclude=SECRET_SETTINGS),
+        )
+        .returning(explain_runs.c.id)
+    )
+    try:
+        with engine.begin() as conn:
+            return conn.execute(stmt).scalar_one()
+    except Exception as e:
+        logger.error("Error saving EXPLAIN run {}: {}".format(label, e))
+        raise e
+
+
+def get_explain_runs(engine: Engine, label: str) -> List[Dict]:
+    stmt = (
+        sqlalchemy.select(explain_runs)
+        .where(explain_runs.c.label == label)
+        .order_by(explain_runs.c.id)
+    )
+
+    with engine.connect() as conn:
+        return [dict(row._mapping) for row in conn.execute(stmt)]
+
+
+def pick_runs(
+    runs: List[Dict], base_id: int | None = None, compare_id: int | None = None
+) -> Tuple[Dict, Dict]:
+    if len(runs) < 2:
+        raise ValueError("At least two EXPLAIN runs are needed")
+
+    by_id = {run["id"]: run for run in runs}
+    for run_id in (base_id, compare_id):
+        if run_id is not None and run_id not in by_id:
+            raise ValueError("EXPLAIN run {} not found".format(run_id))
+
+    # by default the latest run is compared with the one before it
+    compare = by_id[compare_id] if compare_id is not None else runs[-1]
+    if base_id is not None:
+        base = by_id[base_id]
+    else:
+        earlier = [run for run in runs if run["id"] < compare["id"]]
+        if len(earlier) == 0:
+            raise ValueError("No EXPLAIN run before run {}".format(compare["id"]))
+        base = earlier[-1]
+
+    if base["id"] == compare["id"]:
+        raise ValueError(
+            "EXPLAIN run {} cannot be compared with itself".format(base["id"])
+        )
+    return base, compare
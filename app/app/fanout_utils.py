@@ -0,0 +1,173 @@
+import asyncio
+import logging
+
+import time
+import zlib
+from concurrent.futures import Executor
+from typing import Dict, List, Tuple, TYPE_CHECKING
+
+import sqlalchemy
+from sqlalchemy import Connection, MetaData, Table
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+from app.config import Settings
+from app.data_content_utils import insert_generated_values
+from app.logging_utils import span
+from app.models import ColumnOrdering
+from app.partition_utils import create_partition_tables
+
+logger = logging.getLogger(__name__)
+
+if TYPE_CHECKING:
+    from app.throttle_utils import Throttle
+
+
+class FanoutError(Exception):
+    def __init__(self, message: str, targets: Dict[str, Dict]):
+        super().__init__(message)
+        self.targets = targets
+
+
+def get_shard(value, count: int) -> int:
+    # crc32 is stable across processes, unlike hash() of a str
+    return zlib.crc32(str(value).encode()) % count
+
+
+def split_by_shard(rows: List[Dict], key: str, count: int) -> List[List[Dict]]:
+    shards: List[List[Dict]] = [[] for _ in range(count)]
+    for row in rows:
+        shards[get_shard(row[key], count)].append(row)
+    return shards
+
+
+def create_target_table(conn: Connection, table: Table, partitioning: Dict | None):
+    copy = table.to_metadata(MetaData())
+    if partitioning is not None:
+        # the layout is kept in the state table of the default target only,
+        # the target gets the same partitions without the bookkeeping
+        copy.dialect_options["postgresql"]["partition_by"] = "{} ({})".format(
+            partitioning["strategy"].upper(),
+            conn.dialect.identifier_preparer.quote(partitioning["column"]),
+        )
+    copy.create(conn)
+    if partitioning is not None:
+        create_partition_tables(
+            conn, copy, partitioning["column"], partitioning["partitions"]
+        )
+
+
+async def create_missing_tables(
+    table: Table, engines: Dict[str, AsyncEngine], partitioning: Dict | None = None
+) -> List[str]:
+    created = []
+    for name, engine in engines.items():
+        async with engine.begin() as conn:
+            exists = await conn.run_sync(
+                lambda sync_conn: sqlalchemy.inspect(sync_conn).has_table(
+                    table.name, schema=table.schema
+                )
+            )
+            if not exists:
+                logger.info("Creating table {} on target {}".format(table.name, name))
+                await conn.run_sync(create_target_table, table, partitioning)
+                created.append(name)
+    return created
+
+
+def get_target_stats(stats: Dict[str, Dict]) -> Dict[str, Dict]:
+    return {
+        name: {
+            **stat,
+            "busy_seconds": round(stat["busy_seconds"], 3),
+            "rows_per_second": round(stat["rows"] / stat["busy_seconds"], 1)
+            if stat["busy_seconds"]
+            else 0,
+        }
+        for name, stat in stats.items()
+    }
+
+
+async def insert_fanout(
+    table: Table,
+    row_number: int,
+    sessions: Dict[str, AsyncSession],
+    settings: Settings,
+    unique_columns: List[str],
+    mode: str = "replicate",
+    shard_key: str | None = None,
+    executor: Executor | None = None,
+    ordering: Dict[str, ColumnOrdering] | None = None,
+    throttle: "Throttle | None" = None,
+) -> Tuple[Dict[str, Dict], float]:
+    logger.info(
+        "Generating {} rows of {} for {} targets ({})".format(
+            row_number, table.name, len(sessions), mode
+        )
+    )
+
+    names = list(sessions)
+    stats: Dict[str, Dict] = {name: {"rows": 0, "busy_seconds": 0.0} for name in names}
+
+    async def insert_rows(name: str, rows: List[Dict]):
+        if len(rows) == 0:
+            return
+        started = time.perf_counter()
+        with span("insert_batch", table=table.name, target=name, rows=len(rows)):
+            await sessions[name].execute(sqlalchemy.insert(table), rows)
+        with span("commit_batch", table=table.name, target=name, rows=len(rows)):
+            await sessions[name].commit()
+        stats[name]["rows"] += len(rows)
+        stats[name]["busy_seconds"] += time.perf_counter() - started
+
+    async def write_batch(chunk: List[Dict]):
+        parts = (
+            split_by_shard(chunk, shard_key, len(names))
+            if mode == "shard" and shard_key is not None
+            else [chunk] * len(names)
+        )
+        tasks = {
+            name: asyncio.ensure_future(insert_rows(name, part))
+            for name, part in zip(names, parts)
+        }
+        # the batch takes as long as its slowest target, which is what the
+        # adaptive batch size and the throttle see
+        await asyncio.wait(tasks.values(), return_when=asyncio.FIRST_EXCEPTION)
+        # the other targets stop at once, their sessions are closed by the caller
+        for task in tasks.values():
+            task.cancel()
+        await asyncio.gather(*tasks.values(), return_exceptions=True)
+
+        failed = {
+            name: task.exception()
+            for name, task in tasks.items()
+            if not task.cancelled() and task.exception() is not None
+        }
+        if failed:
+            for name, task in tasks.items():
+                error = failed.get(name)
+                if error is not None:
+                    stats[name]["error"] = (
+                        str(error).splitlines()[0] if str(error) else repr(error)
+                    )
+                elif task.cancelled():
+                    stats[name]["error"] = "cancelled"
+            raise FanoutError(
+                "Fan-out failed on targets {}".format(", ".join(failed)),
+                get_target_stats(stats),
+            )
+
+    started = time.perf_counter()
+    await insert_generated_values(
+        table,
+        row_number,
+        None,
+        settings,
+        unique_columns,
+        executor,
+        ordering=ordering,
+        throttle=throttle,
+        write_batch=write_batch,
+    )
+    elapsed_seconds = time.perf_counter() - started
+
+    return get_target_stats(stats), elapsed_seconds
@@ -0,0 +1,275 @@
+import logging
+
+import re
+import statistics
+from typing import Dict, Iterator, List, Set, Tuple
+
+import sqlalchemy
+from sqlalchemy import Connection, Engine, MetaData
+
+from app.config import Settings
+from app.data_structure_utils import get_existing_table, reflect_tables
+from app.models import WorkloadQuery
+
+logger = logging.getLogger(__name__)
+
+CONDITION_ROLES = {
+    "Filter": "filter",
+    "Index Cond": "filter",
+    "Recheck Cond": "filter",
+    "Hash Cond": "join",
+    "Merge Cond": "join",
+    "Join Filter": "join",
+    "Sort Key": "sort",
+    "Group Key": "sort",
+}
+QUALIFIED_RE = re.compile(r"\b([A-Za-z_]\w*)\.([A-Za-z_]\w*)\b")
+IDENTIFIER_RE = re.compile(r"\b([A-Za-z_]\w*)\b")
+
+INDEX_SIZE_QUERY = sqlalchemy.text(
+    "SELECT pg_relation_size(quote_ident(:name)::regclass)"
+)
+
+ColumnRefs = Dict[str, Dict[str, Set[str]]]
+
+
+def explain_plan(conn: Connection, sql: str, analyze: bool = False) -> Dict:
+    options = "ANALYZE, FORMAT JSON" if analyze else "FORMAT JSON"
+    statement = sqlalchemy.text(
+        "EXPLAIN ({}) {}".format(options, sql.strip().rstrip(";"))
+    )
+    return conn.execute(statement).scalar_one()[0]
+
+
+def iter_plan_nodes(plan: Dict) -> Iterator[Dict]:
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from iter_plan_nodes(child)
+
+
+def collect_plan_columns(plan: Dict, db_metadata: MetaData) -> ColumnRefs:
+    nodes = list(iter_plan_nodes(plan))
+    aliases = {
+        node.get("Alias", node["Relation Name"]): node["Relation Name"]
+        for node in nodes
+        if "Relation Name" in node
+    }
+    table_columns = {}
+    for relation in set(aliases.values()):
+        table = get_existing_table(relation, db_metadata)
+        if table is not None:
+            table_columns[relation] = {column.name for column in table.columns}
+
+    refs: ColumnRefs = {}
+
+    def add_ref(relation: str, column: str, role: str):
+        if column in table_columns.get(relation, set()):
+            refs.setdefault(relation, {}).setdefault(role, set()).add(column)
+
+    for node in nodes:
+        for key, role in CONDITION_ROLES.items():
+            if key not in node:
+                continue
+            expressions = node[key] if isinstance(node[key], list) else [node[key]]
+            for expression in expressions:
+                for alias, column in QUALIFIED_RE.findall(expression):
+                    if alias in aliases:
+                        add_ref(aliases[alias], column, role)
+
+                unqualified = QUALIFIED_RE.sub(" ", expression)
+                for column in IDENTIFIER_RE.findall(unqualified):
+                    if "Relation Name" in node:
+                        add_ref(node["Relation Name"], column, role)
+                        continue
+                    # sort and group keys above a join may drop the alias, so
+                    # only resolve them when exactly one table has the column
+                    owners = [r for r, cols in table_columns.items() if column in cols]
+                    if len(owners) == 1:
+                        add_ref(owners[0], column, role)
+
+    return refs
+
+
+def get_existing_leading_columns(table: sqlalchemy.Table) -> Set[Tuple[str, ...]]:
+    existing = set()
+    if len(table.primary_key.columns) > 0:
+        existing.add(tuple(column.name for column in table.primary_key.columns))
+    for index in table.indexes:
+        existing.add(tuple(column.name for column in index.columns))
+    for constraint in table.constraints:
+        if isinstance(constraint, sqlalchemy.UniqueConstraint):
+            existing.add(tuple(column.name for column in constraint.columns))
+    return existing
+
+
+def propose_candidates(
+    refs: ColumnRefs, db_metadata: MetaData, max_candidates: int
+) -> List[Tuple[str, Tuple[str, ...]]]:
+    candidates: List[Tuple[str, Tuple[str, ...]]] = []
+    for relation in sorted(refs):
+        roles = refs[relation]
+        filters = sorted(roles.get("filter", set()))
+        joins = sorted(roles.get("join", set()))
+        sorts = sorted(roles.get("sort", set()))
+
+        columns: List[Tuple[str, ...]] = [(c,) for c in filters + joins + sorts]
+        # predicate first, then the ORDER BY / join column, so one index can
+        # serve both the lookup and the ordering
+        columns += [(f, s) for f in filters for s in sorts + joins if f != s]
+
+        table = get_existing_table(relation, db_metadata)
+        existing = get_existing_leading_columns(table) if table is not None else set()
+        for candidate in columns:
+            already_indexed = any(
+                index[: len(candidate)] == candidate for index in existing
+            )
+            if not already_indexed and (relation, candidate) not in candidates:
+                candidates.append((relation, candidate))
+
+    return candidates[:max_candidates]
+
+
+def get_index_definition(
+    relation: str, columns: Tuple[str, ...], engine: Engine, index_name: str = ""
+) -> str:
+    preparer = engine.dialect.identifier_preparer
+    return "CREATE INDEX {}ON {} ({})".format(
+        preparer.quote(index_name) + " " if index_name else "",
+        preparer.quote(relation),
+        ", ".join(preparer.quote(column) for column in columns),
+    )
+
+
+def measure_queries(
+    conn: Connection, queries: List[WorkloadQuery], mode: str, repeats: int = 1
+) -> Dict[str, float]:
+    result = {}
+    for query in queries:
+        if mode == "runtime":
+            # the first run warms the cache, so the baseline is not measured
+            # cold against warm candidates
+            explain_plan(conn, query.sql, analyze=True)
+            result[query.name] = statistics.median(
+                explain_plan(conn, query.sql, analyze=True)["Execution Time"]
+                for _ in range(repeats)
+            )
+        else:
+            result[query.name] = explain_plan(conn, query.sql)["Plan"]["Total Cost"]
+    return result
+
+
+def weighted_total(values: Dict[str, float], queries: List[WorkloadQuery]) -> float:
+    return sum(values[query.name] * query.weight for query in queries)
+
+
+def advise_indexes(
+    engine: Engine,
+    db_metadata: MetaData,
+    queries: List[WorkloadQuery],
+    settings: Settings,
+    mode: str = "cost",
+) -> Dict:
+    logger.info("Advising indexes for {} queries".format(len(queries)))
+
+    refs: ColumnRefs = {}
+    try:
+        with engine.connect() as conn:
+            plans = [explain_plan(conn, query.sql)["Plan"] for query in queries]
+            # only the relations the plans scan are read from the catalog
+            relations = {
+                node["Relation Name"]
+                for plan in plans
+                for node in iter_plan_nodes(plan)
+                if "Relation Name" in node
+            }
+            reflect_tables(conn, sorted(relations), db_metadata)
+            for plan in plans:
+                for relation, roles in collect_plan_columns(plan, db_metadata).items():
+                    for role, role_columns in roles.items():
+                        refs.setdefault(relation, {}).setdefault(role, set()).update(
+                            role_columns
+                        )
+            conn.rollback()
+
+            candidates = propose_candidates(
+                refs, db_metadata, settings.index_advisor_max_candidates
+            )
+            logger.info("Evaluating {} candidate indexes".format(len(candidates)))
+
+            repeats = settings.index_advisor_runtime_repeats
+            with conn.begin() as transaction:
+                baseline = measure_queries(conn, queries, mode, repeats)
+                transaction.rollback()
+            baseline_total = weighted_total(baseline, queries)
+
+            results = []
+            failed = []
+            for relation, columns in candidates:
+                index_name = "_advisor_{}_{}".format(relation, "_".join(columns))[:63]
+                definition = get_index_definition(relation, columns, engine)
+                # every candidate lives only inside its own rolled back transaction
+                try:
+                    with conn.begin() as transaction:
+                        conn.execute(
+                            sqlalchemy.text(
+                                get_index_definition(
+                                    relation, columns, engine, index_name
+                                )
+                            )
+                        )
+                        size_bytes = conn.execute(
+                            INDEX_SIZE_QUERY, {"name": index_name}
+                        ).scalar_one()
+                        measured = measure_queries(conn, queries, mode, repeats)
+                        transaction.rollback()
+                except sqlalchemy.exc.DBAPIError as e:
+                    # e.g. a column type without a btree operator class, the
+                    # other candidates are still worth measuring
+                    logger.warning(
+                        "Candidate index {} failed: {}".format(definition, e.orig)
+                    )
+                    failed.append(
+                        {
+                            "table": relation,
+                            "columns": list(columns),
+                            "definition": definition,
+                            "error": str(e.orig).splitlines()[0]
+                            if str(e.orig)
+                            else repr(e.orig),
+                        }
+                    )
+                    continue
+
+                benefit = baseline_total - weighted_total(measured, queries)
+                results.append(
+                    {
+                        "table": relation,
+                        "columns": list(columns),
+                        "definition": definition,
+                        "benefit": round(benefit, 3),
+                        "benefit_pct": round(benefit / baseline_total * 100, 2)
+                        if baseline_total
+                        else 0,
+                        "size_bytes": size_bytes,
+                        "queries": {
+                            query.name: [baseline[query.name], measured[query.name]]
+                            for query in queries
+                        },
+                    }
+                )
+    except Exception as e:
+        logger.error("Error advising indexes: {}".format(e))
+        raise e
+
+    results.sort(key=lambda r: (-r["benefit"], r["size_bytes"]))
+
+    return {
+        "mode": mode,
+        "baseline": baseline,
+        "columns": {
+            relation: {role: sorted(names) for role, names in roles.items()}
+            for relation, roles in refs.items()
+        },
+        "indexes": results,
+        "failed": failed,
+    }
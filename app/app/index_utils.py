@@ -0,0 +1,163 @@
+import logging
+
+import contextlib
+import time
+from typing import Dict, List
+
+import sqlalchemy
+from sqlalchemy import Connection, Engine, Table
+
+from app.logging_utils import span
+from app.models import IndexSpec
+from app.state_utils import table_indexes
+
+logger = logging.getLogger(__name__)
+
+PENDING = "pending"
+BUILT = "built"
+FAILED = "failed"
+
+# partitioned indexes have no storage of their own, so the leaves are summed
+INDEX_SIZE_QUERY = sqlalchemy.text(
+    """
+    SELECT coalesce(sum(pg_relation_size(relid)), 0)::bigint
+    FROM pg_partition_tree(CAST(:index_name AS regclass))
+    """
+)
+
+
+def get_index_statement(
+    table: Table, name: str, index: IndexSpec, dialect, concurrently: bool
+) -> str:
+    preparer = dialect.identifier_preparer
+    columns = [
+        "{} {}".format(preparer.quote(column), index.opclass)
+        if index.opclass
+        else preparer.quote(column)
+        for column in index.columns
+    ]
+    statement = "CREATE {}INDEX {}IF NOT EXISTS {} ON {} USING {} ({})".format(
+        "UNIQUE " if index.unique else "",
+        "CONCURRENTLY " if concurrently else "",
+        preparer.quote(name),
+        preparer.format_table(table),
+        index.method.value,
+        ", ".join(columns),
+    )
+    if index.include:
+        statement += " INCLUDE ({})".format(
+            ", ".join(preparer.quote(column) for column in index.include)
+        )
+    if index.where:
+        statement += " WHERE {}".format(index.where)
+    return statement
+
+
+def save_indexes(conn: Connection, table_name: str, indexes: List[IndexSpec]):
+    # indexes are built after the first load, not with the empty table
+    for index in indexes:
+        conn.execute(
+            sqlalchemy.insert(table_indexes).values(
+                table_name=table_name,
+                name=index.get_name(table_name),
+                definition=index.model_dump(mode="json"),
+                status=PENDING,
+            )
+        )
+
+
+def forget_indexes(conn: Connection, table_name: str):
+    conn.execute(
+        sqlalchemy.delete(table_indexes).where(table_indexes.c.table_name == table_name)
+    )
+
+
+def get_indexes(
+    engine: Engine, table_name: str | None = None, pending_only: bool = False
+) -> List[Dict]:
+    stmt = sqlalchemy.select(table_indexes).order_by(
+        table_indexes.c.table_name, table_indexes.c.name
+    )
+    if table_name is not None:
+        stmt = stmt.where(table_indexes.c.table_name == table_name)
+    if pending_only:
+        stmt = stmt.where(table_indexes.c.status != BUILT)
+
+    with engine.connect() as conn:
+        return [dict(row._mapping) for row in conn.execute(stmt)]
+
+
+def set_index_status(engine: Engine, table_name: str, name: str, result: Dict):
+    stmt = (
+        sqlalchemy.update(table_indexes)
+        .where(
+            table_indexes.c.table_name == table_name,
+            table_indexes.c.name == name,
+        )
+        .values(**result, updated_at=sqlalchemy.func.now())
+    )
+    with engine.begin() as conn:
+        conn.execute(stmt)
+
+
+def build_index(
+    table: Table, index_row: Dict, engine: Engine, partitioned: bool = False
+) -> Dict:
+    index = IndexSpec(**index_row["definition"])
+    name = index_row["name"]
+    # CREATE INDEX CONCURRENTLY is not supported on partitioned tables
+    concurrently = index.concurrently and not partitioned
+    statement = get_index_statement(table, name, index, engine.dialect, concurrently)
+    logger.info("Building index {} on table {}".format(name, table.name))
+
+    preparer = engine.dialect.identifier_preparer
+    index_name = (
+        "{}.{}".format(preparer.quote_schema(table.schema), preparer.quote(name))
+        if table.schema
+        else preparer.quote(name)
+    )
+    started = time.perf_counter()
+    try:
+        # CONCURRENTLY cannot run inside a transaction block
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            with span("create_index", table=table.name, index=name):
+                conn.execute(sqlalchemy.text(statement))
+            size_bytes = conn.execute(
+                INDEX_SIZE_QUERY, {"index_name": index_name}
+            ).scalar_one()
+        result = {
+            "status": BUILT,
+            "build_seconds": round(time.perf_counter() - started, 3),
+            "size_bytes": size_bytes,
+            "error": None,
+        }
+    except Exception as e:
+        logger.error("Error building index {}: {}".format(name, e))
+        if concurrently:
+            # a failed concurrent build leaves an invalid index behind
+            with contextlib.suppress(Exception):
+                with engine.connect().execution_options(
+                    isolation_level="AUTOCOMMIT"
+                ) as conn:
+                    conn.execute(
+                        sqlalchemy.text(
+                            "DROP INDEX CONCURRENTLY IF EXISTS {}".format(index_name)
+                        )
+                    )
+        result = {
+            "status": FAILED,
+            "build_seconds": round(time.perf_counter() - started, 3),
+            "size_bytes": None,
+            "error": str(e).splitlines()[0] if str(e) else repr(e),
+        }
+
+    set_index_status(engine, table.name, name, result)
+    return {"concurrently": concurrently, "statement": statement, **result}
+
+
+def build_table_indexes(table: Table, engine: Engine, partitioned: bool) -> Dict:
+    # one at a time, concurrent builds on one table wait for each other anyway
+    return {
+        index_row["name"]: build_index(table, index_row, engine, partitioned)
+        for index_row in get_indexes(engine, table.name, pending_only=True)
+    }
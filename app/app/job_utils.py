@@ -0,0 +1,135 @@
+import logging
+
+import random
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, List
+
+import sqlalchemy
+from sqlalchemy import Engine
+from sqlalchemy.sql.base import ReadOnlyColumnCollection
+
+from app.config import Settings
+from app.state_utils import generation_jobs
+
+logger = logging.getLogger(__name__)
+
+RUNNING = "running"
+FAILED = "failed"
+COMPLETED = "completed"
+
+
+def dump_counters(previous_value: Dict) -> Dict:
+    return {
+        name: value.isoformat() if isinstance(value, datetime) else value
+        for name, value in previous_value.items()
+    }
+
+
+def load_counters(counter_state: Dict, fields: ReadOnlyColumnCollection) -> defaultdict:
+    previous_value: defaultdict = defaultdict()
+    date_fields = {
+        field.name for field in fields if isinstance(field.type, sqlalchemy.types.Date)
+    }
+    for name, value in counter_state.items():
+        previous_value[name] = (
+            datetime.fromisoformat(value) if name in date_fields else value
+        )
+    return previous_value
+
+
+def get_batch_seed(seed: int, batch: int) -> int:
+    # every batch gets its own seed, so a resumed job regenerates the same
+    # rows it would have generated without the interruption
+    return seed * 1_000_003 + batch
+
+
+def create_job(
+    engine: Engine,
+    table_name: str,
+    row_number: int,
+    settings: Settings,
+    target: str | None = None,
+    row_offset: int = 0,
+    plan_rows: int | None = None,
+    ordering: Dict | None = None,
+) -> Dict:
+    logger.info("Creating generation job for table {}".format(table_name))
+
+    seed = (
+        settings.seed
+        if settings.seed is not None
+        else random.SystemRandom().randrange(2**31)
+    )
+    stmt = (
+        sqlalchemy.insert(generation_jobs)
+        .values(
+            table_name=table_name,
+            target=target,
+            status=RUNNING,
+            seed=seed,
+            batch_size=settings.batch_size,
+            plan_rows=plan_rows if plan_rows is not None else row_number,
+            row_number=row_number,
+            row_offset=row_offset,
+            rows_inserted=0,
+            last_batch=-1,
+            counter_state={},
+            ordering=ordering,
+        )
+        .returning(generation_jobs)
+    )
+    try:
+        with engine.begin() as conn:
+            return dict(conn.execute(stmt).one()._mapping)
+    except Exception as e:
+        logger.error("Error creating generation job: {}".format(e))
+        raise e
+
+
+def get_job(engine: Engine, job_id: int) -> Dict | None:
+    stmt = sqlalchemy.select(generation_jobs).where(generation_jobs.c.id == job_id)
+    with engine.connect() as conn:
+        row = conn.execute(stmt).first()
+    return dict(row._mapping) if row is not None else None
+
+
+def get_jobs(engine: Engine, table_name: str | None = None) -> List[Dict]:
+    stmt = sqlalchemy.select(generation_jobs).order_by(generation_jobs.c.id)
+    if table_name is not None:
+        stmt = stmt.where(generation_jobs.c.table_name == table_name)
+
+    with engine.connect() as conn:
+        return [dict(row._mapping) for row in conn.execute(stmt)]
+
+
+def get_checkpoint_statement(
+    job_id: int, batch: int, rows_inserted: int, previous_value: Dict
+):
+    # executed in the transaction of the batch it records
+    return (
+        sqlalchemy.update(generation_jobs)
+        .where(generation_jobs.c.id == job_id)
+        .values(
+            last_batch=batch,
+            rows_inserted=rows_inserted,
+            counter_state=dump_counters(previous_value),
+            updated_at=sqlalchemy.func.now(),
+        )
+    )
+
+
+def set_job_status(engine: Engine, job_id: int, status: str, error: str | None = None):
+    logger.info("Generation job {} is {}".format(job_id, status))
+
+    stmt = (
+        sqlalchemy.update(generation_jobs)
+        .where(generation_jobs.c.id == job_id)
+        .values(status=status, error=error, updated_at=sqlalchemy.func.now())
+    )
+    try:
+        with engine.begin() as conn:
+            conn.execute(stmt)
+    except Exception as e:
+        logger.error("Error updating generation job {}: {}".format(job_id, e))
+        raise e
@@ -0,0 +1,102 @@
+import logging
+
+import json
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Any, Dict
+
+from app.config import Settings
+
+logger = logging.getLogger(__name__)
+
+request_id_var: ContextVar[str | None] = ContextVar("request_id", default=None)
+job_id_var: ContextVar[int | None] = ContextVar("job_id", default=None)
+
+REQUEST_ID_HEADER = b"x-request-id"
+# attributes every LogRecord has, anything else was passed in extra=
+RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        request_id = request_id_var.get()
+        if request_id is not None:
+            entry["request_id"] = request_id
+        job_id = job_id_var.get()
+        if job_id is not None:
+            entry["job_id"] = job_id
+        for key, value in vars(record).items():
+            if key not in RECORD_ATTRIBUTES:
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+def configure_logging(settings: Settings):
+    handler = logging.StreamHandler()
+    if settings.log_format == "json":
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(
+            logging.Formatter("%(asctime)s %(levelname)s %(name)s %(message)s")
+        )
+
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(settings.log_level.upper())
+
+
+@contextmanager
+def span(stage: str, level: int = logging.INFO, **fields):
+    # timing is always cheap, the record is only built when the level is on
+    started = time.perf_counter()
+    try:
+        yield fields
+    finally:
+        if logger.isEnabledFor(level):
+            duration_ms = (time.perf_counter() - started) * 1000
+            logger.log(
+                level,
+                "%s took %.1f ms",
+                stage,
+                duration_ms,
+                extra={"stage": stage, "duration_ms": round(duration_ms, 3), **fields},
+            )
+
+
+class RequestIdMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = dict(scope.get("headers", [])).get(REQUEST_ID_HEADER)
+        request_id = request_id.decode() if request_id else uuid.uuid4().hex
+        token = request_id_var.set(request_id)
+
+        async def send_with_request_id(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [
+                    (REQUEST_ID_HEADER, request_id.encode())
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        finally:
+            request_id_var.reset(token)
@@ -0,0 +1,78 @@
+import logging
+
+import time
+from typing import Dict
+
+import sqlalchemy
+from sqlalchemy import Engine, Table
+
+from app.logging_utils import span
+
+logger = logging.getLogger(__name__)
+
+# partitioned tables have no storage of their own, so the leaves are summed
+TABLE_HEALTH_QUERY = sqlalchemy.text(
+    """
+    SELECT coalesce(sum(s.n_live_tup), 0)::bigint,
+           coalesce(sum(s.n_dead_tup), 0)::bigint,
+           coalesce(sum(c.relpages), 0)::bigint,
+           coalesce(sum(c.relallvisible), 0)::bigint,
+           coalesce(sum(pg_table_size(c.oid)), 0)::bigint,
+           coalesce(sum(pg_indexes_size(c.oid)), 0)::bigint,
+           max(age(c.relfrozenxid))
+    FROM pg_partition_tree(CAST(:table_name AS regclass)) t
+    JOIN pg_class c ON c.oid = t.relid
+    LEFT JOIN pg_stat_user_tables s ON s.relid = c.oid
+    WHERE t.isleaf
+    """
+)
+
+
+def get_table_health(table: Table, engine: Engine) -> Dict:
+    table_name = engine.dialect.identifier_preparer.format_table(table)
+    with engine.connect() as conn:
+        row = conn.execute(TABLE_HEALTH_QUERY, {"table_name": table_name}).first()
+    assert row is not None
+
+    live_tuples, dead_tuples, pages, all_visible_pages = row[0], row[1], row[2], row[3]
+    return {
+        "live_tuples": live_tuples,
+        "dead_tuples": dead_tuples,
+        "all_visible_ratio": round(all_visible_pages / pages, 3) if pages else None,
+        "frozen_xid_age": row[6],
+        "table_bytes": row[4],
+        "indexes_bytes": row[5],
+    }
+
+
+def vacuum_table(table: Table, engine: Engine, freeze: bool = True) -> float:
+    logger.info("Vacuuming table {}".format(table.name))
+
+    options = "FREEZE, ANALYZE" if freeze else "ANALYZE"
+    statement = sqlalchemy.text(
+        "VACUUM ({}) {}".format(
+            options, engine.dialect.identifier_preparer.format_table(table)
+        )
+    )
+    started = time.perf_counter()
+    # VACUUM cannot run inside a transaction block
+    with span("vacuum", table=table.name, freeze=freeze):
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            conn.execute(statement)
+    return time.perf_counter() - started
+
+
+def run_maintenance(table: Table, engine: Engine, freeze: bool = True) -> Dict:
+    try:
+        before = get_table_health(table, engine)
+        vacuum_seconds = vacuum_table(table, engine, freeze)
+        after = get_table_health(table, engine)
+    except Exception as e:
+        logger.error("Error vacuuming table {}: {}".format(table.name, e))
+        raise e
+
+    return {
+        "vacuum_seconds": round(vacuum_seconds, 3),
+        "dead_tuples_before": before["dead_tuples"],
+        **after,
+    }
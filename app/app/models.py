@@ -2,10 +2,12 @@ import re
 from enum import Enum
 
 from pydantic import BaseModel, model_validator, field_validator
-from typing import List
+from typing import Any, Dict, List, Literal
 
 
 IDENT_RE = re.compile(r"^[A-Za-z_][A-Za-z0-9_]{0,62}$")
+SIZE_RE = re.compile(r"^(\d+(?:\.\d+)?)\s*(B|KB|MB|GB|TB)?$")
+SIZE_UNITS = {"B": 1, "KB": 1024, "MB": 1024**2, "GB": 1024**3, "TB": 1024**4}
 
 
 class FieldType(str, Enum):
@@ -52,10 +54,152 @@ class Field(BaseModel):
         return self
 
 
+class PartitionStrategy(str, Enum):
+    range = "range"
+    list = "list"
+    hash = "hash"
+
+
+class PartitionSpec(BaseModel):
+    strategy: PartitionStrategy
+    column: str
+    partitions: int | None = None
+    bounds: List[Any] = []
+
+    @field_validator("column")
+    @classmethod
+    def validate_column(cls, v: str) -> str:
+        return _validate_identifier(v, "partition.column")
+
+    @model_validator(mode="after")
+    def validate_partitions(self):
+        if self.partitions is not None and self.partitions < 1:
+            raise ValueError("partition.partitions must be a positive number.")
+
+        if self.strategy == PartitionStrategy.hash:
+            if self.partitions is None or self.bounds:
+                raise ValueError(
+                    "HASH partitioning takes partition.partitions and no bounds."
+                )
+        elif self.strategy == PartitionStrategy.range:
+            if len(self.bounds) < 2:
+                raise ValueError(
+                    "RANGE partitioning needs at least two partition.bounds."
+                )
+            if self.partitions is not None and len(self.bounds) != 2:
+                raise ValueError(
+                    "RANGE partitioning with partition.partitions splits exactly "
+                    "two bounds [from, to] into equal ranges."
+                )
+        else:
+            if self.partitions is not None:
+                raise ValueError(
+                    "LIST partitioning takes one list of values per partition in "
+                    "partition.bounds, not partition.partitions."
+                )
+            if len(self.bounds) == 0 or not all(
+                isinstance(values, list) and len(values) > 0 for values in self.bounds
+            ):
+                raise ValueError(
+                    "LIST partitioning needs partition.bounds as non-empty lists of values."
+                )
+
+        return self
+
+
+class ColumnOrder(str, Enum):
+    sorted = "sorted"
+    partial = "partial"
+    clustered = "clustered"
+    timeseries = "timeseries"
+
+
+class ColumnOrdering(BaseModel):
+    order: ColumnOrder
+    descending: bool = False
+    # partial: share of rows moved out of their sorted position
+    disorder: float = 0.1
+    # clustered: column whose order the values follow
+    by: str | None = None
+    # timeseries: distance between consecutive rows
+    step_seconds: float = 60
+
+    @model_validator(mode="after")
+    def validate_ordering(self):
+        if not 0 <= self.disorder <= 1:
+            raise ValueError("ordering.disorder must be between 0 and 1.")
+
+        if self.order == ColumnOrder.clustered:
+            if self.by is None:
+                raise ValueError("Clustered ordering needs ordering.by.")
+            _validate_identifier(self.by, "ordering.by")
+        elif self.by is not None:
+            raise ValueError("ordering.by is only used by clustered ordering.")
+
+        if self.step_seconds <= 0:
+            raise ValueError("ordering.step_seconds must be a positive number.")
+
+        return self
+
+
+class IndexMethod(str, Enum):
+    btree = "btree"
+    hash = "hash"
+    gin = "gin"
+    brin = "brin"
+
+
+class IndexSpec(BaseModel):
+    columns: List[str]
+    name: str | None = None
+    method: IndexMethod = IndexMethod.btree
+    unique: bool = False
+    include: List[str] = []
+    where: str | None = None
+    # operator class for every column, e.g. gin_trgm_ops
+    opclass: str | None = None
+    concurrently: bool = True
+
+    @field_validator("columns", "include")
+    @classmethod
+    def validate_columns(cls, v: List[str]) -> List[str]:
+        return [_validate_identifier(column, "index column") for column in v]
+
+    @field_validator("name", "opclass")
+    @classmethod
+    def validate_name(cls, v: str | None) -> str | None:
+        return _validate_identifier(v, "index name") if v is not None else None
+
+    @model_validator(mode="after")
+    def validate_index(self):
+        if len(self.columns) == 0:
+            raise ValueError("indexes[].columns must not be empty.")
+
+        if self.method != IndexMethod.btree and (self.unique or self.include):
+            raise ValueError("unique and include are supported by btree indexes only.")
+
+        if self.method == IndexMethod.hash and len(self.columns) > 1:
+            raise ValueError("hash indexes take a single column.")
+
+        if self.where is not None and len(self.where.strip()) == 0:
+            raise ValueError("indexes[].where must not be empty.")
+
+        return self
+
+    def get_name(self, table_name: str) -> str:
+        if self.name is not None:
+            return self.name
+        # btree names stay as they were, other methods may share the columns
+        method = "" if self.method == IndexMethod.btree else "_" + self.method.value
+        return "{}_{}{}_idx".format(table_name, "_".join(self.columns), method)[:63]
+
+
 class CreateTablePayload(BaseModel):
     table_name: str
     fields: List[Field]
     force_recreate_table: bool = False
+    partition: PartitionSpec | None = None
+    indexes: List[IndexSpec] = []
 
     @field_validator("table_name")
     @classmethod
@@ -72,18 +216,157 @@ class CreateTablePayload(BaseModel):
         if pk_count > 1:
             raise ValueError("Only one primary_key field is supported in this version.")
 
+        if self.partition is not None:
+            self.validate_partition(self.partition)
+
+        for index in self.indexes:
+            for column in index.columns + index.include:
+                if column not in names:
+                    raise ValueError(
+                        "Index column {} must be one of fields[].name.".format(column)
+                    )
+            # generated values are only unique for unique and primary_key
+            # fields, anything else would fail the build after the load
+            if index.unique and not any(
+                f.unique or f.primary_key
+                for f in self.fields
+                if f.name in index.columns
+            ):
+                raise ValueError(
+                    "unique indexes must contain a unique or primary_key field."
+                )
+            # Postgres enforces uniqueness per partition, like for unique fields
+            if (
+                index.unique
+                and self.partition is not None
+                and self.partition.column not in index.columns
+            ):
+                raise ValueError(
+                    "unique indexes of a partitioned table must include the "
+                    "partition column."
+                )
+
+        # derived names are cut to 63 chars, so they can collide as well
+        index_names = [index.get_name(self.table_name) for index in self.indexes]
+        for name in index_names:
+            if index_names.count(name) > 1:
+                raise ValueError(
+                    "Index name {} is used by more than one index, "
+                    "set indexes[].name to tell them apart.".format(name)
+                )
+
+        return self
+
+    def validate_partition(self, partition: PartitionSpec):
+        # partition names get a _pN / _default suffix
+        if len(self.table_name) > 55:
+            raise ValueError("table_name of a partitioned table must be <= 55 chars.")
+
+        column = next((f for f in self.fields if f.name == partition.column), None)
+        if column is None:
+            raise ValueError("partition.column must be one of fields[].name.")
+
+        if partition.strategy == PartitionStrategy.range and column.type not in {
+            FieldType.integer,
+            FieldType.float,
+            FieldType.date,
+        }:
+            raise ValueError(
+                "RANGE partitioning supports integer, float and date columns only."
+            )
+
+        if partition.strategy == PartitionStrategy.list and (
+            column.unique or column.primary_key
+        ):
+            raise ValueError("LIST partition column can not be unique.")
+
+        # Postgres enforces uniqueness per partition, so the key must be included
+        for f in self.fields:
+            if (f.unique or f.primary_key) and f.name != partition.column:
+                raise ValueError(
+                    "unique and primary_key fields of a partitioned table must be "
+                    "the partition column."
+                )
+
+
+class ThrottleSpec(BaseModel):
+    rows_per_second: float | None = None
+    mb_per_second: float | None = None
+    # pause when the database shows replication, checkpoint or latency pressure
+    backoff: bool = True
+
+    @model_validator(mode="after")
+    def validate_throttle(self):
+        for value in (self.rows_per_second, self.mb_per_second):
+            if value is not None and value <= 0:
+                raise ValueError("Throttle rates must be positive numbers.")
+
+        if self.rows_per_second is None and self.mb_per_second is None:
+            if not self.backoff:
+                raise ValueError("throttle needs a rate limit or backoff.")
+
         return self
 
 
 class GeneratePayload(BaseModel):
     table_name: str
     row_number: int = 10
+    ordering: Dict[str, ColumnOrdering] = {}
+    throttle: ThrottleSpec | None = None
+
+    @field_validator("table_name")
+    @classmethod
+    def validate_table_name(cls, v: str) -> str:
+        return _validate_identifier(v, "table_name")
+
+    @field_validator("ordering")
+    @classmethod
+    def validate_ordering(
+        cls, v: Dict[str, ColumnOrdering]
+    ) -> Dict[str, ColumnOrdering]:
+        for name in v:
+            _validate_identifier(name, "ordering column")
+        return v
+
+
+class FanoutGeneratePayload(BaseModel):
+    table_name: str
+    row_number: int = 10
+    targets: List[str] = []
+    mode: Literal["replicate", "shard"] = "replicate"
+    shard_key: str | None = None
+    ordering: Dict[str, ColumnOrdering] = {}
+    throttle: ThrottleSpec | None = None
 
     @field_validator("table_name")
     @classmethod
     def validate_table_name(cls, v: str) -> str:
         return _validate_identifier(v, "table_name")
 
+    @field_validator("ordering")
+    @classmethod
+    def validate_ordering(
+        cls, v: Dict[str, ColumnOrdering]
+    ) -> Dict[str, ColumnOrdering]:
+        for name in v:
+            _validate_identifier(name, "ordering column")
+        return v
+
+    @model_validator(mode="after")
+    def validate_fanout(self):
+        if self.row_number <= 0:
+            raise ValueError("row_number must be a positive number.")
+
+        if self.mode == "shard":
+            if self.shard_key is None:
+                raise ValueError("shard_key is required when mode is shard.")
+            _validate_identifier(self.shard_key, "shard_key")
+
+        if len(self.targets) != len(set(self.targets)):
+            raise ValueError("targets must be unique.")
+
+        return self
+
 
 def _validate_identifier(value: str, what: str) -> str:
     v = value.strip()
@@ -95,5 +378,236 @@ def _validate_identifier(value: str, what: str) -> str:
     return v
 
 
+class AmplifyPayload(BaseModel):
+    table_name: str
+    factor: int
+    perturb: bool = False
+
+    @field_validator("table_name")
+    @classmethod
+    def validate_table_name(cls, v: str) -> str:
+        return _validate_identifier(v, "table_name")
+
+    @field_validator("factor")
+    @classmethod
+    def validate_factor(cls, v: int) -> int:
+        if v < 2:
+            raise ValueError("factor must be at least 2.")
+        return v
+
+
+class MaintenancePayload(BaseModel):
+    tables: List[str]
+    freeze: bool = True
+
+    @field_validator("tables")
+    @classmethod
+    def validate_tables(cls, v: List[str]) -> List[str]:
+        if len(v) == 0:
+            raise ValueError("tables must not be empty.")
+        return [_validate_identifier(table_name, "table_name") for table_name in v]
+
+
+class IndexBuildPayload(BaseModel):
+    tables: List[str]
+
+    @field_validator("tables")
+    @classmethod
+    def validate_tables(cls, v: List[str]) -> List[str]:
+        if len(v) == 0:
+            raise ValueError("tables must not be empty.")
+        return [_validate_identifier(table_name, "table_name") for table_name in v]
+
+
 class LeetCodeTablePayload(BaseModel):
     sql_query: str
+
+
+class SizedGeneratePayload(BaseModel):
+    tables: Dict[str, float]
+    scale_factor: float | None = None
+    target_size: str | None = None
+
+    @field_validator("tables")
+    @classmethod
+    def validate_tables(cls, v: Dict[str, float]) -> Dict[str, float]:
+        if len(v) == 0:
+            raise ValueError("tables must contain at least one table.")
+
+        tables = {}
+        for table_name, ratio in v.items():
+            if ratio <= 0:
+                raise ValueError("tables ratios must be positive numbers.")
+            tables[_validate_identifier(table_name, "table_name")] = ratio
+        return tables
+
+    @model_validator(mode="after")
+    def validate_size(self):
+        if (self.scale_factor is None) == (self.target_size is None):
+            raise ValueError("Exactly one of scale_factor or target_size is required.")
+
+        if self.scale_factor is not None and self.scale_factor <= 0:
+            raise ValueError("scale_factor must be a positive number.")
+
+        if self.target_size is not None:
+            self.get_target_bytes()
+
+        return self
+
+    def get_target_bytes(self) -> int | None:
+        if self.target_size is None:
+            return None
+
+        match = SIZE_RE.fullmatch(self.target_size.strip().upper())
+        if not match:
+            raise ValueError(
+                "target_size must look like 500MB, 20GB or 1.5TB (units: B, kB, MB, GB, TB)."
+            )
+        return int(float(match.group(1)) * SIZE_UNITS[match.group(2) or "B"])
+
+
+class StatsGeneratePayload(BaseModel):
+    source_table: str
+    target_table: str
+    row_number: int | None = None
+
+    @field_validator("source_table", "target_table")
+    @classmethod
+    def validate_table_name(cls, v: str) -> str:
+        return _validate_identifier(v, "table_name")
+
+    @model_validator(mode="after")
+    def validate_tables(self):
+        if self.source_table == self.target_table:
+            raise ValueError("target_table must differ from source_table.")
+
+        if self.row_number is not None and self.row_number <= 0:
+            raise ValueError("row_number must be a positive number.")
+
+        return self
+
+
+class ColumnStats(BaseModel):
+    column_name: str
+    null_frac: float = 0
+    n_distinct: float = 0
+    most_common_vals: List[str] = []
+    most_common_freqs: List[float] = []
+    histogram_bounds: List[str] = []
+    correlation: float | None = None
+
+
+class WorkloadQuery(BaseModel):
+    name: str
+    sql: str
+    weight: float = 1
+
+    @model_validator(mode="after")
+    def validate_query(self):
+        if self.weight <= 0:
+            raise ValueError("queries[].weight must be a positive number.")
+
+        if len(self.sql.strip()) == 0:
+            raise ValueError("queries[].sql must not be empty.")
+
+        return self
+
+
+class WorkloadPayload(BaseModel):
+    name: str
+    queries: List[WorkloadQuery]
+    clients: int = 10
+    duration_seconds: float | None = 10
+    transactions: int | None = None
+    target_rate: float | None = None
+
+    @model_validator(mode="after")
+    def validate_workload(self):
+        if len(self.queries) == 0:
+            raise ValueError("queries must contain at least one query.")
+
+        names = [q.name for q in self.queries]
+        if len(names) != len(set(names)):
+            raise ValueError("queries[].name must be unique within the request.")
+
+        if not 1 <= self.clients <= 1000:
+            raise ValueError("clients must be between 1 and 1000.")
+
+        if self.duration_seconds is None and self.transactions is None:
+            raise ValueError("Either duration_seconds or transactions is required.")
+
+        if self.target_rate is not None and self.target_rate <= 0:
+            raise ValueError("target_rate must be a positive number.")
+
+        return self
+
+
+class ChurnPayload(BaseModel):
+    name: str
+    tables: List[str]
+    clients: int = 4
+    duration_seconds: float = 60
+    target_rate: float | None = 100
+    # share of the key range that is hot, and share of the traffic it gets
+    hot_ratio: float = 0.1
+    hot_share: float = 0.9
+    update_weight: float = 0.8
+    delete_weight: float = 0.1
+    insert_weight: float = 0.1
+
+    @field_validator("tables")
+    @classmethod
+    def validate_tables(cls, v: List[str]) -> List[str]:
+        if len(v) == 0:
+            raise ValueError("tables must not be empty.")
+        return [_validate_identifier(table_name, "table_name") for table_name in v]
+
+    @model_validator(mode="after")
+    def validate_churn(self):
+        if not 1 <= self.clients <= 1000:
+            raise ValueError("clients must be between 1 and 1000.")
+
+        if self.duration_seconds <= 0:
+            raise ValueError("duration_seconds must be a positive number.")
+
+        if self.target_rate is not None and self.target_rate <= 0:
+            raise ValueError("target_rate must be a positive number.")
+
+        if not (0 < self.hot_ratio <= 1 and 0 <= self.hot_share <= 1):
+            raise ValueError("hot_ratio and hot_share must be between 0 and 1.")
+
+        weights = [self.update_weight, self.delete_weight, self.insert_weight]
+        if any(weight < 0 for weight in weights) or sum(weights) == 0:
+            raise ValueError(
+                "Operation weights must not be negative and at least one must be set."
+            )
+
+        return self
+
+
+class ExplainPayload(BaseModel):
+    label: str
+    sql: str
+
+    @model_validator(mode="after")
+    def validate_sql(self):
+        if len(self.sql.strip()) == 0:
+            raise ValueError("sql must not be empty.")
+
+        return self
+
+
+class IndexAdvisorPayload(BaseModel):
+    queries: List[WorkloadQuery]
+    mode: Literal["cost", "runtime"] = "cost"
+
+    @model_validator(mode="after")
+    def validate_queries(self):
+        if len(self.queries) == 0:
+            raise ValueError("queries must contain at least one query.")
+
+        names = [q.name for q in self.queries]
+        if len(names) != len(set(names)):
+            raise ValueError("queries[].name must be unique within the request.")
+
+        return self
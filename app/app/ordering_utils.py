@@ -0,0 +1,224 @@
+import logging
+
+from datetime import timedelta
+from typing import Any, Dict, List, Set
+
+import sqlalchemy
+from sqlalchemy import Column, Table
+
+from app.config import Settings
+from app.models import ColumnOrder, ColumnOrdering
+from app.random_utils import get_random
+
+logger = logging.getLogger(__name__)
+
+SECONDS_PER_DAY = 86_400
+
+
+def is_generated_column(column: Column, unique_columns: List[str]) -> bool:
+    # integer primary keys are left to the database by generate_values
+    return (
+        isinstance(column.type, sqlalchemy.types.Integer)
+        and column.primary_key
+        and column.name not in unique_columns
+    )
+
+
+def validate_ordering(
+    table: Table, ordering: Dict[str, ColumnOrdering], unique_columns: List[str]
+):
+    for name, spec in ordering.items():
+        column = table.columns.get(name)
+        if column is None:
+            raise ValueError("Column {} not found in table {}".format(name, table.name))
+        if is_generated_column(column, unique_columns):
+            raise ValueError(
+                "Column {} is generated by the database and cannot be ordered".format(
+                    name
+                )
+            )
+
+        if spec.order == ColumnOrder.timeseries:
+            if not isinstance(
+                column.type, (sqlalchemy.types.Date, sqlalchemy.types.DateTime)
+            ):
+                raise ValueError(
+                    "Timeseries ordering needs a date column, {} is not one".format(
+                        name
+                    )
+                )
+            if (
+                name in unique_columns
+                and not isinstance(column.type, sqlalchemy.types.DateTime)
+                and spec.step_seconds < SECONDS_PER_DAY
+            ):
+                raise ValueError(
+                    "Unique date column {} needs a step of at least one day".format(
+                        name
+                    )
+                )
+
+        if spec.order == ColumnOrder.clustered:
+            by_column = table.columns.get(spec.by or "")
+            if (
+                by_column is None
+                or by_column.name == name
+                or is_generated_column(by_column, unique_columns)
+            ):
+                raise ValueError(
+                    "Column {} cannot be clustered by {}".format(name, spec.by)
+                )
+            if spec.by in ordering and ordering[spec.by].order == ColumnOrder.clustered:
+                raise ValueError(
+                    "Column {} cannot follow another clustered column".format(name)
+                )
+
+
+def get_value_range(column: Column, settings: Settings) -> tuple | None:
+    if isinstance(column.type, sqlalchemy.types.Integer):
+        return settings.min_int, settings.max_int
+    if isinstance(column.type, sqlalchemy.types.Numeric):
+        return settings.min_float, settings.max_float
+    if isinstance(column.type, (sqlalchemy.types.Date, sqlalchemy.types.DateTime)):
+        return settings.min_date, settings.max_date
+    return None
+
+
+def interpolate(
+    column: Column, lower: Any, upper: Any, position: float, settings: Settings
+):
+    if isinstance(column.type, sqlalchemy.types.Integer):
+        return min(upper, lower + int((upper - lower + 1) * position))
+    if isinstance(column.type, sqlalchemy.types.Numeric):
+        return round(lower + (upper - lower) * position, settings.float_precision)
+    value = lower + (upper - lower) * position
+    if isinstance(column.type, sqlalchemy.types.DateTime):
+        return value
+    return value.date()
+
+
+def sort_batch(values: List, descending: bool) -> List:
+    present = sorted(
+        (value for value in values if value is not None), reverse=descending
+    )
+    return present + [None] * (len(values) - len(present))
+
+
+def displace(values: List, disorder: float):
+    # a share of the rows swap places at random, the rest stay sorted
+    count = round(len(values) * disorder)
+    if count < 2:
+        return
+    positions = get_random().sample(range(len(values)), count)
+    moved = [values[position] for position in positions]
+    get_random().shuffle(moved)
+    for position, value in zip(positions, moved):
+        values[position] = value
+
+
+def get_ordered_values(
+    column: Column,
+    spec: ColumnOrdering,
+    values: List,
+    start_row: int,
+    row_number: int,
+    settings: Settings,
+    keep_values: bool,
+) -> List:
+    value_range = get_value_range(column, settings)
+    indexes = range(start_row, start_row + len(values))
+    if spec.descending:
+        indexes = range(
+            row_number - 1 - start_row, row_number - 1 - start_row - len(values), -1
+        )
+
+    if spec.order == ColumnOrder.timeseries and not keep_values:
+        step = timedelta(seconds=spec.step_seconds)
+        is_date = not isinstance(column.type, sqlalchemy.types.DateTime)
+        result: List[Any] = []
+        for value, index in zip(values, indexes):
+            timestamp = settings.min_date + step * index
+            if value is None:
+                result.append(None)
+            else:
+                result.append(timestamp.date() if is_date else timestamp)
+        return result
+
+    if keep_values or value_range is None:
+        # the generated values stay, only their order within the batch changes
+        result = sort_batch(values, spec.descending)
+    else:
+        # every row gets a value from its own slice of the range, so the
+        # order holds across batches without sorting the whole dataset
+        lower, upper = value_range
+        result = [
+            None
+            if value is None
+            else interpolate(
+                column,
+                lower,
+                upper,
+                (index + get_random().random()) / row_number,
+                settings,
+            )
+            for value, index in zip(values, indexes)
+        ]
+
+    if spec.order == ColumnOrder.partial:
+        displace(result, spec.disorder)
+    return result
+
+
+def cluster_values(values: List, by_values: List, descending: bool) -> List:
+    ranks = sorted(
+        range(len(by_values)),
+        key=lambda i: (by_values[i] is None, by_values[i]),
+    )
+    ordered = sort_batch(values, descending)
+    result: List[Any] = [None] * len(values)
+    for value, row_index in zip(ordered, ranks):
+        result[row_index] = value
+    return result
+
+
+def apply_ordering(
+    rows: List[Dict],
+    table: Table,
+    ordering: Dict[str, ColumnOrdering],
+    start_row: int,
+    row_number: int,
+    settings: Settings,
+    unique_columns: List[str],
+    forced_columns: Set[str],
+):
+    if len(rows) == 0:
+        return
+
+    clustered = []
+    for name, spec in ordering.items():
+        if spec.order == ColumnOrder.clustered:
+            clustered.append((name, spec))
+            continue
+        values = get_ordered_values(
+            table.columns[name],
+            spec,
+            [row[name] for row in rows],
+            start_row,
+            row_number,
+            settings,
+            # forced values must stay in their partition, and random values
+            # could collide in a unique column; timeseries are unique anyway
+            name in forced_columns
+            or (name in unique_columns and spec.order != ColumnOrder.timeseries),
+        )
+        for row, value in zip(rows, values):
+            row[name] = value
+
+    # clustered columns follow the final values of the column they cluster by
+    for name, spec in clustered:
+        assert spec.by is not None
+        values = cluster_values(
+            [row[name] for row in rows], [row[spec.by] for row in rows], spec.descending
+        )
+        for row, value in zip(rows, values):
+            row[name] = value
@@ -0,0 +1,310 @@
+import logging
+
+from datetime import date, timedelta
+from typing import Any, Callable, Dict, List
+
+import sqlalchemy
+from sqlalchemy import Connection, Engine, Table
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.models import PartitionSpec, PartitionStrategy
+from app.random_utils import get_random
+from app.state_utils import table_partitions
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SUFFIX = "default"
+
+
+def get_partition_name(table_name: str, suffix: int | str) -> str:
+    if isinstance(suffix, int):
+        return "{}_p{}".format(table_name, suffix)
+    return "{}_{}".format(table_name, suffix)
+
+
+def parse_bound(value: Any, column_type: sqlalchemy.types.TypeEngine) -> Any:
+    if isinstance(column_type, sqlalchemy.types.Date):
+        return value if isinstance(value, date) else date.fromisoformat(str(value))
+    if isinstance(column_type, sqlalchemy.types.Integer):
+        return int(value)
+    if isinstance(column_type, sqlalchemy.types.Float):
+        return float(value)
+    return value
+
+
+def dump_bound(value: Any) -> Any:
+    return value.isoformat() if isinstance(value, date) else value
+
+
+def dump_partition(partition: Dict) -> Dict:
+    result = {key: dump_bound(value) for key, value in partition.items()}
+    if "values" in partition:
+        result["values"] = [dump_bound(value) for value in partition["values"]]
+    return result
+
+
+def split_range(lower: Any, upper: Any, count: int) -> List:
+    if isinstance(lower, date):
+        days = (upper - lower).days
+        return [lower + timedelta(days=days * i // count) for i in range(count + 1)]
+    if isinstance(lower, int):
+        return [lower + (upper - lower) * i // count for i in range(count + 1)]
+    return [lower + (upper - lower) * i / count for i in range(count + 1)]
+
+
+def get_partition_layout(
+    table_name: str, spec: PartitionSpec, column_type: sqlalchemy.types.TypeEngine
+) -> List[Dict]:
+    if spec.strategy == PartitionStrategy.hash:
+        assert spec.partitions is not None
+        return [
+            {
+                "name": get_partition_name(table_name, i),
+                "modulus": spec.partitions,
+                "remainder": i,
+            }
+            for i in range(spec.partitions)
+        ]
+
+    layout = []
+    if spec.strategy == PartitionStrategy.range:
+        bounds = [parse_bound(value, column_type) for value in spec.bounds]
+        if spec.partitions is not None:
+            bounds = split_range(bounds[0], bounds[1], spec.partitions)
+        if any(lower >= upper for lower, upper in zip(bounds, bounds[1:])):
+            raise ValueError(
+                "partition.bounds must be strictly ascending and wide enough "
+                "for every partition."
+            )
+        for i, (lower, upper) in enumerate(zip(bounds, bounds[1:])):
+            layout.append(
+                {"name": get_partition_name(table_name, i), "from": lower, "to": upper}
+            )
+    else:
+        for i, values in enumerate(spec.bounds):
+            layout.append(
+                {
+                    "name": get_partition_name(table_name, i),
+                    "values": [parse_bound(value, column_type) for value in values],
+                }
+            )
+
+    # generated values never miss a range or a list, but NULLs and later
+    # manual inserts still need somewhere to go
+    layout.append({"name": get_partition_name(table_name, DEFAULT_SUFFIX)})
+    return layout
+
+
+def get_partition_bound_clause(
+    partition: Dict,
+    column_type: sqlalchemy.types.TypeEngine,
+    dialect: sqlalchemy.Dialect,
+) -> str:
+    def render(value: Any) -> str:
+        return str(
+            sqlalchemy.literal(value, column_type).compile(
+                dialect=dialect, compile_kwargs={"literal_binds": True}
+            )
+        )
+
+    if "modulus" in partition:
+        return "FOR VALUES WITH (MODULUS {}, REMAINDER {})".format(
+            partition["modulus"], partition["remainder"]
+        )
+    if "values" in partition:
+        return "FOR VALUES IN ({})".format(
+            ", ".join(render(value) for value in partition["values"])
+        )
+    if "from" in partition:
+        return "FOR VALUES FROM ({}) TO ({})".format(
+            render(partition["from"]), render(partition["to"])
+        )
+    return "DEFAULT"
+
+
+def create_partition_tables(
+    conn: Connection, table: Table, column: str, layout: List[Dict]
+):
+    logger.info("Creating {} partitions of table {}".format(len(layout), table.name))
+
+    preparer = conn.dialect.identifier_preparer
+    column_type = table.columns[column].type
+    for partition in layout:
+        conn.execute(
+            sqlalchemy.text(
+                "CREATE TABLE {} PARTITION OF {} {}".format(
+                    preparer.quote(partition["name"]),
+                    preparer.format_table(table),
+                    get_partition_bound_clause(partition, column_type, conn.dialect),
+                )
+            )
+        )
+
+
+def create_partitions(
+    conn: Connection, table: Table, spec: PartitionSpec, layout: List[Dict]
+):
+    create_partition_tables(conn, table, spec.column, layout)
+    conn.execute(
+        sqlalchemy.insert(table_partitions).values(
+            table_name=table.name,
+            strategy=spec.strategy.value,
+            column=spec.column,
+            partitions=[dump_partition(partition) for partition in layout],
+        )
+    )
+
+
+def forget_partitions(conn: Connection, table_name: str):
+    conn.execute(
+        sqlalchemy.delete(table_partitions).where(
+            table_partitions.c.table_name == table_name
+        )
+    )
+
+
+def get_table_partitions(engine: Engine, table: Table) -> Dict | None:
+    stmt = sqlalchemy.select(table_partitions).where(
+        table_partitions.c.table_name == table.name
+    )
+    with engine.connect() as conn:
+        row = conn.execute(stmt).first()
+    if row is None:
+        return None
+
+    column = table.columns.get(row.column)
+    if column is None:
+        # recreated outside the API, the stored layout no longer describes it
+        logger.warning(
+            "Table {} has no partition column {}, ignoring its stored layout".format(
+                table.name, row.column
+            )
+        )
+        return None
+
+    column_type = column.type
+    layout = []
+    for partition in row.partitions:
+        for key in ("from", "to"):
+            if key in partition:
+                partition[key] = parse_bound(partition[key], column_type)
+        if "values" in partition:
+            partition["values"] = [
+                parse_bound(value, column_type) for value in partition["values"]
+            ]
+        layout.append(partition)
+
+    return {"strategy": row.strategy, "column": row.column, "partitions": layout}
+
+
+def split_rows(row_number: int, count: int) -> List[int]:
+    return [
+        row_number // count + (1 if i < row_number % count else 0) for i in range(count)
+    ]
+
+
+def get_key_values_generator(
+    partition: Dict, unique: bool, row_number: int
+) -> Callable[[int, int], List]:
+    if "values" in partition:
+        values = partition["values"]
+        return lambda start, count: get_random().choices(values, k=count)
+
+    lower, upper = partition["from"], partition["to"]
+    if isinstance(lower, date):
+        days = (upper - lower).days
+        if unique and days < row_number:
+            raise ValueError(
+                "Partition {} holds only {} unique dates".format(
+                    partition["name"], days
+                )
+            )
+        if unique:
+            return lambda start, count: [
+                lower + timedelta(days=start + i) for i in range(count)
+            ]
+        return lambda start, count: [
+            lower + timedelta(days=get_random().randrange(days)) for _ in range(count)
+        ]
+
+    if isinstance(lower, int):
+        if unique and upper - lower < row_number:
+            raise ValueError(
+                "Partition {} holds only {} unique values".format(
+                    partition["name"], upper - lower
+                )
+            )
+        if unique:
+            return lambda start, count: list(
+                range(lower + start, lower + start + count)
+            )
+        return lambda start, count: [
+            get_random().randrange(lower, upper) for _ in range(count)
+        ]
+
+    step = (upper - lower) / row_number
+    if unique:
+        return lambda start, count: [lower + step * (start + i) for i in range(count)]
+    # random() is < 1, so the upper bound of the partition is never hit
+    return lambda start, count: [
+        lower + (upper - lower) * get_random().random() for _ in range(count)
+    ]
+
+
+def plan_partition_loads(
+    table: Table, partitioning: Dict, row_number: int, unique_columns: List[str]
+) -> List[Dict]:
+    column = table.columns[partitioning["column"]]
+    partitions = [
+        partition
+        for partition in partitioning["partitions"]
+        if not partition["name"].endswith("_" + DEFAULT_SUFFIX)
+    ]
+    unique = column.primary_key or column.name in unique_columns
+
+    loads = []
+    row_offset = 0
+    for partition, partition_rows in zip(
+        partitions, split_rows(row_number, len(partitions))
+    ):
+        if partition_rows == 0:
+            continue
+
+        if partitioning["strategy"] == PartitionStrategy.hash.value:
+            # hash routing happens in Postgres, so loaders write to the parent
+            # and only keep their unique counters apart
+            target: Any = table
+            column_values = {}
+        else:
+            target = sqlalchemy.table(
+                partition["name"],
+                *[sqlalchemy.column(c.name, c.type) for c in table.columns],
+                schema=table.schema,
+            )
+            column_values = {
+                column.name: get_key_values_generator(partition, unique, partition_rows)
+            }
+
+        loads.append(
+            {
+                "partition": partition["name"],
+                "target": target,
+                "row_number": partition_rows,
+                "row_offset": row_offset,
+                "column_values": column_values,
+            }
+        )
+        row_offset += partition_rows
+
+    return loads
+
+
+async def get_partition_row_counts(table: Table, engine: AsyncEngine) -> Dict[str, int]:
+    statement = sqlalchemy.text(
+        "SELECT tableoid::regclass::text, count(*) FROM {} GROUP BY 1 ORDER BY 1".format(
+            engine.dialect.identifier_preparer.format_table(table)
+        )
+    )
+    async with engine.connect() as conn:
+        rows = (await conn.execute(statement)).fetchall()
+    return {row[0]: row[1] for row in rows}
@@ -0,0 +1,348 @@
+import asyncio
+import logging
+
+import random
+from concurrent.futures import Executor
+from datetime import date, datetime, timedelta
+from typing import Any, Callable, Dict, List, TYPE_CHECKING
+
+import sqlalchemy
+from sqlalchemy import Column, Engine, Table
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import Settings
+from app.data_content_utils import (
+    generate_single_value,
+    get_faker,
+    seed_generators,
+)
+from app.models import ColumnStats
+
+logger = logging.getLogger(__name__)
+
+if TYPE_CHECKING:
+    from faker import Faker
+
+# anyarray columns cannot be fetched directly, so they are cast to text[];
+# a table with inheritance children also has rows over the whole tree, the
+# table's own rows win and a partitioned parent only has the inherited ones
+STATS_QUERY = sqlalchemy.text(
+    """
+    SELECT DISTINCT ON (attname)
+           attname,
+           null_frac,
+           n_distinct,
+           most_common_vals::text::text[] AS most_common_vals,
+           most_common_freqs,
+           histogram_bounds::text::text[] AS histogram_bounds,
+           correlation
+    FROM pg_stats
+    WHERE schemaname = :schema_name AND tablename = :table_name
+    ORDER BY attname, inherited
+    """
+)
+
+ESTIMATED_ROWS_QUERY = sqlalchemy.text(
+    """
+    SELECT c.reltuples::bigint
+    FROM pg_class c
+    JOIN pg_namespace n ON n.oid = c.relnamespace
+    WHERE n.nspname = :schema_name AND c.relname = :table_name
+    """
+)
+
+
+def get_table_stats(table: Table, engine: Engine) -> Dict[str, ColumnStats]:
+    logger.info("Reading pg_stats for table {}".format(table.name))
+
+    params = {"schema_name": table.schema or "public", "table_name": table.name}
+    try:
+        with engine.connect() as conn:
+            rows = conn.execute(STATS_QUERY, params).fetchall()
+    except Exception as e:
+        logger.error("Error reading pg_stats for table {}: {}".format(table.name, e))
+        raise e
+
+    if len(rows) == 0:
+        raise ValueError(
+            "No statistics found for table {}. Run ANALYZE on it first.".format(
+                table.name
+            )
+        )
+
+    stats = {}
+    for row in rows:
+        stats[row[0]] = ColumnStats(
+            column_name=row[0],
+            null_frac=row[1] or 0,
+            n_distinct=row[2] or 0,
+            most_common_vals=row[3] or [],
+            most_common_freqs=row[4] or [],
+            histogram_bounds=row[5] or [],
+            correlation=row[6],
+        )
+
+    logger.info("Found statistics for {} columns".format(len(stats)))
+
+    return stats
+
+
+def get_estimated_row_count(table: Table, engine: Engine) -> int:
+    params = {"schema_name": table.schema or "public", "table_name": table.name}
+    with engine.connect() as conn:
+        result = conn.execute(ESTIMATED_ROWS_QUERY, params).first()
+
+    if result is None or result[0] is None or result[0] < 0:
+        return 0
+    return int(result[0])
+
+
+def analyze_table(table: Table, engine: Engine):
+    logger.info("Analyzing table {}".format(table.name))
+
+    table_name = engine.dialect.identifier_preparer.format_table(table)
+    with engine.begin() as conn:
+        conn.execute(sqlalchemy.text("ANALYZE {}".format(table_name)))
+
+
+def get_value_parser(field: Column) -> Callable[[str], object]:
+    if isinstance(field.type, sqlalchemy.types.Boolean):
+        return lambda value: value in {"t", "true"}
+    if isinstance(field.type, sqlalchemy.types.Integer):
+        return int
+    if isinstance(field.type, sqlalchemy.types.Numeric):
+        return float
+    if isinstance(field.type, sqlalchemy.types.DateTime):
+        return datetime.fromisoformat
+    if isinstance(field.type, sqlalchemy.types.Date):
+        return date.fromisoformat
+    return str
+
+
+def get_distinct_count(stats: ColumnStats, row_number: int) -> int:
+    # negative n_distinct is a fraction of the row count, positive is absolute
+    if stats.n_distinct < 0:
+        return max(1, round(-stats.n_distinct * row_number))
+    return max(1, round(stats.n_distinct))
+
+
+def interpolate_value(low, high, position: float, field: Column):
+    if isinstance(low, bool) or low == high:
+        return low
+    if isinstance(low, int):
+        return low + round((high - low) * position)
+    if isinstance(low, float):
+        return low + (high - low) * position
+    if isinstance(low, datetime):
+        return low + timedelta(seconds=round((high - low).total_seconds() * position))
+    if isinstance(low, date):
+        return low + timedelta(days=round((high - low).days * position))
+
+    # strings can't be interpolated, so keep the lower bound and make it distinct
+    value = "{}_{}".format(low, round(position * 1_000_000))
+    length = getattr(field.type, "length", None)
+    return value[:length] if length else value
+
+
+def generate_unique_column(
+    field: Column,
+    stats: ColumnStats,
+    start_row: int,
+    batch_rows: int,
+    total_rows: int,
+) -> List:
+    parse = get_value_parser(field)
+    bounds: List[Any] = [parse(value) for value in stats.histogram_bounds]
+    low = bounds[0] if bounds else 0
+    high = bounds[-1] if bounds else total_rows
+
+    length = getattr(field.type, "length", None)
+    descending = (stats.correlation or 0) < 0
+    values: List = []
+    for index in range(start_row, start_row + batch_rows):
+        # a negative correlation runs down over the whole table, not per batch
+        position = total_rows - 1 - index if descending else index
+        if isinstance(low, int) and not isinstance(low, bool):
+            step = max(1, (high - low) // max(total_rows - 1, 1))
+            values.append(low + position * step)
+        elif isinstance(low, float):
+            step = (high - low) / max(total_rows - 1, 1) or 1.0
+            values.append(low + position * step)
+        elif isinstance(low, (date, datetime)):
+            values.append(low + timedelta(days=position))
+        else:
+            value = "{}_{}".format(low, position)
+            if length and len(value) > length:
+                # cut from the front, the suffix is what keeps values distinct
+                value = value[len(value) - length :]
+            values.append(value)
+
+    correlation = abs(stats.correlation or 0)
+    shuffled = [i for i in range(batch_rows) if random.random() >= correlation]
+    shuffled_values = [values[i] for i in shuffled]
+    random.shuffle(shuffled_values)
+    for i, value in zip(shuffled, shuffled_values):
+        values[i] = value
+
+    return values
+
+
+def generate_column_from_stats(
+    field: Column,
+    stats: ColumnStats,
+    fake: "Faker",
+    start_row: int,
+    batch_rows: int,
+    total_rows: int,
+    settings: Settings,
+) -> List:
+    if stats.n_distinct == -1:
+        return generate_unique_column(field, stats, start_row, batch_rows, total_rows)
+
+    parse = get_value_parser(field)
+    common_values = [parse(value) for value in stats.most_common_vals]
+    common_freqs = stats.most_common_freqs[: len(common_values)]
+    bounds = [parse(value) for value in stats.histogram_bounds]
+
+    null_frac = stats.null_frac if field.nullable else 0
+    common_frac = sum(common_freqs)
+    histogram_frac = max(0.0, 1 - null_frac - common_frac) if len(bounds) > 1 else 0
+    if common_frac + histogram_frac == 0 and not common_values:
+        # no usable distribution, fall back to the plain generator
+        return [generate_single_value(field, fake, settings) for _ in range(batch_rows)]
+
+    # equi-depth histogram: every bucket holds the same share of the rows, so the
+    # distinct values left after the MCV list are spread evenly across buckets
+    bucket_count = max(len(bounds) - 1, 1)
+    histogram_distinct = max(
+        get_distinct_count(stats, total_rows) - len(common_values), bucket_count
+    )
+    slots_per_bucket = max(1, histogram_distinct // bucket_count)
+    correlation = stats.correlation or 0
+
+    kinds = random.choices(
+        ("null", "common", "histogram"),
+        weights=(null_frac, common_frac, histogram_frac),
+        k=batch_rows,
+    )
+    common_choices = (
+        random.choices(common_values, weights=common_freqs, k=batch_rows)
+        if common_values
+        else []
+    )
+
+    values: List = []
+    for offset, kind in enumerate(kinds):
+        if kind == "null":
+            values.append(None)
+        elif kind == "common" or len(bounds) < 2:
+            values.append(common_choices[offset])
+        else:
+            if random.random() < abs(correlation):
+                # follow the physical row position to reproduce the correlation
+                position = (start_row + offset) / max(total_rows, 1)
+                if correlation < 0:
+                    position = 1 - position
+                bucket = min(int(position * bucket_count), bucket_count - 1)
+            else:
+                bucket = random.randrange(bucket_count)
+            slot = random.randrange(slots_per_bucket) / slots_per_bucket
+            values.append(
+                interpolate_value(bounds[bucket], bounds[bucket + 1], slot, field)
+            )
+
+    return values
+
+
+def generate_values_from_stats(
+    fields,
+    stats: Dict[str, ColumnStats],
+    fake: "Faker",
+    start_row: int,
+    batch_rows: int,
+    total_rows: int,
+    settings: Settings,
+) -> List[Dict]:
+    if len(fields) == 0:
+        raise ValueError("No fields provided for value generation")
+
+    columns = {}
+    for field in fields:
+        if isinstance(field.type, sqlalchemy.types.Integer) and field.primary_key:
+            continue
+
+        if field.name in stats:
+            columns[field.name] = generate_column_from_stats(
+                field,
+                stats[field.name],
+                fake,
+                start_row,
+                batch_rows,
+                total_rows,
+                settings,
+            )
+        else:
+            columns[field.name] = [
+                generate_single_value(field, fake, settings) for _ in range(batch_rows)
+            ]
+
+    names = list(columns)
+    return [dict(zip(names, row)) for row in zip(*columns.values())]
+
+
+async def insert_values_from_stats(
+    table: Table,
+    stats: Dict[str, ColumnStats],
+    row_number: int,
+    session: AsyncSession,
+    settings: Settings,
+    executor: Executor | None = None,
+) -> int:
+    logger.info(
+        "Generating {} rows for table {} from statistics".format(row_number, table.name)
+    )
+
+    loop = asyncio.get_running_loop()
+    fake = get_faker()
+    seed_generators(fake, settings)
+    inserted = 0
+    for start_row in range(0, row_number, settings.batch_size):
+        batch_rows = min(settings.batch_size, row_number - start_row)
+        chunk = await loop.run_in_executor(
+            executor,
+            generate_values_from_stats,
+            table.columns,
+            stats,
+            fake,
+            start_row,
+            batch_rows,
+            row_number,
+            settings,
+        )
+        try:
+            await session.execute(sqlalchemy.insert(table), chunk)
+            await session.commit()
+            inserted += len(chunk)
+
+            logger.debug("Inserted %d rows", len(chunk))
+        except Exception as e:
+            logger.error("Error inserting rows: {}".format(e))
+            raise e
+
+    return inserted
+
+
+def compare_table_stats(
+    source_stats: Dict[str, ColumnStats], target_stats: Dict[str, ColumnStats]
+) -> Dict[str, Dict]:
+    result = {}
+    for column_name, source in source_stats.items():
+        target = target_stats.get(column_name)
+        if target is None:
+            continue
+        result[column_name] = {
+            "null_frac": [source.null_frac, target.null_frac],
+            "n_distinct": [source.n_distinct, target.n_distinct],
+            "correlation": [source.correlation, target.correlation],
+        }
+    return result
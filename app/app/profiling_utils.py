@@ -0,0 +1,220 @@
+import asyncio
+import logging
+
+import json
+import os
+import re
+import sys
+import threading
+import time
+import tracemalloc
+import uuid
+from collections import Counter
+from typing import Dict, List
+from urllib.parse import parse_qs
+
+from app.config import Settings
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = b"x-profile"
+PROFILE_ID_RE = re.compile(r"^[0-9a-f_]+$")
+TRUE_VALUES = {"1", "true", "yes"}
+ALLOCATION_FILTERS = [
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, __file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<unknown>"),
+]
+
+
+def get_frame_label(frame) -> str:
+    code = frame.f_code
+    path = code.co_filename.replace(os.sep, "/").split("/")
+    # collapsed stacks use ";" between frames
+    return "{}:{}".format("/".join(path[-2:]), code.co_name).replace(";", ",")
+
+
+def get_stack_key(frame, thread_name: str) -> str:
+    labels = []
+    while frame is not None:
+        labels.append(get_frame_label(frame))
+        frame = frame.f_back
+    labels.append(thread_name)
+    return ";".join(reversed(labels))
+
+
+class StackSampler:
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        own_ident = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own_ident:
+                    continue
+                self.stacks[get_stack_key(frame, names.get(ident, str(ident)))] += 1
+            self.samples += 1
+
+    def get_collapsed(self) -> str:
+        return "".join(
+            "{} {}\n".format(stack, count) for stack, count in self.stacks.most_common()
+        )
+
+
+def get_top_allocations(
+    before: tracemalloc.Snapshot, after: tracemalloc.Snapshot, limit: int
+) -> List[Dict]:
+    stats = after.filter_traces(ALLOCATION_FILTERS).compare_to(
+        before.filter_traces(ALLOCATION_FILTERS), "lineno"
+    )
+    return [
+        {
+            "location": "{}:{}".format(
+                stat.traceback[0].filename, stat.traceback[0].lineno
+            ),
+            "size_bytes": stat.size_diff,
+            "count": stat.count_diff,
+        }
+        for stat in stats[:limit]
+        if stat.size_diff > 0
+    ]
+
+
+def is_profile_requested(scope: Dict) -> bool:
+    for name, value in scope.get("headers", []):
+        if name == PROFILE_HEADER and value.decode().lower() in TRUE_VALUES:
+            return True
+    query = parse_qs(scope.get("query_string", b"").decode())
+    return any(value.lower() in TRUE_VALUES for value in query.get("profile", []))
+
+
+def get_profile_path(settings: Settings, profile_id: str, extension: str) -> str:
+    if not PROFILE_ID_RE.fullmatch(profile_id):
+        raise ValueError("Invalid profile id {}".format(profile_id))
+    return os.path.join(settings.profile_dir, "{}.{}".format(profile_id, extension))
+
+
+def save_profile(settings: Settings, report: Dict, collapsed: str):
+    logger.info("Saving profile {}".format(report["id"]))
+
+    os.makedirs(settings.profile_dir, exist_ok=True)
+    with open(get_profile_path(settings, report["id"], "collapsed"), "w") as f:
+        f.write(collapsed)
+    with open(get_profile_path(settings, report["id"], "json"), "w") as f:
+        json.dump(report, f)
+
+
+def get_profiles(settings: Settings) -> List[Dict]:
+    if not os.path.isdir(settings.profile_dir):
+        return []
+
+    result = []
+    for name in sorted(os.listdir(settings.profile_dir), reverse=True):
+        if name.endswith(".json"):
+            report = get_profile(settings, name[: -len(".json")])
+            if report is not None:
+                report.pop("allocations", None)
+                result.append(report)
+    return result
+
+
+def get_profile(settings: Settings, profile_id: str) -> Dict | None:
+    path = get_profile_path(settings, profile_id, "json")
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def get_collapsed_stacks(settings: Settings, profile_id: str) -> str | None:
+    path = get_profile_path(settings, profile_id, "collapsed")
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return f.read()
+
+
+class ProfilingMiddleware:
+    # a plain ASGI middleware: requests without the flag go straight through
+    def __init__(self, app, settings: Settings):
+        self.app = app
+        self.settings = settings
+        # the sampler and tracemalloc are process-wide
+        self.lock = asyncio.Lock()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not is_profile_requested(scope):
+            await self.app(scope, receive, send)
+            return
+
+        async with self.lock:
+            await self.profile(scope, receive, send)
+
+    async def profile(self, scope, receive, send):
+        profile_id = "{}_{}".format(time.strftime("%Y%m%d%H%M%S"), uuid.uuid4().hex[:8])
+        response = {}
+
+        async def send_with_profile_id(message):
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"x-profile-id", profile_id.encode())
+                ]
+            await send(message)
+
+        started_tracing = not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start(self.settings.profile_traceback_depth)
+        # snapshots and their diff walk every traced block, so they are
+        # taken off the event loop and do not stall the other requests
+        before = await asyncio.to_thread(tracemalloc.take_snapshot)
+        sampler = StackSampler(self.settings.profile_interval)
+        sampler.start()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            duration_seconds = time.perf_counter() - started
+            sampler.stop()
+            after = await asyncio.to_thread(tracemalloc.take_snapshot)
+            if started_tracing:
+                tracemalloc.stop()
+            allocations = await asyncio.to_thread(
+                get_top_allocations,
+                before,
+                after,
+                self.settings.profile_top_allocations,
+            )
+
+            report = {
+                "id": profile_id,
+                "method": scope["method"],
+                "path": scope["path"],
+                "status": response.get("status"),
+                "duration_seconds": round(duration_seconds, 3),
+                "samples": sampler.samples,
+                "interval_seconds": self.settings.profile_interval,
+                "allocations": allocations,
+            }
+            await asyncio.to_thread(
+                save_profile, self.settings, report, sampler.get_collapsed()
+            )
+            logger.info(
+                "Profiled {} {} in {:.3f}s: {} samples".format(
+                    scope["method"], scope["path"], duration_seconds, sampler.samples
+                )
+            )
@@ -0,0 +1,14 @@
+import random
+from contextvars import ContextVar
+
+# the instance behind the module-level functions, seeded by seed_generators
+shared_random: random.Random = random.random.__self__  # type: ignore[attr-defined]
+
+# a job batch draws from its own generator, so parallel jobs can reseed
+# without waiting for each other
+random_var: ContextVar[random.Random | None] = ContextVar("random", default=None)
+
+
+def get_random() -> random.Random:
+    rng = random_var.get()
+    return rng if rng is not None else shared_random
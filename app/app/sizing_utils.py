@@ -0,0 +1,146 @@
+import logging
+
+from typing import Dict, List, TYPE_CHECKING
+
+import sqlalchemy
+from sqlalchemy import Table
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.config import Settings
+from app.data_content_utils import generate_values
+
+logger = logging.getLogger(__name__)
+
+if TYPE_CHECKING:
+    from faker import Faker
+
+# heap tuple header (23 bytes, aligned to 24) plus the 4 byte line pointer
+TUPLE_OVERHEAD = 28
+MAX_ALIGN = 8
+# usable space of an 8 kB heap page after the 24 byte page header
+PAGE_SIZE = 8192
+PAGE_USABLE = PAGE_SIZE - 24
+
+FIXED_WIDTHS = [
+    (sqlalchemy.types.SmallInteger, 2),
+    (sqlalchemy.types.BigInteger, 8),
+    (sqlalchemy.types.Integer, 4),
+    (sqlalchemy.types.Float, 8),
+    (sqlalchemy.types.DateTime, 8),
+    (sqlalchemy.types.Date, 4),
+    (sqlalchemy.types.Boolean, 1),
+]
+
+RELATION_SIZES_QUERY = sqlalchemy.text(
+    """
+    SELECT pg_table_size(c.oid), pg_indexes_size(c.oid), pg_total_relation_size(c.oid)
+    FROM pg_class c
+    JOIN pg_namespace n ON n.oid = c.relnamespace
+    WHERE n.nspname = :schema_name AND c.relname = :table_name
+    """
+)
+
+
+def get_fixed_width(field) -> int | None:
+    for type_, width in FIXED_WIDTHS:
+        if isinstance(field.type, type_):
+            return width
+    return None
+
+
+def get_value_width(value) -> int:
+    # short varlena values carry a 1 byte header
+    return len(str(value).encode("utf-8")) + 1
+
+
+def estimate_row_width(
+    table: Table, fake: "Faker", settings: Settings, unique_columns: List[str]
+) -> int:
+    logger.info("Estimating row width for table {}".format(table.name))
+
+    sample = generate_values(
+        table.columns, fake, settings.size_sample_rows, settings, unique_columns
+    )
+    row_width = get_row_width(table, sample)
+
+    logger.info("Estimated row width for table {}: {}".format(table.name, row_width))
+
+    return row_width
+
+
+def get_row_width(table: Table, sample: List[Dict]) -> int:
+    width = 0.0
+    for field in table.columns:
+        fixed_width = get_fixed_width(field)
+        if field.name not in sample[0]:
+            # identity columns are filled by Postgres
+            width += fixed_width or 8
+            continue
+
+        values = [row[field.name] for row in sample if row[field.name] is not None]
+        if len(values) == 0:
+            continue
+        not_null_ratio = len(values) / len(sample)
+        if fixed_width is not None:
+            width += fixed_width * not_null_ratio
+        else:
+            width += sum(get_value_width(v) for v in values) / len(sample)
+
+    row_width = TUPLE_OVERHEAD + int(width)
+    row_width += -row_width % MAX_ALIGN
+    return row_width
+
+
+def estimate_table_bytes(row_width: int, row_number: int) -> int:
+    rows_per_page = max(1, PAGE_USABLE // row_width)
+    return -(-row_number // rows_per_page) * PAGE_SIZE
+
+
+def compute_row_counts(
+    ratios: Dict[str, float],
+    row_widths: Dict[str, int],
+    settings: Settings,
+    scale_factor: float | None = None,
+    target_bytes: int | None = None,
+) -> Dict[str, int]:
+    if scale_factor is not None:
+        return {
+            table_name: max(1, round(scale_factor * ratio * settings.scale_factor_rows))
+            for table_name, ratio in ratios.items()
+        }
+
+    if target_bytes is None:
+        raise ValueError("Either scale_factor or target_bytes is required")
+
+    # bytes taken by one "unit" of the requested ratios, including page overhead
+    unit_bytes = sum(
+        ratio * row_widths[table_name] * PAGE_SIZE / PAGE_USABLE
+        for table_name, ratio in ratios.items()
+    )
+    units = target_bytes / unit_bytes
+    return {
+        table_name: max(1, round(units * ratio)) for table_name, ratio in ratios.items()
+    }
+
+
+async def get_relation_sizes(table: Table, engine: AsyncEngine) -> Dict[str, int]:
+    logger.info("Getting relation size for table {}".format(table.name))
+
+    params = {"schema_name": table.schema or "public", "table_name": table.name}
+    try:
+        async with engine.connect() as conn:
+            result = (await conn.execute(RELATION_SIZES_QUERY, params)).first()
+    except Exception as e:
+        logger.error(
+            "Error getting relation size for table {}: {}".format(table.name, e)
+        )
+        raise e
+
+    if result is None:
+        return {"table_bytes": 0, "indexes_bytes": 0, "total_bytes": 0}
+
+    return {
+        "table_bytes": result[0],
+        "indexes_bytes": result[1],
+        "total_bytes": result[2],
+    }
@@ -0,0 +1,106 @@
+import logging
+
+import sqlalchemy
+from sqlalchemy import (
+    Engine,
+    MetaData,
+    Table,
+    Column,
+    BigInteger,
+    Integer,
+    String,
+    Text,
+    Float,
+    DateTime,
+    Identity,
+)
+from sqlalchemy.dialects.postgresql import JSONB
+
+logger = logging.getLogger(__name__)
+
+# service bookkeeping tables, kept apart from the reflected user tables
+state_metadata = MetaData()
+
+workload_runs = Table(
+    "_workload_runs",
+    state_metadata,
+    Column("id", Integer, Identity(), primary_key=True),
+    Column("name", String(255), nullable=False, index=True),
+    Column("created_at", DateTime, server_default=sqlalchemy.func.now()),
+    Column("duration_seconds", Float),
+    Column("dataset", JSONB),
+    Column("parameters", JSONB),
+    Column("result", JSONB),
+)
+
+explain_runs = Table(
+    "_explain_runs",
+    state_metadata,
+    Column("id", Integer, Identity(), primary_key=True),
+    Column("label", String(255), nullable=False, index=True),
+    Column("created_at", DateTime, server_default=sqlalchemy.func.now()),
+    Column("sql", Text, nullable=False),
+    Column("planning_time_ms", Float),
+    Column("execution_time_ms", Float),
+    Column("plan", JSONB),
+    Column("dataset", JSONB),
+    Column("settings", JSONB),
+)
+
+table_partitions = Table(
+    "_table_partitions",
+    state_metadata,
+    Column("table_name", String(255), primary_key=True),
+    Column("strategy", String(16), nullable=False),
+    Column("column", String(255), nullable=False),
+    Column("partitions", JSONB, nullable=False),
+)
+
+table_indexes = Table(
+    "_table_indexes",
+    state_metadata,
+    Column("table_name", String(255), primary_key=True),
+    Column("name", String(255), primary_key=True),
+    Column("definition", JSONB, nullable=False),
+    Column("status", String(16), nullable=False),
+    Column("build_seconds", Float),
+    Column("size_bytes", BigInteger),
+    Column("error", Text),
+    Column("updated_at", DateTime, server_default=sqlalchemy.func.now()),
+)
+
+generation_jobs = Table(
+    "_generation_jobs",
+    state_metadata,
+    Column("id", Integer, Identity(), primary_key=True),
+    Column("table_name", String(255), nullable=False, index=True),
+    # partition written by this job, NULL when rows go through the table itself
+    Column("target", String(255)),
+    Column("status", String(16), nullable=False),
+    Column("created_at", DateTime, server_default=sqlalchemy.func.now()),
+    Column("updated_at", DateTime, server_default=sqlalchemy.func.now()),
+    Column("seed", BigInteger, nullable=False),
+    Column("batch_size", Integer, nullable=False),
+    Column("plan_rows", BigInteger, nullable=False),
+    Column("row_number", BigInteger, nullable=False),
+    Column("row_offset", BigInteger, nullable=False),
+    Column("rows_inserted", BigInteger, nullable=False),
+    Column("last_batch", Integer, nullable=False),
+    Column("counter_state", JSONB, nullable=False),
+    Column("error", Text),
+    Column("ordering", JSONB),
+)
+
+
+def ensure_state_tables(engine: Engine):
+    logger.info("Creating service state tables")
+
+    try:
+        state_metadata.create_all(engine, checkfirst=True)
+    except Exception as e:
+        logger.error("Error creating service state tables: {}".format(e))
+        raise e
+
+
+def is_state_table(table_name: str) -> bool:
+    return table_name in state_metadata.tables
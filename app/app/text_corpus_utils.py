@@ -0,0 +1,158 @@
+import logging
+
+import random
+import threading
+from array import array
+from collections import defaultdict
+from typing import Dict, List, TYPE_CHECKING, Tuple
+
+
+from app.config import Settings
+from app.random_utils import get_random
+
+logger = logging.getLogger(__name__)
+
+if TYPE_CHECKING:
+    from faker import Faker
+
+_corpus_cache: Dict[Tuple, "TextCorpus"] = {}
+# generation threads wait for the first build instead of each building a copy
+_corpus_lock = threading.Lock()
+
+
+class TextCorpus:
+    def __init__(self, words: List[str]):
+        if len(words) < 2:
+            raise ValueError("Text corpus needs at least two words")
+
+        self.buffer = " ".join(words) + " "
+        # offset of every word start, plus the end of the buffer
+        self.word_starts = array("Q", [0])
+        for word in words:
+            self.word_starts.append(self.word_starts[-1] + len(word) + 1)
+
+    @property
+    def word_count(self) -> int:
+        return len(self.word_starts) - 1
+
+    def sample(
+        self,
+        count: int,
+        min_words: int,
+        max_words: int,
+        max_length: int | None = None,
+    ) -> List[str]:
+        max_words = min(max_words, self.word_count)
+        min_words = min(min_words, max_words)
+        buffer = self.buffer
+        starts = self.word_starts
+        last_start = self.word_count
+
+        result = []
+        rng = get_random()
+        for word_count in rng.choices(range(min_words, max_words + 1), k=count):
+            first = rng.randrange(last_start - word_count + 1)
+            text = buffer[starts[first] : starts[first + word_count] - 1]
+            result.append(text[:max_length] if max_length else text)
+        return result
+
+
+def train_markov_chain(sentences: List[str]) -> Dict[str, List[str]]:
+    chain: Dict[str, List[str]] = defaultdict(list)
+    for sentence in sentences:
+        previous = ""
+        for word in sentence.split():
+            chain[previous].append(word)
+            # a sentence end starts a new chain, so words after "." read like openers
+            previous = "" if word.endswith(".") else word
+    return chain
+
+
+def walk_markov_chain(
+    chain: Dict[str, List[str]], size: int, rng: random.Random
+) -> List[str]:
+    words: List[str] = []
+    length = 0
+    previous = ""
+    while length < size:
+        followers = chain.get(previous) or chain[""]
+        word = rng.choice(followers)
+        words.append(word)
+        length += len(word) + 1
+        previous = "" if word.endswith(".") else word
+    return words
+
+
+def read_corpus_file(path: str) -> List[str]:
+    logger.info("Reading text corpus from {}".format(path))
+
+    with open(path, encoding="utf-8") as corpus_file:
+        words = corpus_file.read().split()
+
+    if len(words) < 2:
+        raise ValueError("Text corpus file {} has fewer than two words".format(path))
+    return words
+
+
+def build_text_corpus(fake: "Faker", settings: Settings) -> TextCorpus:
+    logger.info(
+        "Building text corpus of {} characters".format(settings.text_corpus_size)
+    )
+
+    rng = random.Random(settings.seed)
+    if settings.text_corpus_file:
+        source_words = read_corpus_file(settings.text_corpus_file)
+        sentences = [" ".join(source_words)]
+    else:
+        source_words = fake.get_words_list()
+        sentences = (
+            fake.sentences(nb=settings.text_markov_sentences)
+            if settings.text_corpus_markov
+            else []
+        )
+
+    if settings.text_corpus_markov:
+        words = walk_markov_chain(
+            train_markov_chain(sentences), settings.text_corpus_size, rng
+        )
+    else:
+        words = []
+        length = 0
+        while length < settings.text_corpus_size:
+            # a real text is kept in order and repeated, a word list is shuffled
+            chunk = (
+                source_words
+                if settings.text_corpus_file
+                else rng.choices(source_words, k=len(source_words))
+            )
+            words.extend(chunk)
+            length += sum(len(word) + 1 for word in chunk)
+
+    return TextCorpus(words)
+
+
+def get_text_corpus(fake: "Faker", settings: Settings) -> TextCorpus:
+    key = (
+        settings.text_corpus_size,
+        settings.text_corpus_file,
+        settings.text_corpus_markov,
+        settings.seed,
+    )
+    corpus = _corpus_cache.get(key)
+    if corpus is None:
+        with _corpus_lock:
+            corpus = _corpus_cache.get(key)
+            if corpus is None:
+                corpus = _corpus_cache[key] = build_text_corpus(fake, settings)
+    return corpus
+
+
+def generate_texts(
+    fake: "Faker", settings: Settings, count: int, max_length: int | None = None
+) -> List[str]:
+    return get_text_corpus(fake, settings).sample(
+        count,
+        settings.text_min_word_count,
+        settings.text_max_word_count,
+        max_length,
+    )
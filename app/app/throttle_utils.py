@@ -0,0 +1,167 @@
+import asyncio
+import logging
+
+import time
+from typing import Dict, List
+
+import sqlalchemy
+from prometheus_client import Counter
+from sqlalchemy import Table
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.batching_utils import ROW_WIDTH_SAMPLE
+from app.config import Settings
+from app.models import ThrottleSpec
+from app.sizing_utils import get_row_width
+
+logger = logging.getLogger(__name__)
+
+PRESSURE_QUERY = sqlalchemy.text(
+    """
+    SELECT
+        (SELECT coalesce(max(pg_wal_lsn_diff(pg_current_wal_lsn(), replay_lsn)), 0)
+         FROM pg_stat_replication),
+        pg_wal_lsn_diff(pg_current_wal_lsn(), (pg_control_checkpoint()).redo_lsn)
+            / (SELECT setting::float * 1024 * 1024 FROM pg_settings
+               WHERE name = 'max_wal_size')
+    """
+)
+
+throttle_wait_seconds = Counter(
+    "datagen_throttle_wait_seconds",
+    "Time generation jobs waited for the rate limit or a backoff",
+    ["table", "reason"],
+)
+
+
+class TokenBucket:
+    def __init__(self, rate: float):
+        self.rate = rate
+        # one second of burst, a batch larger than that goes into debt
+        self.capacity = rate
+        self.tokens = rate
+        self.updated = time.monotonic()
+
+    def reserve(self, amount: float) -> float:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= amount
+        return max(0.0, -self.tokens / self.rate)
+
+
+def get_pressure_reasons(pressure: Dict, settings: Settings) -> List[str]:
+    reasons = []
+    if pressure["replication_lag_bytes"] > settings.throttle_max_replication_lag_bytes:
+        reasons.append("replication_lag")
+    if pressure["checkpoint_ratio"] > settings.throttle_max_checkpoint_ratio:
+        reasons.append("checkpoint")
+    if pressure["probe_ms"] > settings.throttle_max_probe_ms:
+        reasons.append("latency")
+    return reasons
+
+
+class Throttle:
+    # shared by all loaders of one request, so the limits hold for the sum
+    def __init__(
+        self, table: Table, spec: ThrottleSpec, settings: Settings, engine: AsyncEngine
+    ):
+        self.table = table
+        self.name = table.name
+        self.spec = spec
+        self.settings = settings
+        self.engine = engine
+        self.row_bucket = (
+            TokenBucket(spec.rows_per_second) if spec.rows_per_second else None
+        )
+        self.byte_bucket = (
+            TokenBucket(spec.mb_per_second * 1024**2) if spec.mb_per_second else None
+        )
+        self.backoff_seconds = 0.0
+        self.last_probe: float | None = None
+        self.lock = asyncio.Lock()
+        self.stats: Dict = {
+            "rate_wait_seconds": 0.0,
+            "backoff_wait_seconds": 0.0,
+            "backoffs": 0,
+            "last_pressure": None,
+        }
+
+    async def probe(self) -> Dict:
+        async with self.engine.connect() as conn:
+            lag, checkpoint_ratio = (await conn.execute(PRESSURE_QUERY)).one()
+            started = time.perf_counter()
+            await conn.execute(sqlalchemy.text(self.settings.throttle_probe_sql))
+            probe_ms = (time.perf_counter() - started) * 1000
+        return {
+            "replication_lag_bytes": int(lag),
+            "checkpoint_ratio": round(float(checkpoint_ratio or 0), 3),
+            "probe_ms": round(probe_ms, 3),
+        }
+
+    async def get_backoff(self) -> float:
+        now = time.monotonic()
+        if (
+            self.last_probe is not None
+            and now - self.last_probe < self.settings.throttle_probe_interval
+        ):
+            return 0.0
+        self.last_probe = now
+
+        try:
+            pressure = await self.probe()
+        except Exception as e:
+            # without the probe the load is only rate limited
+            logger.warning("Throttle probe failed: {}".format(e))
+            return 0.0
+        self.stats["last_pressure"] = pressure
+
+        reasons = get_pressure_reasons(pressure, self.settings)
+        if not reasons:
+            self.backoff_seconds = 0.0
+            return 0.0
+
+        # doubles while the pressure lasts
+        self.backoff_seconds = min(
+            max(self.backoff_seconds * 2, self.settings.throttle_backoff_seconds),
+            self.settings.throttle_max_backoff_seconds,
+        )
+        self.stats["backoffs"] += 1
+        logger.info(
+            "Backing off %s for %.1fs: %s",
+            self.name,
+            self.backoff_seconds,
+            ", ".join(reasons),
+            extra={"table": self.name, "reasons": reasons, **pressure},
+        )
+        return self.backoff_seconds
+
+    async def wait(self, rows: List[Dict]):
+        rate_wait = 0.0
+        if self.row_bucket is not None:
+            rate_wait = self.row_bucket.reserve(len(rows))
+        if self.byte_bucket is not None:
+            # the on-disk width, close to what the heap and the WAL receive
+            row_bytes = get_row_width(self.table, rows[:ROW_WIDTH_SAMPLE])
+            rate_wait = max(rate_wait, self.byte_bucket.reserve(row_bytes * len(rows)))
+        if rate_wait > 0:
+            self.stats["rate_wait_seconds"] += rate_wait
+            throttle_wait_seconds.labels(self.name, "rate").inc(rate_wait)
+            await asyncio.sleep(rate_wait)
+
+        if not self.spec.backoff:
+            return
+        # one loader probes, the others wait for its verdict
+        async with self.lock:
+            backoff = await self.get_backoff()
+            if backoff > 0:
+                self.stats["backoff_wait_seconds"] += backoff
+                throttle_wait_seconds.labels(self.name, "backoff").inc(backoff)
+                await asyncio.sleep(backoff)
+
+    def get_stats(self) -> Dict:
+        return {
+            **self.stats,
+            "rate_wait_seconds": round(self.stats["rate_wait_seconds"], 3),
+            "backoff_wait_seconds": round(self.stats["backoff_wait_seconds"], 3),
+        }
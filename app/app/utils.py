@@ -1,25 +1,148 @@
+import asyncio
 import logging
 
+import time
+from typing import Awaitable, Callable, Dict, TypeVar
+
+import asyncpg
+import psycopg2
 import sqlalchemy
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
 
-from app.config import Settings
+from app.config import DbTarget, Settings
 
-logger = logging.getLogger()
-logging.basicConfig(level=logging.DEBUG)
+logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
 
-def get_db_engine(settings: Settings):
-    logger.info("Connecting to DB")
-    connection_string = (
-        f"postgresql://{settings.db_user}:{settings.db_password}"
-        f"@{settings.db_host}:{settings.db_port}/{settings.db_name}"
-    )
+
+def get_retry_delays(settings: Settings):
+    delay = settings.db_connect_backoff
+    for _ in range(settings.db_connect_retries - 1):
+        yield delay
+        delay = min(delay * 2, settings.db_connect_max_backoff)
+
+
+def connect_with_retry(connect: Callable[[], T], settings: Settings) -> T:
+    for delay in get_retry_delays(settings):
+        try:
+            return connect()
+        except Exception as e:
+            logger.warning(
+                "DB is not reachable: {}. Retrying in {:.1f}s".format(e, delay)
+            )
+            time.sleep(delay)
+    return connect()
+
+
+async def connect_with_retry_async(
+    connect: Callable[[], Awaitable[T]], settings: Settings
+) -> T:
+    for delay in get_retry_delays(settings):
+        try:
+            return await connect()
+        except Exception as e:
+            logger.warning(
+                "DB is not reachable: {}. Retrying in {:.1f}s".format(e, delay)
+            )
+            await asyncio.sleep(delay)
+    return await connect()
+
+
+def get_db_engine(settings: Settings, **engine_options):
+    logger.info("Creating DB engine")
+
+    def connect():
+        return connect_with_retry(
+            lambda: psycopg2.connect(
+                host=settings.db_host,
+                port=settings.db_port,
+                dbname=settings.db_name,
+                user=settings.db_user,
+                password=settings.db_password,
+            ),
+            settings,
+        )
+
+    # no connection is opened here, the pool connects on first use
     try:
-        engine = sqlalchemy.create_engine(connection_string)
+        engine = sqlalchemy.create_engine(
+            "postgresql+psycopg2://", creator=connect, **engine_options
+        )
     except Exception as e:
-        logger.error("Error connecting to DB: {}".format(e))
+        logger.error("Error creating DB engine: {}".format(e))
         raise e
 
-    logger.info("Connected to DB successfully")
+    return engine
+
+
+def get_async_db_engine(settings: Settings, **engine_options) -> AsyncEngine:
+    logger.info("Creating async DB engine")
+
+    async def connect():
+        return await connect_with_retry_async(
+            lambda: asyncpg.connect(
+                host=settings.db_host,
+                port=settings.db_port,
+                database=settings.db_name,
+                user=settings.db_user,
+                password=settings.db_password,
+            ),
+            settings,
+        )
+
+    try:
+        engine = create_async_engine(
+            "postgresql+asyncpg://", async_creator=connect, **engine_options
+        )
+    except Exception as e:
+        logger.error("Error creating DB engine: {}".format(e))
+        raise e
 
     return engine
+
+
+async def check_db_ready(engine: AsyncEngine, timeout: float) -> bool:
+    async def ping():
+        async with engine.connect() as conn:
+            await conn.execute(sqlalchemy.text("SELECT 1"))
+
+    try:
+        await asyncio.wait_for(ping(), timeout)
+    except Exception as e:
+        logger.warning("DB is not ready: {}".format(e))
+        return False
+    return True
+
+
+DEFAULT_TARGET = "default"
+
+
+def get_target_settings(settings: Settings, target: DbTarget) -> Settings:
+    return settings.model_copy(
+        update={
+            "db_host": target.host,
+            "db_port": target.port,
+            "db_name": target.db_name or settings.db_name,
+            "db_user": target.user or settings.db_user,
+            "db_password": target.password or settings.db_password,
+        }
+    )
+
+
+def get_target_engines(
+    settings: Settings, default_engine: AsyncEngine | None = None
+) -> Dict[str, AsyncEngine]:
+    # every target has its own pool, the primary database is the "default" one
+    engines = {
+        DEFAULT_TARGET: default_engine
+        if default_engine is not None
+        else get_async_db_engine(settings)
+    }
+    for target in settings.db_targets:
+        if target.name in engines:
+            raise ValueError("Duplicate DB target name {}".format(target.name))
+        engines[target.name] = get_async_db_engine(
+            get_target_settings(settings, target)
+        )
+    return engines
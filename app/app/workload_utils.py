@@ -0,0 +1,189 @@
+import asyncio
+import logging
+
+import math
+import random
+import time
+from collections import defaultdict
+from typing import Dict, List
+
+import sqlalchemy
+from sqlalchemy import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.models import ChurnPayload, WorkloadPayload, WorkloadQuery
+from app.state_utils import is_state_table, workload_runs
+
+logger = logging.getLogger(__name__)
+
+DATASET_QUERY = sqlalchemy.text(
+    "SELECT relname, n_live_tup FROM pg_stat_user_tables WHERE schemaname = 'public'"
+)
+
+
+def percentile(values: List[float], p: float) -> float | None:
+    if len(values) == 0:
+        return None
+
+    # nearest-rank percentile, the same definition pgbench uses for latencies
+    ordered = sorted(values)
+    rank = max(1, math.ceil(p / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def summarize_latencies(
+    latencies_ms: List[float], errors: int, duration_seconds: float
+) -> Dict:
+    return {
+        "transactions": len(latencies_ms),
+        "errors": errors,
+        "tps": round(len(latencies_ms) / duration_seconds, 2)
+        if duration_seconds > 0
+        else 0,
+        "latency_avg_ms": round(sum(latencies_ms) / len(latencies_ms), 3)
+        if latencies_ms
+        else None,
+        "latency_p50_ms": percentile(latencies_ms, 50),
+        "latency_p95_ms": percentile(latencies_ms, 95),
+        "latency_p99_ms": percentile(latencies_ms, 99),
+    }
+
+
+async def execute_query(engine: AsyncEngine, sql: str):
+    async with engine.begin() as conn:
+        result = await conn.execute(sqlalchemy.text(sql))
+        if result.returns_rows:
+            result.fetchall()
+
+
+async def run_client(
+    engine: AsyncEngine,
+    queries: List[WorkloadQuery],
+    deadline: float | None,
+    transactions: int | None,
+    interval: float | None,
+    latencies: Dict[str, List[float]],
+    errors: Dict[str, int],
+    error_messages: Dict[str, str],
+):
+    weights = [query.weight for query in queries]
+    # spread clients over the first interval so they don't fire in lockstep
+    next_start = time.perf_counter() + random.uniform(0, interval or 0)
+    executed = 0
+
+    while True:
+        if transactions is not None and executed >= transactions:
+            break
+        if deadline is not None and time.perf_counter() >= deadline:
+            break
+
+        if interval is not None:
+            delay = next_start - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            next_start += interval
+
+        query = random.choices(queries, weights=weights)[0]
+        started = time.perf_counter()
+        try:
+            await execute_query(engine, query.sql)
+            latencies[query.name].append((time.perf_counter() - started) * 1000)
+        except Exception as e:
+            errors[query.name] += 1
+            error_messages[query.name] = str(e).splitlines()[0]
+        executed += 1
+
+
+async def run_workload(engine: AsyncEngine, payload: WorkloadPayload) -> Dict:
+    logger.info(
+        "Running workload {} with {} clients".format(payload.name, payload.clients)
+    )
+
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    errors: Dict[str, int] = defaultdict(int)
+    error_messages: Dict[str, str] = {}
+    interval = payload.clients / payload.target_rate if payload.target_rate else None
+
+    started = time.perf_counter()
+    deadline = (
+        started + payload.duration_seconds
+        if payload.duration_seconds is not None
+        else None
+    )
+    await asyncio.gather(
+        *[
+            run_client(
+                engine,
+                payload.queries,
+                deadline,
+                payload.transactions,
+                interval,
+                latencies,
+                errors,
+                error_messages,
+            )
+            for _ in range(payload.clients)
+        ]
+    )
+    duration_seconds = time.perf_counter() - started
+
+    all_latencies = [value for values in latencies.values() for value in values]
+    result = summarize_latencies(all_latencies, sum(errors.values()), duration_seconds)
+    result["duration_seconds"] = round(duration_seconds, 3)
+    result["queries"] = {}
+    for query in payload.queries:
+        result["queries"][query.name] = summarize_latencies(
+            latencies[query.name], errors[query.name], duration_seconds
+        )
+        if query.name in error_messages:
+            result["queries"][query.name]["last_error"] = error_messages[query.name]
+
+    logger.info(
+        "Workload {} finished: {} transactions, {} errors, {} tps".format(
+            payload.name, result["transactions"], result["errors"], result["tps"]
+        )
+    )
+
+    return result
+
+
+def get_dataset_snapshot(engine: Engine) -> Dict[str, int]:
+    with engine.connect() as conn:
+        rows = conn.execute(DATASET_QUERY).fetchall()
+    return {row[0]: row[1] for row in rows if not is_state_table(row[0])}
+
+
+def save_workload_run(
+    engine: Engine,
+    payload: WorkloadPayload | ChurnPayload,
+    dataset: Dict,
+    result: Dict,
+) -> int:
+    logger.info("Saving workload run {}".format(payload.name))
+
+    stmt = (
+        sqlalchemy.insert(workload_runs)
+        .values(
+            name=payload.name,
+            duration_seconds=result["duration_seconds"],
+            dataset=dataset,
+            parameters=payload.model_dump(),
+            result=result,
+        )
+        .returning(workload_runs.c.id)
+    )
+    try:
+        with engine.begin() as conn:
+            return conn.execute(stmt).scalar_one()
+    except Exception as e:
+        logger.error("Error saving workload run {}: {}".format(payload.name, e))
+        raise e
+
+
+def get_workload_runs(engine: Engine, name: str | None = None) -> List[Dict]:
+    stmt = sqlalchemy.select(workload_runs).order_by(workload_runs.c.id)
+    if name is not None:
+        stmt = stmt.where(workload_runs.c.name == name)
+
+    with engine.connect() as conn:
+        return [dict(row._mapping) for row in conn.execute(stmt)]
@@ -0,0 +1,380 @@
+"""Load test for the API itself.
+
+Starts uvicorn against the database configured in .env (or uses --url), drives
+concurrent mixed /create_table, /generate and /create_tables_leetcode traffic
+and reports throughput, latency percentiles, error rates and server CPU and
+memory taken from /proc.
+
+    python loadtest.py --clients 16 --duration 60 --workers 2 --rows 5000
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import logging
+import os
+import random
+import subprocess
+import sys
+import time
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from typing import Dict, List
+
+import httpx
+
+from app.workload_utils import summarize_latencies
+
+logger = logging.getLogger("loadtest")
+
+OPERATIONS = ["create_table", "generate", "leetcode"]
+FIELD_TYPES = ["string", "integer", "float", "date", "text", "email"]
+CLOCK_TICKS = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+@dataclass
+class Results:
+    latencies_ms: Dict[str, List[float]] = field(
+        default_factory=lambda: defaultdict(list)
+    )
+    errors: Counter = field(default_factory=Counter)
+    statuses: Dict[str, Counter] = field(default_factory=lambda: defaultdict(Counter))
+
+    def record(self, operation: str, status: int | str, latency_ms: float):
+        self.statuses[operation][str(status)] += 1
+        if isinstance(status, int) and status < 400:
+            self.latencies_ms[operation].append(latency_ms)
+        else:
+            self.errors[operation] += 1
+
+
+def parse_weights(value: str) -> Dict[str, float]:
+    weights = {}
+    for item in value.split(","):
+        name, _, weight = item.partition("=")
+        if name not in OPERATIONS:
+            raise argparse.ArgumentTypeError(
+                "Unknown operation {}, expected one of {}".format(name, OPERATIONS)
+            )
+        weights[name] = float(weight)
+    if sum(weights.values()) <= 0:
+        raise argparse.ArgumentTypeError("At least one weight must be positive")
+    return weights
+
+
+def get_table_name(prefix: str, client: int, slot: int) -> str:
+    return "{}_{}_{}".format(prefix, client, slot)
+
+
+def get_create_table_payload(table_name: str, columns: int) -> Dict:
+    fields = [{"name": "id", "type": "integer", "primary_key": True}]
+    for position in range(columns):
+        fields.append(
+            {
+                "name": "col_{}".format(position),
+                "type": FIELD_TYPES[position % len(FIELD_TYPES)],
+                "nullable": True,
+            }
+        )
+    # a bounded set of names per client, recreated in turn
+    return {"table_name": table_name, "fields": fields, "force_recreate_table": True}
+
+
+def get_generate_payload(table_name: str, rows: int) -> List[Dict]:
+    return [{"table_name": table_name, "row_number": rows}]
+
+
+def get_leetcode_script(table_name: str, rows: int) -> str:
+    lines = [
+        "CREATE TABLE IF NOT EXISTS {} (id int, name varchar(255), score int)".format(
+            table_name
+        ),
+        "TRUNCATE TABLE {}".format(table_name),
+    ]
+    for position in range(rows):
+        lines.append(
+            "INSERT INTO {} (id, name, score) VALUES ({}, 'name_{}', {})".format(
+                table_name, position, position, position % 100
+            )
+        )
+    return "\n".join(lines)
+
+
+def get_child_pids(pid: int) -> List[int]:
+    children = []
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open("/proc/{}/stat".format(entry)) as stat_file:
+                stat = stat_file.read()
+        except OSError:
+            continue
+        # the command name may contain spaces, the fields after it do not
+        if int(stat.rsplit(")", 1)[1].split()[1]) == pid:
+            children.append(int(entry))
+    return children
+
+
+def read_process_usage(pid: int) -> Dict[str, int]:
+    with open("/proc/{}/stat".format(pid)) as stat_file:
+        fields = stat_file.read().rsplit(")", 1)[1].split()
+    # fields are counted from the state, the third field of /proc/pid/stat
+    return {
+        "cpu_ticks": int(fields[11]) + int(fields[12]),
+        "threads": int(fields[17]),
+        "rss_bytes": int(fields[21]) * PAGE_SIZE,
+    }
+
+
+def read_tree_usage(pid: int) -> Dict[str, int]:
+    # uvicorn --workers forks the workers from the supervisor process
+    total = {"cpu_ticks": 0, "threads": 0, "rss_bytes": 0, "processes": 0}
+    for process in [pid] + get_child_pids(pid):
+        try:
+            usage = read_process_usage(process)
+        except OSError:
+            continue
+        for key, value in usage.items():
+            total[key] += value
+        total["processes"] += 1
+    return total
+
+
+class ResourceSampler:
+    def __init__(self, pid: int, interval: float):
+        self.pid = pid
+        self.interval = interval
+        self.cpu_percent: List[float] = []
+        self.rss_bytes: List[int] = []
+        self.threads: List[int] = []
+        self.processes = 0
+
+    async def run(self, stop: asyncio.Event):
+        previous = read_tree_usage(self.pid)
+        previous_time = time.perf_counter()
+        while not stop.is_set():
+            with contextlib.suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(stop.wait(), self.interval)
+            usage = read_tree_usage(self.pid)
+            now = time.perf_counter()
+            seconds = (usage["cpu_ticks"] - previous["cpu_ticks"]) / CLOCK_TICKS
+            self.cpu_percent.append(100 * seconds / max(now - previous_time, 1e-9))
+            self.rss_bytes.append(usage["rss_bytes"])
+            self.threads.append(usage["threads"])
+            self.processes = usage["processes"]
+            previous, previous_time = usage, now
+
+    def summarize(self) -> Dict:
+        if not self.cpu_percent:
+            return {}
+        return {
+            "processes": self.processes,
+            "cpu_avg_percent": round(sum(self.cpu_percent) / len(self.cpu_percent), 1),
+            "cpu_max_percent": round(max(self.cpu_percent), 1),
+            "rss_max_mb": round(max(self.rss_bytes) / 1024**2, 1),
+            "threads_max": max(self.threads),
+        }
+
+
+async def send_request(
+    client: httpx.AsyncClient, operation: str, table_name: str, args
+) -> httpx.Response:
+    if operation == "create_table":
+        return await client.post(
+            "/create_table", json=get_create_table_payload(table_name, args.columns)
+        )
+    if operation == "generate":
+        return await client.post(
+            "/generate",
+            json=get_generate_payload(table_name, args.rows),
+            params={"indexes": "false"},
+        )
+    return await client.post(
+        "/create_tables_leetcode",
+        content=get_leetcode_script(table_name, args.leetcode_rows),
+        headers={"content-type": "text/plain"},
+    )
+
+
+async def run_client(
+    number: int,
+    client: httpx.AsyncClient,
+    args,
+    deadline: float,
+    results: Results,
+):
+    rng = random.Random(None if args.seed is None else args.seed + number)
+    operations = list(args.weights)
+    weights = [args.weights[name] for name in operations]
+    created: set[int] = set()
+
+    while time.perf_counter() < deadline:
+        operation = rng.choices(operations, weights)[0]
+        slot = rng.randrange(args.tables_per_client)
+        if operation == "generate" and slot not in created:
+            # generating needs the table, creating it is part of the traffic
+            operation = "create_table"
+        prefix = "lc" if operation == "leetcode" else args.table_prefix
+        table_name = get_table_name(prefix, number, slot)
+
+        started = time.perf_counter()
+        try:
+            response = await send_request(client, operation, table_name, args)
+            status: int | str = response.status_code
+        except httpx.HTTPError as e:
+            status = type(e).__name__
+        results.record(operation, status, (time.perf_counter() - started) * 1000)
+        if operation == "create_table" and status == 200:
+            created.add(slot)
+
+
+def summarize(results: Results, duration_seconds: float) -> Dict:
+    operations = {}
+    for operation in sorted(results.statuses):
+        summary = summarize_latencies(
+            results.latencies_ms[operation], results.errors[operation], duration_seconds
+        )
+        requests = len(results.latencies_ms[operation]) + results.errors[operation]
+        summary["error_rate"] = round(results.errors[operation] / requests, 4)
+        summary["statuses"] = dict(results.statuses[operation])
+        operations[operation] = summary
+
+    latencies = [
+        latency for values in results.latencies_ms.values() for latency in values
+    ]
+    errors = sum(results.errors.values())
+    total = summarize_latencies(latencies, errors, duration_seconds)
+    requests = len(latencies) + errors
+    total["error_rate"] = round(errors / requests, 4) if requests else 0
+    return {"total": total, "operations": operations}
+
+
+def start_server(args) -> subprocess.Popen:
+    command = [
+        sys.executable,
+        "-m",
+        "uvicorn",
+        "main:app",
+        "--host",
+        args.host,
+        "--port",
+        str(args.port),
+        "--workers",
+        str(args.workers),
+        "--log-level",
+        "warning",
+    ]
+    logger.info("Starting server: {}".format(" ".join(command)))
+    return subprocess.Popen(command, cwd=os.path.dirname(os.path.abspath(__file__)))
+
+
+async def wait_ready(client: httpx.AsyncClient, timeout: float):
+    deadline = time.perf_counter() + timeout
+    while True:
+        try:
+            if (await client.get("/ready")).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        if time.perf_counter() > deadline:
+            raise RuntimeError("Server was not ready after {}s".format(timeout))
+        await asyncio.sleep(0.5)
+
+
+async def run(args, transport: httpx.AsyncBaseTransport | None = None) -> Dict:
+    server = None if args.url else start_server(args)
+    base_url = args.url or "http://{}:{}".format(args.host, args.port)
+    pid = server.pid if server is not None else args.pid
+    limits = httpx.Limits(max_connections=args.clients)
+    timeout = httpx.Timeout(args.timeout)
+
+    try:
+        async with httpx.AsyncClient(
+            base_url=base_url, limits=limits, timeout=timeout, transport=transport
+        ) as client:
+            await wait_ready(client, args.ready_timeout)
+
+            results = Results()
+            stop = asyncio.Event()
+            sampler = ResourceSampler(pid, args.sample_interval) if pid else None
+            sampler_task = (
+                asyncio.create_task(sampler.run(stop)) if sampler is not None else None
+            )
+            started = time.perf_counter()
+            deadline = started + args.duration
+            await asyncio.gather(
+                *[
+                    run_client(number, client, args, deadline, results)
+                    for number in range(args.clients)
+                ]
+            )
+            duration_seconds = time.perf_counter() - started
+            stop.set()
+            if sampler_task is not None:
+                await sampler_task
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=30)
+
+    return {
+        "config": {
+            "url": base_url,
+            "clients": args.clients,
+            "workers": args.workers if server is not None else None,
+            "duration_seconds": round(duration_seconds, 3),
+            "rows": args.rows,
+            "columns": args.columns,
+            "leetcode_rows": args.leetcode_rows,
+            "weights": args.weights,
+        },
+        **summarize(results, duration_seconds),
+        "server": sampler.summarize() if sampler is not None else {},
+    }
+
+
+def get_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", help="Test a running server instead of starting one")
+    parser.add_argument("--pid", type=int, help="Server pid to sample with --url")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=30)
+    parser.add_argument(
+        "--weights",
+        type=parse_weights,
+        default=parse_weights("create_table=1,generate=3,leetcode=1"),
+    )
+    parser.add_argument("--rows", type=int, default=1000, help="Rows per /generate")
+    parser.add_argument("--columns", type=int, default=6, help="Columns per table")
+    parser.add_argument(
+        "--leetcode-rows", type=int, default=50, help="INSERT lines per script"
+    )
+    parser.add_argument("--tables-per-client", type=int, default=3)
+    parser.add_argument("--table-prefix", default="loadtest")
+    parser.add_argument("--timeout", type=float, default=120)
+    parser.add_argument("--ready-timeout", type=float, default=60)
+    parser.add_argument("--sample-interval", type=float, default=1.0)
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--output", help="Also write the report to this file")
+    return parser
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+    args = get_parser().parse_args()
+    report = asyncio.run(run(args))
+
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,31 +1,79 @@
+import asyncio
+import contextlib
 import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# first, so the cold start is measured from before the imports below
+from app import startup_started  # type: ignore
 
 import sqlalchemy
 from fastapi import FastAPI, HTTPException, Body
+from fastapi.responses import PlainTextResponse
+from fastapi.concurrency import run_in_threadpool
+from prometheus_client import make_asgi_app
 import uvicorn
-from sqlalchemy import MetaData, Inspector
-from sqlalchemy.orm import Session
+from sqlalchemy import MetaData
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app import (  # type: ignore
     models,
+    amplify_utils,
+    churn_utils,
     utils,
     data_structure_utils,
     data_content_utils,
+    estimate_utils,
+    explain_utils,
+    fanout_utils,
+    index_advisor_utils,
+    index_utils,
+    job_utils,
+    logging_utils,
+    maintenance_utils,
+    ordering_utils,
+    partition_utils,
+    pg_stats_utils,
+    profiling_utils,
+    sizing_utils,
+    state_utils,
+    text_corpus_utils,
+    throttle_utils,
+    workload_utils,
 )
 from app.config import settings
 
 
+logging_utils.configure_logging(settings)
+logger = logging.getLogger(__name__)
+
 app = FastAPI()
-logging.basicConfig(level=logging.DEBUG)
-logger = logging.getLogger()
+app.mount("/metrics", make_asgi_app())
+app.add_middleware(profiling_utils.ProfilingMiddleware, settings=settings)
+# added last, so it runs first and profiles are logged with the request id
+app.add_middleware(logging_utils.RequestIdMiddleware)
 
 engine = utils.get_db_engine(settings)
+async_engine = utils.get_async_db_engine(settings)
+target_engines = utils.get_target_engines(settings, async_engine)
+generation_executor = ThreadPoolExecutor(max_workers=settings.generation_workers)
+active_loads: set[str] = set()
+active_jobs: set[int] = set()
+churn_workloads: dict[str, churn_utils.ChurnWorkload] = {}
+churn_tasks: dict[str, asyncio.Task] = {}
+churn_starting: set[str] = set()
+# tables are reflected on demand, so startup never waits for the database
 db_metadata = MetaData()
-db_metadata.reflect(engine)
+
+startup_seconds = time.perf_counter() - startup_started
+logger.info("Application started in {:.3f}s".format(startup_seconds))
 
 
 @app.post("/create_table")
 def create_table(payload: models.CreateTablePayload):
+    state_utils.ensure_state_tables(engine)
+    with engine.connect() as conn:
+        data_structure_utils.reflect_tables(conn, [payload.table_name], db_metadata)
     existing_table = data_structure_utils.get_existing_table(
         payload.table_name, db_metadata
     )
@@ -42,58 +90,1004 @@ def create_table(payload: models.CreateTablePayload):
     sqlalchemy_columns = data_structure_utils.get_columns_definition(
         payload.fields, settings
     )
-    data_structure_utils.create_table(
-        payload.table_name, sqlalchemy_columns, engine, db_metadata
-    )
+    try:
+        data_structure_utils.create_table(
+            payload.table_name,
+            sqlalchemy_columns,
+            engine,
+            db_metadata,
+            payload.partition,
+            payload.indexes,
+        )
+    except ValueError as e:
+        raise HTTPException(400, str(e))
 
     return {
         "message": "Table created successfully",
     }
 
 
+async def reflect_tables_async(table_names: list[str]):
+    with logging_utils.span("reflect", tables=table_names):
+        async with async_engine.connect() as conn:
+            await conn.run_sync(
+                data_structure_utils.reflect_tables, table_names, db_metadata
+            )
+
+
+async def get_unique_columns(table_name: str) -> list[str]:
+    with logging_utils.span("unique_constraints", table=table_name):
+        async with async_engine.connect() as conn:
+            constraints = await conn.run_sync(
+                lambda sync_conn: sqlalchemy.inspect(sync_conn).get_unique_constraints(
+                    table_name
+                )
+            )
+    return [
+        col["column_names"][0] for col in constraints
+    ]  # for now only support single column unique constraints
+
+
+async def check_can_generate(
+    table: sqlalchemy.Table, unique_columns: list[str], target_engine=None
+):
+    row_count = await data_content_utils.get_row_count_async(
+        table, target_engine or async_engine
+    )
+    if row_count > 0 and len(unique_columns) > 0:
+        raise HTTPException(
+            400,
+            "Table {} has unique constraints and already contains data. Cannot generate new data without violating unique constraints.".format(
+                table.name
+            ),
+        )
+
+
+async def run_job(
+    table: sqlalchemy.Table,
+    job: dict,
+    unique_columns,
+    load: dict | None = None,
+    throttle: throttle_utils.Throttle | None = None,
+) -> int:
+    # the caller has registered the job in active_jobs
+    job_token = logging_utils.job_id_var.set(job["id"])
+    try:
+        async with AsyncSession(async_engine) as session:
+            inserted = await data_content_utils.insert_generated_values(
+                table,
+                job["row_number"],
+                session,
+                settings,
+                unique_columns,
+                generation_executor,
+                target=load["target"] if load else None,
+                column_values=load["column_values"] if load else None,
+                row_offset=job["row_offset"],
+                job=job,
+                # stored with the job, so a resumed job keeps the same order
+                ordering={
+                    name: models.ColumnOrdering(**spec)
+                    for name, spec in (job.get("ordering") or {}).items()
+                },
+                throttle=throttle,
+            )
+    except Exception as e:
+        # the checkpoint is already committed, the status is best effort
+        with contextlib.suppress(Exception):
+            await run_in_threadpool(
+                job_utils.set_job_status,
+                engine,
+                job["id"],
+                job_utils.FAILED,
+                str(e).splitlines()[0] if str(e) else repr(e),
+            )
+        raise e
+    finally:
+        logging_utils.job_id_var.reset(job_token)
+
+    await run_in_threadpool(
+        job_utils.set_job_status, engine, job["id"], job_utils.COMPLETED
+    )
+    return inserted
+
+
+async def load_table(
+    table: sqlalchemy.Table,
+    row_number: int,
+    unique_columns,
+    ordering: dict | None = None,
+    throttle: throttle_utils.Throttle | None = None,
+) -> list[int]:
+    job = await run_in_threadpool(
+        job_utils.create_job,
+        engine,
+        table.name,
+        row_number,
+        settings,
+        ordering=ordering,
+    )
+    active_jobs.add(job["id"])
+    active_loads.add(table.name)
+    try:
+        await run_job(table, job, unique_columns, throttle=throttle)
+    finally:
+        active_loads.discard(table.name)
+        active_jobs.discard(job["id"])
+
+    return [job["id"]]
+
+
+async def load_partitioned_table(
+    table: sqlalchemy.Table,
+    row_number: int,
+    unique_columns,
+    partitioning: dict,
+    ordering: dict | None = None,
+    throttle: throttle_utils.Throttle | None = None,
+) -> list[int]:
+    loads = partition_utils.plan_partition_loads(
+        table, partitioning, row_number, unique_columns
+    )
+    jobs = []
+    active_loads.add(table.name)
+    try:
+        for load in loads:
+            job = await run_in_threadpool(
+                job_utils.create_job,
+                engine,
+                table.name,
+                load["row_number"],
+                settings,
+                load["partition"],
+                load["row_offset"],
+                row_number,
+                ordering,
+            )
+            # running from now on, a job waiting for the semaphore cannot
+            # be resumed next to its own load
+            active_jobs.add(job["id"])
+            jobs.append(job)
+        semaphore = asyncio.Semaphore(settings.partition_load_concurrency)
+
+        async def load_partition(job: dict, load: dict) -> int:
+            async with semaphore:
+                return await run_job(table, job, unique_columns, load, throttle)
+
+        tasks = [
+            asyncio.create_task(load_partition(job, load))
+            for job, load in zip(jobs, loads)
+        ]
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            # the other partitions are stopped before the table is released,
+            # and left failed so they can be resumed from their checkpoints
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            for job, task in zip(jobs, tasks):
+                if task.cancelled():
+                    with contextlib.suppress(Exception):
+                        await run_in_threadpool(
+                            job_utils.set_job_status,
+                            engine,
+                            job["id"],
+                            job_utils.FAILED,
+                            "Cancelled after another partition load failed",
+                        )
+            raise
+    finally:
+        active_loads.discard(table.name)
+        active_jobs.difference_update(job["id"] for job in jobs)
+
+    return [job["id"] for job in jobs]
+
+
+async def maintain_tables(tables: list[sqlalchemy.Table], freeze: bool = True) -> dict:
+    semaphore = asyncio.Semaphore(settings.maintenance_concurrency)
+
+    async def maintain_table(table: sqlalchemy.Table) -> dict:
+        async with semaphore:
+            return await run_in_threadpool(
+                maintenance_utils.run_maintenance, table, engine, freeze
+            )
+
+    started = time.perf_counter()
+    results = await asyncio.gather(*[maintain_table(table) for table in tables])
+
+    return {
+        "elapsed_seconds": round(time.perf_counter() - started, 3),
+        "tables": {table.name: result for table, result in zip(tables, results)},
+    }
+
+
+async def build_indexes(tables: list[sqlalchemy.Table]) -> dict:
+    semaphore = asyncio.Semaphore(settings.index_build_concurrency)
+
+    async def build_table_indexes(table: sqlalchemy.Table) -> dict:
+        async with semaphore:
+            partitioning = await run_in_threadpool(
+                partition_utils.get_table_partitions, engine, table
+            )
+            return await run_in_threadpool(
+                index_utils.build_table_indexes,
+                table,
+                engine,
+                partitioning is not None,
+            )
+
+    started = time.perf_counter()
+    results = await asyncio.gather(*[build_table_indexes(table) for table in tables])
+
+    return {
+        "elapsed_seconds": round(time.perf_counter() - started, 3),
+        "tables": {
+            table.name: result for table, result in zip(tables, results) if result
+        },
+    }
+
+
+async def estimate_generation(payload: list[models.GeneratePayload]) -> dict:
+    loop = asyncio.get_running_loop()
+    fake = data_content_utils.get_faker()
+    estimates = {}
+    for item in payload:
+        table_name = item.table_name.lower().strip()
+        table = data_structure_utils.get_existing_table(table_name, db_metadata)
+        if table is None:
+            raise HTTPException(404, "Table {} not found".format(table_name))
+
+        unique_columns = await get_unique_columns(table_name)
+        await check_can_generate(table, unique_columns)
+        try:
+            ordering_utils.validate_ordering(table, item.ordering, unique_columns)
+        except ValueError as e:
+            raise HTTPException(400, str(e))
+
+        estimates[item.table_name] = await loop.run_in_executor(
+            generation_executor,
+            estimate_utils.estimate_table,
+            table,
+            engine,
+            fake,
+            item.row_number,
+            settings,
+            unique_columns,
+            item.ordering,
+        )
+
+    totals = estimate_utils.get_totals(estimates)
+    return {
+        "tables": estimates,
+        "total": totals,
+        "exceeded": estimate_utils.get_exceeded_limits(totals, settings),
+    }
+
+
+@app.get("/ready")
+async def ready():
+    if not await utils.check_db_ready(async_engine, settings.ready_timeout):
+        raise HTTPException(503, "Database is not reachable")
+
+    return {
+        "status": "ready",
+        "startup_seconds": round(startup_seconds, 3),
+    }
+
+
+@app.get("/status")
+async def status():
+    return {
+        "status": "ok",
+        "active_loads": sorted(active_loads),
+    }
+
+
 @app.post("/generate")
-def generate_data(payload: list[models.GeneratePayload]):
+async def generate_data(
+    payload: list[models.GeneratePayload],
+    maintenance: bool = False,
+    indexes: bool = True,
+    dry_run: bool = False,
+):
     result = {}
+    tables = []
+    partition_rows = {}
+    jobs = {}
+    throttles = {}
+
+    await run_in_threadpool(state_utils.ensure_state_tables, engine)
+    await reflect_tables_async([item.table_name.lower().strip() for item in payload])
 
-    db_metadata.clear()
-    db_metadata.reflect(engine)
+    if dry_run or settings.estimate_enforce_limits:
+        estimate = await estimate_generation(payload)
+        if dry_run:
+            return estimate
+        if estimate["exceeded"]:
+            raise HTTPException(
+                400,
+                "Generation exceeds the configured limits: {}".format(
+                    "; ".join(estimate["exceeded"])
+                ),
+            )
 
     for item in payload:
         table_name = item.table_name.lower().strip()
         table = data_structure_utils.get_existing_table(table_name, db_metadata)
 
-        insp = Inspector.from_engine(engine)
-        unique_columns = [
-            col["column_names"][0] for col in insp.get_unique_constraints(table_name)
-        ]  # for now only support single column unique constraints
-
         if table is None:
             raise HTTPException(404, "Table {} not found".format(table_name))
 
+        unique_columns = await get_unique_columns(table_name)
+
+        await check_can_generate(table, unique_columns)
+        try:
+            ordering_utils.validate_ordering(table, item.ordering, unique_columns)
+        except ValueError as e:
+            raise HTTPException(400, str(e))
+        ordering = {
+            name: spec.model_dump(mode="json") for name, spec in item.ordering.items()
+        }
+        throttle = (
+            throttle_utils.Throttle(table, item.throttle, settings, async_engine)
+            if item.throttle is not None
+            else None
+        )
+
+        partitioning = await run_in_threadpool(
+            partition_utils.get_table_partitions, engine, table
+        )
+        if partitioning is not None:
+            try:
+                jobs[item.table_name] = await load_partitioned_table(
+                    table,
+                    item.row_number,
+                    unique_columns,
+                    partitioning,
+                    ordering,
+                    throttle,
+                )
+            except ValueError as e:
+                raise HTTPException(400, str(e))
+            partition_rows[
+                item.table_name
+            ] = await partition_utils.get_partition_row_counts(table, async_engine)
+        else:
+            jobs[item.table_name] = await load_table(
+                table, item.row_number, unique_columns, ordering, throttle
+            )
+        if throttle is not None:
+            throttles[item.table_name] = throttle.get_stats()
+        total_count = await data_content_utils.get_row_count_async(table, async_engine)
+
+        result[item.table_name] = total_count
+        if table not in tables:
+            tables.append(table)
+
+    response: dict = {
+        "Total rows in tables": result,
+        "jobs": jobs,
+    }
+    if partition_rows:
+        response["Rows in partitions"] = partition_rows
+    if throttles:
+        response["throttle"] = throttles
+    # indexes first, so the VACUUM also covers them
+    if indexes:
+        response["indexes"] = await build_indexes(tables)
+    if maintenance:
+        response["maintenance"] = await maintain_tables(tables)
+
+    return response
+
+
+@app.get("/generate/jobs")
+def get_generation_jobs(table_name: str | None = None):
+    state_utils.ensure_state_tables(engine)
+
+    return {
+        "jobs": job_utils.get_jobs(engine, table_name),
+    }
+
+
+@app.post("/generate/jobs/{job_id}/resume")
+async def resume_generation_job(
+    job_id: int, throttle: models.ThrottleSpec | None = Body(None)
+):
+    # reserved before the first await, so a second resume of the same job
+    # is refused instead of inserting from the same checkpoint
+    if job_id in active_jobs:
+        raise HTTPException(409, "Generation job {} is running".format(job_id))
+    active_jobs.add(job_id)
+    try:
+        await run_in_threadpool(state_utils.ensure_state_tables, engine)
+
+        job = await run_in_threadpool(job_utils.get_job, engine, job_id)
+        if job is None:
+            raise HTTPException(404, "Generation job {} not found".format(job_id))
+        if job["status"] == job_utils.COMPLETED:
+            raise HTTPException(400, "Generation job {} is completed".format(job_id))
+
+        await reflect_tables_async([job["table_name"]])
+        table = data_structure_utils.get_existing_table(job["table_name"], db_metadata)
+        if table is None:
+            raise HTTPException(404, "Table {} not found".format(job["table_name"]))
+
+        unique_columns = await get_unique_columns(table.name)
+        load = None
+        if job["target"] is not None:
+            # the partition plan is deterministic, so it is rebuilt to find the
+            # key generator of the partition this job writes to
+            partitioning = await run_in_threadpool(
+                partition_utils.get_table_partitions, engine, table
+            )
+            loads = (
+                partition_utils.plan_partition_loads(
+                    table, partitioning, job["plan_rows"], unique_columns
+                )
+                if partitioning is not None
+                else []
+            )
+            load = next(
+                (load for load in loads if load["partition"] == job["target"]), None
+            )
+            if load is None:
+                raise HTTPException(
+                    400,
+                    "Partition {} of table {} no longer exists".format(
+                        job["target"], table.name
+                    ),
+                )
+
+        await run_in_threadpool(
+            job_utils.set_job_status, engine, job_id, job_utils.RUNNING
+        )
+        active_loads.add(table.name)
+        try:
+            inserted = await run_job(
+                table,
+                job,
+                unique_columns,
+                load,
+                throttle_utils.Throttle(table, throttle, settings, async_engine)
+                if throttle is not None
+                else None,
+            )
+        finally:
+            active_loads.discard(table.name)
+    finally:
+        active_jobs.discard(job_id)
+
+    return {
+        "job": job_id,
+        "resumed_from_row": job["rows_inserted"],
+        "rows_inserted": inserted,
+        "Total rows in tables": {
+            table.name: await data_content_utils.get_row_count_async(
+                table, async_engine
+            )
+        },
+    }
+
+
+@app.post("/generate/fanout")
+async def generate_fanout(payload: models.FanoutGeneratePayload):
+    names = payload.targets or list(target_engines)
+    unknown = [name for name in names if name not in target_engines]
+    if unknown:
+        raise HTTPException(404, "Targets {} not found".format(", ".join(unknown)))
+    engines = {name: target_engines[name] for name in names}
+
+    # the default target holds the table definition
+    await reflect_tables_async([payload.table_name])
+    table = data_structure_utils.get_existing_table(payload.table_name, db_metadata)
+    if table is None:
+        raise HTTPException(404, "Table {} not found".format(payload.table_name))
+
+    unique_columns = await get_unique_columns(table.name)
+    if payload.shard_key is not None:
+        column = table.columns.get(payload.shard_key)
+        if column is None:
+            raise HTTPException(
+                400,
+                "Column {} not found in table {}".format(payload.shard_key, table.name),
+            )
+        # integer primary keys are left to the database, so there is no value
+        # to hash before the insert
         if (
-            data_content_utils.get_row_count(table, engine) > 0
-            and len(unique_columns) > 0
+            isinstance(column.type, sqlalchemy.types.Integer)
+            and column.primary_key
+            and column.name not in unique_columns
         ):
             raise HTTPException(
                 400,
-                "Table {} has unique constraints and already contains data. Cannot generate new data without violating unique constraints.".format(
-                    table_name
+                "Column {} is generated by the database and cannot be a shard key".format(
+                    column.name
                 ),
             )
 
-        with Session(engine) as session:
-            data_content_utils.insert_generated_values(
-                table, item.row_number, session, settings, unique_columns
+    try:
+        ordering_utils.validate_ordering(table, payload.ordering, unique_columns)
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+
+    partitioning = await run_in_threadpool(
+        partition_utils.get_table_partitions, engine, table
+    )
+    created = await fanout_utils.create_missing_tables(table, engines, partitioning)
+    for target_engine in engines.values():
+        await check_can_generate(table, unique_columns, target_engine)
+    # shared by all targets, the pressure is probed on the first one
+    throttle = (
+        throttle_utils.Throttle(
+            table, payload.throttle, settings, next(iter(engines.values()))
+        )
+        if payload.throttle is not None
+        else None
+    )
+
+    sessions = {
+        name: AsyncSession(target_engine) for name, target_engine in engines.items()
+    }
+    active_loads.add(table.name)
+    try:
+        targets, elapsed_seconds = await fanout_utils.insert_fanout(
+            table,
+            payload.row_number,
+            sessions,
+            settings,
+            unique_columns,
+            payload.mode,
+            payload.shard_key,
+            generation_executor,
+            payload.ordering,
+            throttle,
+        )
+    except fanout_utils.FanoutError as e:
+        # rows committed before the failure stay, the report says where
+        raise HTTPException(500, {"error": str(e), "targets": e.targets})
+    finally:
+        active_loads.discard(table.name)
+        for session in sessions.values():
+            await session.close()
+
+    for name, target_engine in engines.items():
+        targets[name]["total_rows"] = await data_content_utils.get_row_count_async(
+            table, target_engine
+        )
+
+    response: dict = {
+        "mode": payload.mode,
+        "elapsed_seconds": round(elapsed_seconds, 3),
+        "created_tables": created,
+        "targets": targets,
+    }
+    if throttle is not None:
+        response["throttle"] = throttle.get_stats()
+
+    return response
+
+
+@app.post("/generate_sized")
+async def generate_sized(
+    payload: models.SizedGeneratePayload,
+    maintenance: bool = False,
+    indexes: bool = True,
+):
+    await run_in_threadpool(state_utils.ensure_state_tables, engine)
+    await reflect_tables_async(list(payload.tables))
+
+    tables = {}
+    unique_columns = {}
+    for table_name in payload.tables:
+        table = data_structure_utils.get_existing_table(table_name, db_metadata)
+        if table is None:
+            raise HTTPException(404, "Table {} not found".format(table_name))
+        unique_columns[table_name] = await get_unique_columns(table_name)
+        await check_can_generate(table, unique_columns[table_name])
+        tables[table_name] = table
+
+    loop = asyncio.get_running_loop()
+    fake = data_content_utils.get_faker()
+    row_widths = {}
+    for table_name, table in tables.items():
+        row_widths[table_name] = await loop.run_in_executor(
+            generation_executor,
+            sizing_utils.estimate_row_width,
+            table,
+            fake,
+            settings,
+            unique_columns[table_name],
+        )
+    row_counts = sizing_utils.compute_row_counts(
+        payload.tables,
+        row_widths,
+        settings,
+        scale_factor=payload.scale_factor,
+        target_bytes=payload.get_target_bytes(),
+    )
+
+    result = {}
+    for table_name, table in tables.items():
+        await load_table(table, row_counts[table_name], unique_columns[table_name])
+        result[table_name] = {
+            "row_number": row_counts[table_name],
+            "row_width": row_widths[table_name],
+            "estimated_bytes": sizing_utils.estimate_table_bytes(
+                row_widths[table_name], row_counts[table_name]
+            ),
+            **await sizing_utils.get_relation_sizes(table, async_engine),
+        }
+
+    response: dict = {
+        "tables": result,
+    }
+    if indexes:
+        response["indexes"] = await build_indexes(list(tables.values()))
+    if maintenance:
+        response["maintenance"] = await maintain_tables(list(tables.values()))
+
+    return response
+
+
+@app.get("/indexes")
+def get_indexes(table_name: str | None = None):
+    state_utils.ensure_state_tables(engine)
+
+    return {
+        "indexes": index_utils.get_indexes(engine, table_name),
+    }
+
+
+@app.post("/indexes/build")
+async def build_table_indexes(payload: models.IndexBuildPayload):
+    await run_in_threadpool(state_utils.ensure_state_tables, engine)
+    await reflect_tables_async(payload.tables)
+
+    tables = []
+    for table_name in payload.tables:
+        table = data_structure_utils.get_existing_table(table_name, db_metadata)
+        if table is None:
+            raise HTTPException(404, "Table {} not found".format(table_name))
+        if table.name in active_loads:
+            raise HTTPException(409, "Table {} is being loaded".format(table.name))
+        tables.append(table)
+
+    return await build_indexes(tables)
+
+
+@app.post("/maintenance")
+async def run_maintenance(payload: models.MaintenancePayload):
+    await reflect_tables_async(payload.tables)
+
+    tables = []
+    for table_name in payload.tables:
+        table = data_structure_utils.get_existing_table(table_name, db_metadata)
+        if table is None:
+            raise HTTPException(404, "Table {} not found".format(table_name))
+        if table.name in active_loads:
+            raise HTTPException(409, "Table {} is being loaded".format(table.name))
+        tables.append(table)
+
+    return await maintain_tables(tables, payload.freeze)
+
+
+@app.post("/generate_from_stats")
+async def generate_from_stats(payload: models.StatsGeneratePayload):
+    await reflect_tables_async([payload.source_table, payload.target_table])
+
+    source_table = data_structure_utils.get_existing_table(
+        payload.source_table, db_metadata
+    )
+    if source_table is None:
+        raise HTTPException(404, "Table {} not found".format(payload.source_table))
+
+    try:
+        source_stats = await run_in_threadpool(
+            pg_stats_utils.get_table_stats, source_table, engine
+        )
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+
+    target_table = data_structure_utils.get_existing_table(
+        payload.target_table, db_metadata
+    )
+    if target_table is None:
+        target_table = await run_in_threadpool(
+            data_structure_utils.create_table_like,
+            source_table,
+            payload.target_table,
+            engine,
+            db_metadata,
+        )
+    elif await data_content_utils.get_row_count_async(target_table, async_engine) > 0:
+        raise HTTPException(
+            400, "Table {} already contains data.".format(payload.target_table)
+        )
+
+    row_number = payload.row_number
+    if row_number is None:
+        row_number = await run_in_threadpool(
+            pg_stats_utils.get_estimated_row_count, source_table, engine
+        )
+    if row_number <= 0:
+        raise HTTPException(
+            400,
+            "Row count of table {} is unknown. Pass row_number explicitly.".format(
+                payload.source_table
+            ),
+        )
+
+    async with AsyncSession(async_engine) as session:
+        await pg_stats_utils.insert_values_from_stats(
+            target_table,
+            source_stats,
+            row_number,
+            session,
+            settings,
+            generation_executor,
+        )
+
+    await run_in_threadpool(pg_stats_utils.analyze_table, target_table, engine)
+    target_stats = await run_in_threadpool(
+        pg_stats_utils.get_table_stats, target_table, engine
+    )
+
+    return {
+        "Total rows in tables": {
+            payload.target_table: await data_content_utils.get_row_count_async(
+                target_table, async_engine
+            )
+        },
+        "statistics": pg_stats_utils.compare_table_stats(source_stats, target_stats),
+    }
+
+
+@app.post("/amplify")
+async def amplify_table(payload: models.AmplifyPayload):
+    await reflect_tables_async([payload.table_name])
+    table = data_structure_utils.get_existing_table(payload.table_name, db_metadata)
+    if table is None:
+        raise HTTPException(404, "Table {} not found".format(payload.table_name))
+    if table.name in active_loads:
+        raise HTTPException(409, "Table {} is being loaded".format(table.name))
+
+    unique_columns = await get_unique_columns(table.name)
+    active_loads.add(table.name)
+    try:
+        result = await run_in_threadpool(
+            amplify_utils.amplify_table,
+            table,
+            engine,
+            payload.factor,
+            unique_columns,
+            settings,
+            payload.perturb,
+        )
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+    except sqlalchemy.exc.IntegrityError as e:
+        # unique indexes and multi-column constraints are not shifted
+        raise HTTPException(
+            409,
+            "Amplified rows of table {} violate a constraint: {}".format(
+                table.name, str(e.orig).splitlines()[0]
+            ),
+        )
+    finally:
+        active_loads.discard(table.name)
+
+    return {
+        **result,
+        "Total rows in tables": {
+            table.name: await data_content_utils.get_row_count_async(
+                table, async_engine
             )
-        total_count = data_content_utils.get_row_count(table, engine)
+        },
+    }
 
-        result[item.table_name] = total_count
+
+@app.post("/workload/run")
+async def run_workload(payload: models.WorkloadPayload):
+    await run_in_threadpool(state_utils.ensure_state_tables, engine)
+
+    # a dedicated pool, so every client holds its own connection
+    workload_engine = utils.get_async_db_engine(
+        settings, pool_size=payload.clients, max_overflow=0
+    )
+    try:
+        result = await workload_utils.run_workload(workload_engine, payload)
+    finally:
+        await workload_engine.dispose()
+
+    dataset = await run_in_threadpool(workload_utils.get_dataset_snapshot, engine)
+    run_id = await run_in_threadpool(
+        workload_utils.save_workload_run, engine, payload, dataset, result
+    )
 
     return {
-        "Total rows in tables": result,
+        "id": run_id,
+        "dataset": dataset,
+        "result": result,
+    }
+
+
+async def run_churn(workload: churn_utils.ChurnWorkload):
+    # nobody awaits the task until a stop, so failures are kept on the workload
+    try:
+        try:
+            result = await workload.run()
+        finally:
+            await workload.engine.dispose()
+
+        dataset = await run_in_threadpool(workload_utils.get_dataset_snapshot, engine)
+        await run_in_threadpool(
+            workload_utils.save_workload_run, engine, workload.payload, dataset, result
+        )
+    except Exception as e:
+        logger.error("Churn {} failed: {}".format(workload.payload.name, e))
+        workload.error = str(e).splitlines()[0] if str(e) else repr(e)
+
+
+@app.post("/workload/churn")
+async def start_churn(payload: models.ChurnPayload):
+    # checked and reserved before the first await, so two quick calls
+    # cannot both start
+    if payload.name in churn_starting or (
+        payload.name in churn_workloads and churn_workloads[payload.name].running
+    ):
+        raise HTTPException(409, "Churn {} is running".format(payload.name))
+    churn_starting.add(payload.name)
+    try:
+        await run_in_threadpool(state_utils.ensure_state_tables, engine)
+        await reflect_tables_async(payload.tables)
+        targets = []
+        for table_name in payload.tables:
+            table = data_structure_utils.get_existing_table(table_name, db_metadata)
+            if table is None:
+                raise HTTPException(404, "Table {} not found".format(table_name))
+            unique_columns = await get_unique_columns(table_name)
+            try:
+                targets.append(
+                    await churn_utils.get_churn_target(
+                        table, unique_columns, async_engine, settings
+                    )
+                )
+            except ValueError as e:
+                raise HTTPException(400, str(e))
+        if churn_utils.has_text_columns(targets):
+            # the clients generate rows on the event loop, so the corpus is
+            # built here instead of by their first insert
+            await run_in_threadpool(
+                text_corpus_utils.get_text_corpus,
+                data_content_utils.get_faker(),
+                settings,
+            )
+
+        # a dedicated pool, so every client holds its own connection
+        churn_engine = utils.get_async_db_engine(
+            settings, pool_size=payload.clients, max_overflow=0
+        )
+        workload = churn_utils.ChurnWorkload(churn_engine, payload, targets, settings)
+        churn_workloads[payload.name] = workload
+        churn_tasks[payload.name] = asyncio.create_task(run_churn(workload))
+    finally:
+        churn_starting.discard(payload.name)
+
+    return {
+        "name": payload.name,
+        "running": True,
+        "duration_seconds": payload.duration_seconds,
+    }
+
+
+@app.get("/workload/churn")
+def get_churn_workloads():
+    return {
+        "churn": [workload.get_status() for workload in churn_workloads.values()],
+    }
+
+
+@app.post("/workload/churn/{name}/stop")
+async def stop_churn(name: str):
+    if name not in churn_workloads:
+        raise HTTPException(404, "Churn {} not found".format(name))
+
+    churn_workloads[name].stop()
+    await churn_tasks[name]
+
+    return churn_workloads[name].get_status()
+
+
+@app.get("/workload/runs")
+def get_workload_runs(name: str | None = None):
+    state_utils.ensure_state_tables(engine)
+
+    return {
+        "runs": workload_utils.get_workload_runs(engine, name),
+    }
+
+
+@app.post("/explain")
+def explain_query(payload: models.ExplainPayload):
+    state_utils.ensure_state_tables(engine)
+
+    previous_runs = explain_utils.get_explain_runs(engine, payload.label)
+    explain = explain_utils.explain_query(engine, payload.sql)
+    dataset = workload_utils.get_dataset_snapshot(engine)
+    run_id = explain_utils.save_explain_run(
+        engine, payload.label, payload.sql, explain, dataset, settings
+    )
+
+    return {
+        "id": run_id,
+        "planning_time_ms": explain.get("Planning Time"),
+        "execution_time_ms": explain.get("Execution Time"),
+        "plan": explain["Plan"],
+        "diff": explain_utils.diff_plans(previous_runs[-1]["plan"], explain, settings)
+        if previous_runs
+        else None,
+    }
+
+
+@app.get("/explain/diff")
+def diff_explain_runs(
+    label: str, base_id: int | None = None, compare_id: int | None = None
+):
+    state_utils.ensure_state_tables(engine)
+
+    runs = explain_utils.get_explain_runs(engine, label)
+    try:
+        base, compare = explain_utils.pick_runs(runs, base_id, compare_id)
+    except ValueError as e:
+        raise HTTPException(404, "{} for {}".format(e, label))
+
+    return {
+        "base": {"id": base["id"], "dataset": base["dataset"]},
+        "compare": {"id": compare["id"], "dataset": compare["dataset"]},
+        "diff": explain_utils.diff_plans(base["plan"], compare["plan"], settings),
     }
 
 
+@app.post("/advise_indexes")
+def advise_indexes(payload: models.IndexAdvisorPayload):
+    return index_advisor_utils.advise_indexes(
+        engine, db_metadata, payload.queries, settings, payload.mode
+    )
+
+
+@app.get("/profiles")
+def get_profiles():
+    return {
+        "profiles": profiling_utils.get_profiles(settings),
+    }
+
+
+@app.get("/profiles/{profile_id}")
+def get_profile(profile_id: str):
+    try:
+        profile = profiling_utils.get_profile(settings, profile_id)
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+    if profile is None:
+        raise HTTPException(404, "Profile {} not found".format(profile_id))
+
+    return profile
+
+
+@app.get("/profiles/{profile_id}/collapsed", response_class=PlainTextResponse)
+def get_profile_stacks(profile_id: str):
+    try:
+        stacks = profiling_utils.get_collapsed_stacks(settings, profile_id)
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+    if stacks is None:
+        raise HTTPException(404, "Profile {} not found".format(profile_id))
+
+    return stacks
+
+
 @app.post("/create_tables_leetcode")
 def create_tables_leetcode(sql: str = Body(..., media_type="text/plain")):
     table_list = []
@@ -108,18 +1102,21 @@ def create_tables_leetcode(sql: str = Body(..., media_type="text/plain")):
                         continue
                     if statement.upper().startswith("CREATE TABLE IF NOT EXISTS"):
                         table_name = statement.split()[5]
-                        table_list.append(table_name)
+                        table_list.append(
+                            data_structure_utils.normalize_table_name(table_name)
+                        )
                     elif statement.upper().startswith("CREATE TABLE"):
                         table_name = statement.split()[2]
-                        table_list.append(table_name)
+                        table_list.append(
+                            data_structure_utils.normalize_table_name(table_name)
+                        )
                     connection.execute(sqlalchemy.text(statement))
                 connection.commit()
             except Exception as e:
                 connection.rollback()
                 logger.error("Error executing SQL statements: {}".format(e))
                 raise HTTPException(500, "Error executing SQL statements: {}".format(e))
-        db_metadata.clear()
-        db_metadata.reflect(engine)
+            data_structure_utils.reflect_tables(connection, table_list, db_metadata)
     except Exception as e:
         logger.error("Database connection error: {}".format(e))
         raise HTTPException(500, "Database connection error: {}".format(e))
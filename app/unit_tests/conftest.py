@@ -3,11 +3,12 @@ from faker import Faker
 import os
 from unittest import mock
 
-from unittest.mock import MagicMock, Mock
+from unittest.mock import AsyncMock, MagicMock, Mock
 
 import sqlalchemy
 
 from sqlalchemy import Table, Column, Integer
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
 from sqlalchemy.orm import Session
 
 
@@ -46,6 +47,22 @@ def mock_session_exception():
     return mock_session
 
 
+@pytest.fixture
+def mock_async_session_success():
+    mock_session = AsyncMock(spec=AsyncSession)
+    mock_session.execute.return_value = None
+    mock_session.commit.return_value = None
+    return mock_session
+
+
+@pytest.fixture
+def mock_async_session_exception():
+    mock_session = AsyncMock(spec=AsyncSession)
+    mock_session.execute.side_effect = Exception("Mocked error")
+    mock_session.commit.return_value = None
+    return mock_session
+
+
 def get_mock_table():
     mock_table = Mock(spec=Table)
     mock_table.name = "dummy_table"
@@ -120,3 +137,32 @@ def mock_engine_exception():
     mock_engine.connect.side_effect = Exception("Mocked error")
 
     return mock_engine
+
+
+@pytest.fixture
+def mock_async_engine_success():
+    mock_result = Mock()
+    mock_result.first.return_value = (42,)
+    mock_result.scalar.return_value = 42
+
+    mock_conn = AsyncMock()
+    mock_conn.execute.return_value = mock_result
+
+    cm = MagicMock()
+    cm.__aenter__.return_value = mock_conn
+    cm.__aexit__.return_value = None
+
+    mock_engine = Mock(spec=AsyncEngine)
+    mock_engine.connect.return_value = cm
+    mock_engine.begin.return_value = cm
+
+    return mock_engine
+
+
+@pytest.fixture
+def mock_async_engine_exception():
+    mock_engine = Mock(spec=AsyncEngine)
+    mock_engine.connect.side_effect = Exception("Mocked error")
+    mock_engine.begin.side_effect = Exception("Mocked error")
+
+    return mock_engine
@@ -0,0 +1,203 @@
+from datetime import date
+from unittest.mock import MagicMock, Mock
+
+import pytest
+import sqlalchemy
+from sqlalchemy import Column, Date, Integer, MetaData, String, Table
+from sqlalchemy.dialects import postgresql
+
+
+def get_table():
+    return Table(
+        "users",
+        MetaData(),
+        Column("id", Integer, primary_key=True, server_default=sqlalchemy.text("1")),
+        Column("email", String(30)),
+        Column("score", Integer),
+        Column("joined", Date),
+    )
+
+
+def get_conn(bounds_row):
+    conn = Mock()
+    conn.dialect = postgresql.dialect()
+    conn.execute.return_value.first.return_value = bounds_row
+    return conn
+
+
+def test_get_key_columns():
+    from app.amplify_utils import get_key_columns
+
+    table = get_table()
+
+    assert [column.name for column in get_key_columns(table, ["email"])] == ["email"]
+
+
+def test_get_batches():
+    from app.amplify_utils import get_batches
+
+    assert get_batches(40, 5, 100) == [
+        {"first_copy": 1, "last_copy": 2, "first_row": 0, "last_row": 40},
+        {"first_copy": 3, "last_copy": 4, "first_row": 0, "last_row": 40},
+        {"first_copy": 5, "last_copy": 5, "first_row": 0, "last_row": 40},
+    ]
+    assert get_batches(250, 2, 100)[:3] == [
+        {"first_copy": 1, "last_copy": 1, "first_row": 0, "last_row": 100},
+        {"first_copy": 1, "last_copy": 1, "first_row": 100, "last_row": 200},
+        {"first_copy": 1, "last_copy": 1, "first_row": 200, "last_row": 250},
+    ]
+
+
+def test_get_amplify_statement(get_settings):
+    from app.amplify_utils import get_amplify_statement
+
+    conn = get_conn(("a@b.c", "z@b.c", 10))
+    statement = str(
+        get_amplify_statement(conn, get_table(), 10, ["email"], get_settings, True)
+    )
+
+    assert statement.startswith("INSERT INTO users (email, score, joined) SELECT")
+    assert "email || '_' || copy_number" in statement
+    assert "CAST(round(score * (1 + (random() * 2 - 1) * 0.1)) AS INTEGER)" in statement
+    assert "INTERVAL '1 day' AS DATE)" in statement
+    assert "generate_series(:first_copy, :last_copy)" in statement
+
+
+def test_get_amplify_statement_integer_key(get_settings):
+    from app.amplify_utils import get_amplify_statement
+
+    table = Table(
+        "events",
+        MetaData(),
+        Column("id", Integer, primary_key=True, autoincrement=False),
+        Column("day", Date, unique=True),
+    )
+    conn = get_conn((1, 100, None, date(2020, 1, 1), date(2020, 1, 10), None))
+    statement = str(get_amplify_statement(conn, table, 3, ["day"], get_settings, False))
+
+    assert "id + copy_number * 100" in statement
+    assert "CAST(day + copy_number * 10 * INTERVAL '1 day' AS DATE)" in statement
+
+
+@pytest.mark.parametrize(
+    "column, bounds, message",
+    [
+        (Column("code", String(8)), ("aaaaaaa", "bbbbbbb", 7), "too short"),
+        (Column("code", Integer), (0, 2**30, None), "overflow"),
+        (
+            Column("code", sqlalchemy.Boolean),
+            (False, True, None),
+            "cannot be amplified",
+        ),
+    ],
+)
+def test_get_amplify_statement_invalid_key(get_settings, column, bounds, message):
+    from app.amplify_utils import get_amplify_statement
+
+    table = Table("codes", MetaData(), column)
+    with pytest.raises(ValueError) as excinfo:
+        get_amplify_statement(
+            get_conn(bounds), table, 10, ["code"], get_settings, False
+        )
+    assert message in str(excinfo.value)
+
+
+def test_amplify_table_failure(mock_engine_exception, get_settings):
+    from app.amplify_utils import amplify_table
+
+    mock_engine_exception.dialect = postgresql.dialect()
+    with pytest.raises(Exception) as excinfo:
+        amplify_table(get_table(), mock_engine_exception, 2, [], get_settings)
+    assert "Mocked error" in str(excinfo.value)
+
+
+def get_fk_tables():
+    metadata = MetaData()
+    Table("users", metadata, Column("id", Integer, primary_key=True))
+    orders = Table(
+        "orders",
+        metadata,
+        Column("id", Integer, primary_key=True, autoincrement=False),
+        Column("user_id", Integer, sqlalchemy.ForeignKey("users.id"), unique=True),
+    )
+    user_roles = Table(
+        "user_roles",
+        metadata,
+        Column("user_id", Integer, sqlalchemy.ForeignKey("users.id"), primary_key=True),
+        Column("role", String(10)),
+    )
+    return orders, user_roles
+
+
+def test_get_key_columns_skips_foreign_keys():
+    from app.amplify_utils import get_key_columns
+
+    orders, _ = get_fk_tables()
+
+    assert [column.name for column in get_key_columns(orders, [])] == ["id"]
+
+
+@pytest.mark.parametrize(
+    "table_index, unique_columns, message",
+    [
+        (0, ["user_id"], "Unique column user_id is a foreign key"),
+        (1, [], "Primary key of table user_roles consists of foreign keys"),
+    ],
+)
+def test_get_key_columns_foreign_key_error(table_index, unique_columns, message):
+    from app.amplify_utils import get_key_columns
+
+    with pytest.raises(ValueError) as excinfo:
+        get_key_columns(get_fk_tables()[table_index], unique_columns)
+    assert message in str(excinfo.value)
+
+
+def get_engine(conn):
+    cm = MagicMock()
+    cm.__enter__.return_value = conn
+
+    engine = Mock(spec=sqlalchemy.Engine)
+    engine.dialect = postgresql.dialect()
+    engine.connect.return_value = cm
+    return engine
+
+
+def test_amplify_table(get_settings):
+    from app.amplify_utils import amplify_table
+
+    get_settings.amplify_batch_rows = 100
+    conn = get_conn(("a@b.c", "z@b.c", 10))
+    conn.execute.return_value.scalar_one.return_value = 40
+
+    result = amplify_table(get_table(), get_engine(conn), 4, ["email"], get_settings)
+
+    assert result["source_rows"] == 40
+    assert result["rows_inserted"] == 120
+    assert result["batches"] == 2
+    statements = [str(call.args[0]) for call in conn.execute.call_args_list]
+    assert statements[0].startswith("CREATE TEMPORARY TABLE _amplify_source")
+    assert (
+        sum(statement.startswith("INSERT INTO users") for statement in statements) == 2
+    )
+    assert statements[-1] == "DROP TABLE IF EXISTS _amplify_source"
+    # the batch parameters go with the INSERT
+    assert conn.execute.call_args_list[-2].args[1] == {
+        "first_copy": 3,
+        "last_copy": 3,
+        "first_row": 0,
+        "last_row": 40,
+    }
+
+
+def test_amplify_table_empty(get_settings):
+    from app.amplify_utils import amplify_table
+
+    conn = get_conn(None)
+    conn.execute.return_value.scalar_one.return_value = 0
+
+    with pytest.raises(ValueError) as excinfo:
+        amplify_table(get_table(), get_engine(conn), 2, [], get_settings)
+
+    assert "Table users is empty" in str(excinfo.value)
+    conn.rollback.assert_called_once()
+    assert str(conn.execute.call_args.args[0]) == "DROP TABLE IF EXISTS _amplify_source"
@@ -0,0 +1,58 @@
+def get_batcher(settings, initial_size=1000):
+    from app.batching_utils import AdaptiveBatcher
+
+    settings.batch_target_seconds = 1.0
+    settings.batch_memory_bytes = 1024**2
+    settings.min_batch_size = 100
+    settings.max_batch_size = 10_000
+    return AdaptiveBatcher("dummy", initial_size, settings)
+
+
+def test_measure_row_bytes():
+    from app.batching_utils import measure_row_bytes
+
+    assert measure_row_bytes([]) == 0
+    assert measure_row_bytes([{"a": "x" * 1000}]) > measure_row_bytes([{"a": 1}])
+
+
+def test_adaptive_batcher_grows_gradually(get_settings):
+    batcher = get_batcher(get_settings)
+
+    rows = [{"id": 1}] * 1000
+
+    assert batcher.observe(rows, 0.01) == 2000
+    assert batcher.observe(rows, 0.01) == 4000
+
+
+def test_adaptive_batcher_shrinks_on_slow_commits(get_settings):
+    batcher = get_batcher(get_settings)
+
+    assert batcher.observe([{"id": 1}] * 1000, 1.6) == 625
+
+
+def test_adaptive_batcher_respects_memory_budget(get_settings):
+    batcher = get_batcher(get_settings)
+
+    rows = [{"text": "x" * 2000}] * 1000
+    size = batcher.observe(rows, 0.01)
+
+    assert size * batcher.row_bytes <= get_settings.batch_memory_bytes
+    assert size >= 100
+
+
+def test_adaptive_batcher_clamps(get_settings):
+    small = get_batcher(get_settings, initial_size=10)
+    large = get_batcher(get_settings, initial_size=50_000)
+
+    assert small.min_size == 10
+    assert large.size == 10_000
+    assert small.observe([{"id": 1}] * 10, 100) == 10
+
+
+def test_adaptive_batcher_metrics(get_settings):
+    from app.batching_utils import batch_size_rows
+
+    batcher = get_batcher(get_settings)
+    batcher.observe([{"id": 1}] * 1000, 0.01)
+
+    assert batch_size_rows.labels("dummy")._value.get() == 2000
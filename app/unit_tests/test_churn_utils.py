@@ -0,0 +1,240 @@
+import asyncio
+import random
+
+import pytest
+import sqlalchemy
+from sqlalchemy import Column, ForeignKey, Integer, MetaData, String, Table
+
+
+def get_table(serial=True):
+    metadata = MetaData()
+    Table("teams", metadata, Column("id", Integer, primary_key=True))
+    # as reflected from a serial column
+    server_default = sqlalchemy.text("nextval('players_id_seq')") if serial else None
+    return Table(
+        "players",
+        metadata,
+        Column("id", Integer, primary_key=True, server_default=server_default),
+        Column("team_id", Integer, ForeignKey("teams.id")),
+        Column("email", String(50)),
+        Column("score", Integer),
+    )
+
+
+def get_payload(**kwargs):
+    from app.models import ChurnPayload
+
+    return ChurnPayload(
+        **{
+            "name": "churn",
+            "tables": ["players"],
+            "clients": 2,
+            "duration_seconds": 5,
+            "target_rate": None,
+            **kwargs,
+        }
+    )
+
+
+def get_target(table, get_settings):
+    from app.churn_utils import get_churn_key, get_update_column, has_generated_key
+
+    key = get_churn_key(table)
+    return {
+        "table": table,
+        "key": key,
+        "low": 1,
+        "high": 100,
+        "next_key": None if has_generated_key(key) else 101,
+        "unique_columns": ["email"],
+        "update_column": get_update_column(table, ["email"]),
+        "counters": {},
+        "statements": {},
+    }
+
+
+def test_get_churn_key():
+    from app.churn_utils import get_churn_key
+
+    assert get_churn_key(get_table()).name == "id"
+
+    table = Table("tags", MetaData(), Column("name", String(10), primary_key=True))
+    with pytest.raises(ValueError) as excinfo:
+        get_churn_key(table)
+    assert "single integer primary key" in str(excinfo.value)
+
+
+def test_has_text_columns(get_settings):
+    from app.churn_utils import has_text_columns
+
+    notes = Table(
+        "notes",
+        MetaData(),
+        Column("id", Integer, primary_key=True),
+        Column("body", sqlalchemy.Text),
+    )
+
+    assert not has_text_columns([get_target(get_table(), get_settings)])
+    assert has_text_columns(
+        [get_target(get_table(), get_settings), get_target(notes, get_settings)]
+    )
+
+
+def test_get_update_column():
+    from app.churn_utils import get_update_column
+
+    assert get_update_column(get_table(), ["email"]).name == "score"
+    assert get_update_column(get_table(), ["email", "score"]).name == "id"
+
+
+def test_pick_key():
+    from app.churn_utils import pick_key
+
+    random.seed(1)
+    keys = [pick_key(1, 1000, 0.1, 0.9) for _ in range(1000)]
+
+    assert all(1 <= key <= 1000 for key in keys)
+    hot = sum(1 for key in keys if key <= 100)
+    assert 850 <= hot <= 950
+
+
+def test_churn_get_params(mock_async_engine_success, get_settings):
+    from app.churn_utils import ChurnWorkload
+
+    table = get_table()
+    target = get_target(table, get_settings)
+    workload = ChurnWorkload(
+        mock_async_engine_success, get_payload(), [target], get_settings
+    )
+
+    assert set(workload.get_params(target, "update")) == {"key", "value"}
+    assert set(workload.get_params(target, "delete")) == {"key"}
+    row = workload.get_params(target, "insert")
+    assert "id" not in row
+    assert row["email"] == "dummy_email_1@dummy.dummy"
+
+
+def test_churn_get_params_manual_key(mock_async_engine_success, get_settings):
+    from app.churn_utils import ChurnWorkload
+
+    target = get_target(get_table(serial=False), get_settings)
+    workload = ChurnWorkload(
+        mock_async_engine_success, get_payload(), [target], get_settings
+    )
+
+    # without a sequence the keys continue after the highest one
+    assert workload.get_params(target, "insert")["id"] == 101
+    assert workload.get_params(target, "insert")["id"] == 102
+
+
+def test_churn_execute_insert(mock_async_engine_success, get_settings):
+    from app.churn_utils import ChurnWorkload
+
+    target = get_target(get_table(), get_settings)
+    target["statements"]["insert"] = sqlalchemy.text("SELECT 1")
+    workload = ChurnWorkload(
+        mock_async_engine_success, get_payload(), [target], get_settings
+    )
+    conn = mock_async_engine_success.begin.return_value.__aenter__.return_value
+    result = conn.execute.return_value
+
+    result.scalar_one_or_none.return_value = 150
+    assert asyncio.run(workload.execute(target, "insert")) == 1
+    # the new row can be updated and deleted from now on
+    assert target["high"] == 150
+
+    # skipped on a recycled unique value
+    result.scalar_one_or_none.return_value = None
+    assert asyncio.run(workload.execute(target, "insert")) == 0
+    assert target["high"] == 150
+
+
+def test_churn_status_error(mock_async_engine_success, get_settings):
+    from app.churn_utils import ChurnWorkload
+
+    workload = ChurnWorkload(
+        mock_async_engine_success,
+        get_payload(),
+        [get_target(get_table(), get_settings)],
+        get_settings,
+    )
+    # running from its registration, before the task starts
+    assert workload.running
+
+    workload.error = "Mocked error"
+
+    assert not workload.running
+    assert workload.get_status() == {
+        "name": "churn",
+        "running": False,
+        "error": "Mocked error",
+    }
+
+
+def test_churn_run_until_stopped(mocker, mock_async_engine_success, get_settings):
+    from app.churn_utils import ChurnWorkload
+
+    workload = ChurnWorkload(
+        mock_async_engine_success,
+        get_payload(target_rate=200),
+        [get_target(get_table(), get_settings)],
+        get_settings,
+    )
+    mocker.patch.object(workload, "execute", return_value=1)
+
+    async def run():
+        task = asyncio.create_task(workload.run())
+        await asyncio.sleep(0.2)
+        assert workload.running
+        workload.stop()
+        return await task
+
+    result = asyncio.run(run())
+
+    assert not workload.running
+    assert result["duration_seconds"] < 5
+    assert result["transactions"] > 0
+    assert result["errors"] == 0
+    assert (
+        sum(operation["rows_affected"] for operation in result["operations"].values())
+        == result["transactions"]
+    )
+    assert workload.get_status()["result"] == result
+
+
+def test_churn_run_errors(mocker, mock_async_engine_exception, get_settings):
+    from app.churn_utils import ChurnWorkload
+
+    workload = ChurnWorkload(
+        mock_async_engine_exception,
+        get_payload(duration_seconds=0.05, target_rate=100, clients=1),
+        [get_target(get_table(), get_settings)],
+        get_settings,
+    )
+    workload.targets[0]["statements"] = {
+        "update": sqlalchemy.text("SELECT 1"),
+        "delete": sqlalchemy.text("SELECT 1"),
+        "insert": sqlalchemy.text("SELECT 1"),
+    }
+
+    result = asyncio.run(workload.run())
+
+    assert result["transactions"] == 0
+    assert result["errors"] > 0
+    assert any(
+        operation.get("last_error") == "Mocked error"
+        for operation in result["operations"].values()
+    )
+
+
+def test_get_churn_target_empty_table(mock_async_engine_success, get_settings):
+    from app.churn_utils import get_churn_target
+
+    conn = mock_async_engine_success.connect.return_value.__aenter__.return_value
+    conn.execute.return_value.one.return_value = (None, None, 0)
+
+    with pytest.raises(ValueError) as excinfo:
+        asyncio.run(
+            get_churn_target(get_table(), [], mock_async_engine_success, get_settings)
+        )
+    assert "is empty" in str(excinfo.value)
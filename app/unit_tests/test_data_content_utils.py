@@ -1,5 +1,7 @@
-from datetime import datetime
-from unittest.mock import MagicMock
+import asyncio
+import random
+from datetime import date, datetime
+from unittest.mock import AsyncMock, MagicMock
 
 import pytest
 import sqlalchemy.types
@@ -27,9 +29,10 @@ def test_generate_single_value_date(faker, get_settings):
     from app.data_content_utils import generate_single_value
 
     field = sqlalchemy.Column("test", sqlalchemy.types.Date)
-    result_value = generate_single_value(field, faker, get_settings)
-    assert type(result_value) is str
-    assert len(result_value.split("-")) == 3
+    result_values = [
+        generate_single_value(field, faker, get_settings) for _ in range(100)
+    ]
+    assert all(isinstance(value, date) for value in result_values)
 
 
 def test_generate_single_value_float(faker, get_settings):
@@ -71,10 +74,7 @@ def test_generate_values_success(faker, get_settings):
         assert len(row) == len(fields) - 1  # identity does not return
 
     assert type(result_rows[0]["email"]) is str and "@" in result_rows[0]["email"]
-    assert (
-        type(result_rows[0]["created_at"]) is str
-        and len(result_rows[0]["created_at"].split("-")) == 3
-    )
+    assert all(isinstance(row["created_at"], date) for row in result_rows)
     assert type(result_rows[0]["score"]) is float
     assert (
         type(result_rows[0]["description"]) is str
@@ -229,8 +229,26 @@ def test_get_row_count_failure(mock_table, mock_engine_exception):
     assert "Mocked error" in str(excinfo.value)
 
 
+def test_get_row_count_async_success(mock_table, mock_async_engine_success):
+    from app.data_content_utils import get_row_count_async
+
+    result_count = asyncio.run(
+        get_row_count_async(mock_table, mock_async_engine_success)
+    )
+
+    assert result_count == 42
+
+
+def test_get_row_count_async_failure(mock_table, mock_async_engine_exception):
+    from app.data_content_utils import get_row_count_async
+
+    with pytest.raises(Exception) as excinfo:
+        asyncio.run(get_row_count_async(mock_table, mock_async_engine_exception))
+    assert "Mocked error" in str(excinfo.value)
+
+
 def test_insert_generated_values_success(
-    mock_table, mock_session_success, get_settings
+    mock_table, mock_async_session_success, get_settings
 ):
     from app.data_content_utils import insert_generated_values
 
@@ -243,11 +261,19 @@ def test_insert_generated_values_success(
     mock_table.columns = fields
     unique_columns = []
 
-    result_rows = insert_generated_values(
-        mock_table, row_number, mock_session_success, get_settings, unique_columns
+    inserted = asyncio.run(
+        insert_generated_values(
+            mock_table,
+            row_number,
+            mock_async_session_success,
+            get_settings,
+            unique_columns,
+        )
     )
 
-    mock_session_success.commit.assert_called_once()
+    mock_async_session_success.commit.assert_called_once()
+    assert inserted == row_number
+    result_rows = mock_async_session_success.execute.call_args[0][1]
     assert len(result_rows) == row_number
     for row in result_rows:
         assert len(row) == len(fields) - 1  # identity does not return
@@ -255,8 +281,34 @@ def test_insert_generated_values_success(
     assert type(result_rows[0]["email"]) is str and "@" in result_rows[0]["email"]
 
 
+def test_insert_generated_values_chunks_keep_unique_counters(
+    mock_table, mock_async_session_success, get_settings
+):
+    from app.data_content_utils import insert_generated_values
+
+    mock_table.columns = [
+        sqlalchemy.Column("username", sqlalchemy.types.String, nullable=False)
+    ]
+    get_settings.batch_size = 4
+
+    inserted = asyncio.run(
+        insert_generated_values(
+            mock_table, 10, mock_async_session_success, get_settings, ["username"]
+        )
+    )
+
+    assert inserted == 10
+    assert mock_async_session_success.commit.call_count == 3
+    usernames = [
+        row["username"]
+        for call in mock_async_session_success.execute.call_args_list
+        for row in call[0][1]
+    ]
+    assert usernames == ["dummy_value_{}".format(i) for i in range(1, 11)]
+
+
 def test_insert_generated_values_failure_on_execute(
-    mock_table, mock_session_exception, get_settings
+    mock_table, mock_async_session_exception, get_settings
 ):
     from app.data_content_utils import insert_generated_values
 
@@ -270,7 +322,219 @@ def test_insert_generated_values_failure_on_execute(
     unique_columns = ["id"]
 
     with pytest.raises(Exception) as excinfo:
-        insert_generated_values(
-            mock_table, row_number, mock_session_exception, get_settings, unique_columns
+        asyncio.run(
+            insert_generated_values(
+                mock_table,
+                row_number,
+                mock_async_session_exception,
+                get_settings,
+                unique_columns,
+            )
         )
     assert "Mocked error" in str(excinfo.value)
+
+
+def test_seed_generators_repeatable(faker, get_settings):
+    from app.data_content_utils import generate_values, seed_generators
+
+    fields = [
+        sqlalchemy.Column("email", sqlalchemy.types.String, nullable=False),
+        sqlalchemy.Column("score", sqlalchemy.types.Float, nullable=True),
+    ]
+    get_settings.seed = 42
+
+    seed_generators(faker, get_settings)
+    first_rows = generate_values(fields, faker, 10, get_settings, [])
+    seed_generators(faker, get_settings)
+    second_rows = generate_values(fields, faker, 10, get_settings, [])
+
+    assert first_rows == second_rows
+
+
+def test_get_faker():
+    import sys
+
+    from app.data_content_utils import get_faker
+
+    fake = get_faker()
+
+    assert "faker" in sys.modules
+    assert isinstance(fake.name(), str)
+
+
+def test_insert_generated_values_into_partition(
+    mock_table, mock_async_session_success, get_settings
+):
+    from app.data_content_utils import insert_generated_values
+
+    mock_table.columns = [
+        sqlalchemy.Column("username", sqlalchemy.types.String, nullable=False),
+        sqlalchemy.Column("score", sqlalchemy.types.Integer, nullable=False),
+    ]
+    get_settings.batch_size = 4
+    partition = sqlalchemy.table(
+        "dummy_p1", sqlalchemy.column("username"), sqlalchemy.column("score")
+    )
+
+    inserted = asyncio.run(
+        insert_generated_values(
+            mock_table,
+            6,
+            mock_async_session_success,
+            get_settings,
+            ["username"],
+            target=partition,
+            column_values={
+                "score": lambda start, count: list(range(start, start + count))
+            },
+            row_offset=10,
+        )
+    )
+
+    assert inserted == 6
+    calls = mock_async_session_success.execute.call_args_list
+    assert calls[0][0][0].table is partition
+    rows = [row for call in calls for row in call[0][1]]
+    assert [row["score"] for row in rows] == list(range(6))
+    assert rows[0]["username"] == "dummy_value_11"
+
+
+def test_insert_generated_values_resumes_job(
+    mock_table, mock_async_session_success, get_settings
+):
+    from app.data_content_utils import insert_generated_values
+
+    mock_table.columns = [
+        sqlalchemy.Column("username", sqlalchemy.types.String, nullable=False),
+        sqlalchemy.Column("score", sqlalchemy.types.Integer, nullable=False),
+    ]
+    get_settings.batch_size = 100  # the job batch size wins
+    get_settings.adaptive_batching = False
+    job = {
+        "id": 1,
+        "seed": 3,
+        "batch_size": 4,
+        "plan_rows": 10,
+        "row_offset": 0,
+        "rows_inserted": 0,
+        "last_batch": -1,
+        "counter_state": {},
+    }
+
+    def run(job):
+        mock_async_session_success.execute.reset_mock()
+        asyncio.run(
+            insert_generated_values(
+                mock_table,
+                10,
+                mock_async_session_success,
+                get_settings,
+                ["username"],
+                job=job,
+            )
+        )
+        calls = mock_async_session_success.execute.call_args_list
+        # every insert is followed by the checkpoint of its batch
+        rows = [row for call in calls[::2] for row in call[0][1]]
+        checkpoints = [call[0][0].compile().params for call in calls[1::2]]
+        return rows, checkpoints
+
+    rows, checkpoints = run(job)
+    assert [c["rows_inserted"] for c in checkpoints] == [4, 8, 10]
+    assert [c["last_batch"] for c in checkpoints] == [0, 1, 2]
+
+    resumed_job = {
+        **job,
+        "rows_inserted": 4,
+        "last_batch": 0,
+        "counter_state": checkpoints[0]["counter_state"],
+    }
+    resumed_rows, _ = run(resumed_job)
+    assert resumed_rows == rows[4:]
+
+    # batches draw from their own generator, so parallel jobs and loads
+    # neither wait for nor disturb each other
+    state = random.getstate()
+    assert run(job)[0] == rows
+    assert random.getstate() == state
+
+
+def test_insert_generated_values_adapts_batch_size(
+    mocker, mock_table, mock_async_session_success, get_settings
+):
+    from app.data_content_utils import insert_generated_values
+
+    mock_table.columns = [sqlalchemy.Column("score", sqlalchemy.types.Integer)]
+    get_settings.batch_size = 10
+    # every insert takes 0.5s, so a 1s budget grows the batch
+    clock = mocker.patch("app.data_content_utils.time")
+    clock.perf_counter.side_effect = [i * 0.5 for i in range(100)]
+
+    inserted = asyncio.run(
+        insert_generated_values(
+            mock_table, 100, mock_async_session_success, get_settings, []
+        )
+    )
+
+    sizes = [len(c[0][1]) for c in mock_async_session_success.execute.call_args_list]
+    assert inserted == 100
+    # the second chunk is generated before the first commit is measured
+    assert sizes[:3] == [10, 10, 20]
+    assert max(sizes) > 20
+
+
+def test_insert_generated_values_with_ordering(
+    mock_async_session_success, get_settings
+):
+    from app.data_content_utils import insert_generated_values
+    from app.models import ColumnOrdering
+
+    table = sqlalchemy.Table(
+        "readings",
+        sqlalchemy.MetaData(),
+        sqlalchemy.Column("value", sqlalchemy.types.Float, nullable=False),
+    )
+    get_settings.batch_size = 4
+    get_settings.adaptive_batching = False
+
+    asyncio.run(
+        insert_generated_values(
+            table,
+            10,
+            mock_async_session_success,
+            get_settings,
+            [],
+            ordering={"value": ColumnOrdering(order="sorted")},
+        )
+    )
+
+    values = [
+        row["value"]
+        for call in mock_async_session_success.execute.call_args_list
+        for row in call[0][1]
+    ]
+    assert len(values) == 10
+    assert values == sorted(values)
+
+
+def test_insert_generated_values_throttled(
+    mock_table, mock_async_session_success, get_settings
+):
+    from app.data_content_utils import insert_generated_values
+
+    get_settings.batch_size = 4
+    get_settings.adaptive_batching = False
+    throttle = AsyncMock()
+
+    asyncio.run(
+        insert_generated_values(
+            mock_table,
+            10,
+            mock_async_session_success,
+            get_settings,
+            [],
+            throttle=throttle,
+        )
+    )
+
+    assert [len(call.args[0]) for call in throttle.wait.call_args_list] == [4, 4, 2]
@@ -113,3 +113,29 @@ def test_drop_table_error(mock_table, mock_metadata_exception, mock_engine_succe
     with pytest.raises(Exception) as excinfo:
         drop_table(mock_table, mock_metadata_exception, mock_engine_success)
     assert "Mocked error" in str(excinfo.value)
+
+
+def test_normalize_table_name():
+    from app.data_structure_utils import normalize_table_name
+
+    assert normalize_table_name("Employee") == "employee"
+    assert normalize_table_name("Employee(id") == "employee"
+    assert normalize_table_name('"Employee"') == "Employee"
+    assert normalize_table_name('"Employee"(id') == "Employee"
+
+
+def test_reflect_tables_success(mocker):
+    from app.data_structure_utils import reflect_tables
+
+    inspector = Mock()
+    inspector.has_table.side_effect = lambda name: name == "existing"
+    mocker.patch("sqlalchemy.inspect", return_value=inspector)
+    metadata = sqlalchemy.MetaData()
+    stale = sqlalchemy.Table("existing", metadata, Column("id", Integer))
+    mocker.patch.object(metadata, "reflect")
+    conn = Mock()
+
+    reflect_tables(conn, ["existing", "missing"], metadata)
+
+    assert stale not in metadata.tables.values()
+    metadata.reflect.assert_called_once_with(conn, only=["existing"])
@@ -0,0 +1,168 @@
+from unittest.mock import MagicMock, Mock
+
+import pytest
+import sqlalchemy
+from sqlalchemy import Column, Integer, MetaData, String, Table
+from sqlalchemy.dialects import postgresql
+
+
+def get_table():
+    return Table(
+        "orders",
+        MetaData(),
+        Column("id", Integer, primary_key=True),
+        Column("status", String(20)),
+    )
+
+
+def get_engine(conn):
+    cm = MagicMock()
+    cm.__enter__.return_value = conn
+
+    engine = Mock(spec=sqlalchemy.Engine)
+    engine.dialect = postgresql.dialect()
+    engine.connect.return_value = cm
+    return engine
+
+
+def get_measured(**kwargs):
+    return {
+        "insert_seconds": 0.5,
+        "index_seconds": 0.1,
+        "wal_bytes": 2_000_000,
+        "table_bytes": 1_000_000,
+        "indexes_bytes": 250_000,
+        **kwargs,
+    }
+
+
+def test_get_copy_statement():
+    from app.estimate_utils import get_copy_statement, get_copy_table
+
+    table = get_table()
+    copy = get_copy_table(table)
+
+    assert copy.name == "_estimate_orders"
+    assert get_copy_statement(table, copy, postgresql.dialect()) == (
+        "CREATE TABLE _estimate_orders "
+        "(LIKE orders INCLUDING ALL EXCLUDING DEFAULTS EXCLUDING IDENTITY)"
+    )
+
+
+def test_fill_generated_keys():
+    from app.estimate_utils import fill_generated_keys
+
+    rows = [{"status": "a"}, {"status": "b"}]
+    fill_generated_keys(rows, get_table())
+
+    assert rows == [{"status": "a", "id": 1}, {"status": "b", "id": 2}]
+
+
+def test_extrapolate():
+    from app.estimate_utils import extrapolate
+
+    result = extrapolate(10_000, 1_000_000, 0.2, get_measured())
+
+    assert result["generate_rows_per_second"] == 50_000
+    assert result["insert_rows_per_second"] == 20_000
+    # the insert is slower than generation, so it sets the pace
+    assert result["estimated_seconds"] == 60.0
+    assert result["estimated_index_seconds"] == 10.0
+    assert result["estimated_wal_bytes"] == 200_000_000
+    assert result["estimated_table_bytes"] == 100_000_000
+    assert result["estimated_total_bytes"] == 125_000_000
+
+
+def test_measure_sample_rolls_back():
+    from app.estimate_utils import measure_sample
+
+    conn = Mock()
+    conn.dialect = postgresql.dialect()
+    conn.execute.return_value.scalar_one.side_effect = ["0/16B3748", 4096]
+    conn.execute.return_value.one.return_value = (8192, 16384)
+    engine = get_engine(conn)
+    indexes = [{"definition": {"columns": ["status"]}}]
+
+    result = measure_sample(get_table(), engine, [{"id": 1, "status": "a"}], indexes)
+
+    assert result["wal_bytes"] == 4096
+    assert result["table_bytes"] == 8192
+    assert result["indexes_bytes"] == 16384
+    statements = [str(call.args[0]) for call in conn.execute.call_args_list]
+    assert statements[0].startswith("CREATE TABLE _estimate_orders")
+    assert any(
+        "CREATE INDEX IF NOT EXISTS _estimate_orders_0 ON _estimate_orders" in statement
+        for statement in statements
+    )
+    conn.begin.return_value.rollback.assert_called_once()
+
+
+def test_measure_sample_rolls_back_on_error():
+    from app.estimate_utils import measure_sample
+
+    conn = Mock()
+    conn.execute.side_effect = Exception("Mocked error")
+    engine = get_engine(conn)
+
+    with pytest.raises(Exception, match="Mocked error"):
+        measure_sample(get_table(), engine, [{"id": 1, "status": "a"}], [])
+    conn.begin.return_value.rollback.assert_called_once()
+
+
+def test_get_exceeded_limits(get_settings):
+    from app.estimate_utils import get_exceeded_limits, get_totals
+
+    estimates = {
+        "orders": {
+            "row_number": 100,
+            "estimated_seconds": 30.0,
+            "estimated_wal_bytes": 1000,
+            "estimated_total_bytes": 500,
+        },
+        "users": {
+            "row_number": 50,
+            "estimated_seconds": 40.0,
+            "estimated_wal_bytes": 1000,
+            "estimated_total_bytes": 500,
+        },
+    }
+    totals = get_totals(estimates)
+    assert totals == {
+        "row_number": 150,
+        "estimated_seconds": 70.0,
+        "estimated_wal_bytes": 2000,
+        "estimated_total_bytes": 1000,
+    }
+
+    assert get_exceeded_limits(totals, get_settings) == []
+
+    get_settings.estimate_max_seconds = 60
+    get_settings.estimate_max_total_bytes = 1000
+    assert get_exceeded_limits(totals, get_settings) == [
+        "estimated_seconds 70.0 is over ESTIMATE_MAX_SECONDS 60"
+    ]
+
+
+def test_estimate_table(get_settings, faker):
+    from unittest.mock import patch
+
+    from app.estimate_utils import estimate_table
+
+    get_settings.estimate_sample_rows = 20
+    with (
+        patch("app.estimate_utils.get_indexes", return_value=[]) as get_indexes,
+        patch(
+            "app.estimate_utils.measure_sample", return_value=get_measured()
+        ) as measure_sample,
+    ):
+        engine = Mock()
+        result = estimate_table(get_table(), engine, faker, 1000, get_settings, [])
+
+    # built indexes are already on the LIKE copy
+    get_indexes.assert_called_once_with(engine, "orders", pending_only=True)
+
+    rows = measure_sample.call_args.args[2]
+    assert len(rows) == 20
+    assert [row["id"] for row in rows] == list(range(1, 21))
+    assert result["sample_rows"] == 20
+    assert result["estimated_table_bytes"] == 50_000_000
@@ -0,0 +1,194 @@
+import pytest
+
+
+def get_explain(node_type="Index Scan", plan_rows=10, actual_rows=10, read_blocks=4):
+    scan = {
+        "Node Type": node_type,
+        "Relation Name": "employee",
+        "Plan Rows": plan_rows,
+        "Actual Rows": actual_rows,
+        "Actual Loops": 1,
+        "Shared Read Blocks": read_blocks,
+    }
+    if node_type == "Index Scan":
+        scan["Index Name"] = "employee_salary_idx"
+    return {
+        "Plan": {
+            "Node Type": "Aggregate",
+            "Plan Rows": 1,
+            "Actual Rows": 1,
+            "Actual Loops": 1,
+            "Shared Read Blocks": read_blocks,
+            "Plans": [scan],
+        },
+        "Planning Time": 0.1,
+        "Execution Time": 1.5,
+    }
+
+
+def test_explain_query_success(mock_engine_success):
+    from app.explain_utils import explain_query
+
+    conn = mock_engine_success.connect.return_value.__enter__.return_value
+    conn.execute.return_value.scalar_one.return_value = [get_explain()]
+
+    explain = explain_query(mock_engine_success, "SELECT 1;")
+
+    assert explain["Plan"]["Node Type"] == "Aggregate"
+    assert "EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) SELECT 1" == str(
+        conn.execute.call_args[0][0]
+    )
+    conn.rollback.assert_called_once()
+
+
+def test_explain_query_failure(mock_engine_exception):
+    from app.explain_utils import explain_query
+
+    with pytest.raises(Exception) as excinfo:
+        explain_query(mock_engine_exception, "SELECT 1")
+    assert "Mocked error" in str(excinfo.value)
+
+
+def test_flatten_plan():
+    from app.explain_utils import flatten_plan
+
+    nodes = flatten_plan(get_explain()["Plan"])
+
+    assert [node["path"] for node in nodes] == ["0", "0.0"]
+    assert nodes[1]["node_type"] == "Index Scan"
+    assert nodes[1]["index"] == "employee_salary_idx"
+
+
+def test_find_misestimates():
+    from app.explain_utils import find_misestimates, flatten_plan
+
+    nodes = flatten_plan(get_explain(plan_rows=10, actual_rows=5000)["Plan"])
+
+    misestimates = find_misestimates(nodes, 10)
+
+    assert len(misestimates) == 1
+    assert misestimates[0]["relation"] == "employee"
+    assert misestimates[0]["actual_rows"] == 5000
+
+
+def test_find_misestimates_nested_loop():
+    from app.explain_utils import find_misestimates, flatten_plan
+
+    explain = get_explain(plan_rows=1, actual_rows=1)
+    explain["Plan"]["Plans"][0]["Actual Loops"] = 1000
+
+    nodes = flatten_plan(explain["Plan"])
+
+    assert nodes[1]["plan_rows"] == 1000
+    assert nodes[1]["actual_rows"] == 1000
+    assert find_misestimates(nodes, 10) == []
+
+
+def test_diff_plans_same_plan(get_settings):
+    from app.explain_utils import diff_plans
+
+    diff = diff_plans(get_explain(), get_explain(), get_settings)
+
+    assert diff["plan_changed"] is False
+    assert diff["scan_changes"] == {}
+    assert diff["buffer_read_blowup"] is False
+
+
+def test_diff_plans_index_to_seq_scan(get_settings):
+    from app.explain_utils import diff_plans
+
+    diff = diff_plans(
+        get_explain(),
+        get_explain("Seq Scan", plan_rows=10, actual_rows=10_000, read_blocks=500),
+        get_settings,
+    )
+
+    assert diff["plan_changed"] is True
+    assert diff["node_changes"] == [
+        {
+            "path": "0.0",
+            "old": {
+                "node_type": "Index Scan",
+                "relation": "employee",
+                "index": "employee_salary_idx",
+            },
+            "new": {"node_type": "Seq Scan", "relation": "employee", "index": None},
+        }
+    ]
+    assert diff["scan_changes"] == {
+        "employee": {"old": ["Index Scan"], "new": ["Seq Scan"]}
+    }
+    assert diff["misestimates"][0]["path"] == "0.0"
+    assert diff["shared_read_blocks"] == [4, 500]
+    assert diff["buffer_read_blowup"] is True
+
+
+def test_save_explain_run_success(mock_engine_success, get_settings):
+    from app.explain_utils import save_explain_run
+
+    from app.config import DbTarget
+
+    get_settings.db_targets = [DbTarget(name="second", host="db2", password="secret")]
+    conn = mock_engine_success.begin.return_value.__enter__.return_value
+    conn.execute.return_value.scalar_one.return_value = 3
+
+    run_id = save_explain_run(
+        mock_engine_success, "q1", "SELECT 1", get_explain(), {}, get_settings
+    )
+
+    assert run_id == 3
+    params = conn.execute.call_args[0][0].compile().params
+    assert "db_password" not in params["settings"]
+    assert params["settings"]["db_targets"] == [
+        {"name": "second", "host": "db2", "port": 5432, "db_name": None, "user": None}
+    ]
+    assert params["execution_time_ms"] == 1.5
+
+
+def test_save_explain_run_failure(mock_engine_exception, get_settings):
+    from app.explain_utils import save_explain_run
+
+    mock_engine_exception.begin.side_effect = Exception("Mocked error")
+
+    with pytest.raises(Exception) as excinfo:
+        save_explain_run(
+            mock_engine_exception, "q1", "SELECT 1", get_explain(), {}, get_settings
+        )
+    assert "Mocked error" in str(excinfo.value)
+
+
+@pytest.mark.parametrize(
+    "base_id, compare_id, expected",
+    [
+        (None, None, (2, 3)),
+        (1, None, (1, 3)),
+        (None, 2, (1, 2)),
+        (3, 1, (3, 1)),
+    ],
+)
+def test_pick_runs(base_id, compare_id, expected):
+    from app.explain_utils import pick_runs
+
+    runs = [{"id": 1}, {"id": 2}, {"id": 3}]
+
+    base, compare = pick_runs(runs, base_id, compare_id)
+
+    assert (base["id"], compare["id"]) == expected
+
+
+@pytest.mark.parametrize(
+    "runs, base_id, compare_id, message",
+    [
+        ([{"id": 1}], None, None, "At least two"),
+        ([], None, None, "At least two"),
+        ([{"id": 1}, {"id": 2}], None, 1, "No EXPLAIN run before run 1"),
+        ([{"id": 1}, {"id": 2}], 2, None, "cannot be compared with itself"),
+        ([{"id": 1}, {"id": 2}], 5, None, "EXPLAIN run 5 not found"),
+    ],
+)
+def test_pick_runs_error(runs, base_id, compare_id, message):
+    from app.explain_utils import pick_runs
+
+    with pytest.raises(ValueError) as excinfo:
+        pick_runs(runs, base_id, compare_id)
+    assert message in str(excinfo.value)
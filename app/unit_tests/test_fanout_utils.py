@@ -0,0 +1,207 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, Mock
+
+import pytest
+from sqlalchemy import Column, Integer, MetaData, String, Table, create_mock_engine
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+
+def get_table():
+    return Table(
+        "events",
+        MetaData(),
+        Column("id", Integer, primary_key=True),
+        Column("email", String(50), unique=True),
+        Column("score", Integer),
+    )
+
+
+def test_get_shard():
+    from app.fanout_utils import get_shard
+
+    shards = [get_shard("user_{}".format(i), 3) for i in range(100)]
+
+    assert shards == [get_shard("user_{}".format(i), 3) for i in range(100)]
+    assert set(shards) == {0, 1, 2}
+
+
+def test_split_by_shard():
+    from app.fanout_utils import get_shard, split_by_shard
+
+    rows = [{"email": "user_{}".format(i)} for i in range(50)]
+    shards = split_by_shard(rows, "email", 2)
+
+    assert sum(len(shard) for shard in shards) == 50
+    for index, shard in enumerate(shards):
+        assert all(get_shard(row["email"], 2) == index for row in shard)
+
+
+def test_insert_fanout_replicate(mock_async_session_success, get_settings):
+    from app.fanout_utils import insert_fanout
+
+    get_settings.batch_size = 4
+    other_session = AsyncMock(spec=AsyncSession)
+    sessions = {"default": mock_async_session_success, "replica": other_session}
+
+    targets, elapsed_seconds = asyncio.run(
+        insert_fanout(get_table(), 10, sessions, get_settings, ["email"])
+    )
+
+    assert targets["default"]["rows"] == 10
+    assert targets["replica"]["rows"] == 10
+    assert elapsed_seconds >= 0
+    assert other_session.commit.call_count == 3
+    # both targets receive the same rows
+    for first, second in zip(
+        mock_async_session_success.execute.call_args_list,
+        other_session.execute.call_args_list,
+    ):
+        assert first.args[1] == second.args[1]
+
+
+def test_insert_fanout_shard(mock_async_session_success, get_settings):
+    from app.fanout_utils import insert_fanout
+
+    other_session = AsyncMock(spec=AsyncSession)
+    sessions = {"default": mock_async_session_success, "replica": other_session}
+
+    targets, _ = asyncio.run(
+        insert_fanout(
+            get_table(), 100, sessions, get_settings, ["email"], "shard", "email"
+        )
+    )
+
+    assert targets["default"]["rows"] + targets["replica"]["rows"] == 100
+    emails = [
+        row["email"]
+        for call in other_session.execute.call_args_list
+        for row in call.args[1]
+    ]
+    assert len(emails) == targets["replica"]["rows"]
+
+
+def test_insert_fanout_throttle(mock_async_session_success, get_settings):
+    from app.fanout_utils import insert_fanout
+
+    get_settings.batch_size = 4
+    throttle = AsyncMock()
+
+    targets, _ = asyncio.run(
+        insert_fanout(
+            get_table(),
+            10,
+            {"default": mock_async_session_success},
+            get_settings,
+            ["email"],
+            throttle=throttle,
+        )
+    )
+
+    assert targets["default"]["rows"] == 10
+    # once per batch, not once per target
+    assert throttle.wait.await_count == 3
+
+
+def test_insert_fanout_failure(
+    mock_async_session_success, mock_async_session_exception, get_settings
+):
+    from app.fanout_utils import FanoutError, insert_fanout
+
+    async def slow_insert(*args):
+        await asyncio.sleep(10)
+
+    slow_session = AsyncMock(spec=AsyncSession)
+    slow_session.execute.side_effect = slow_insert
+    sessions = {
+        "default": mock_async_session_exception,
+        "replica": slow_session,
+    }
+
+    with pytest.raises(FanoutError) as excinfo:
+        asyncio.run(insert_fanout(get_table(), 10, sessions, get_settings, ["email"]))
+    assert "default" in str(excinfo.value)
+    assert excinfo.value.targets["default"]["error"] == "Mocked error"
+    # the other target is cancelled instead of writing on
+    assert excinfo.value.targets["replica"]["error"] == "cancelled"
+    assert excinfo.value.targets["replica"]["rows"] == 0
+    slow_session.commit.assert_not_called()
+
+
+def test_create_target_table():
+    from app.fanout_utils import create_target_table
+
+    statements = []
+    conn = create_mock_engine(
+        "postgresql+psycopg2://",
+        lambda sql, *args, **kwargs: statements.append(
+            str(sql.compile(dialect=conn.dialect)).strip()
+        ),
+    )
+    partitioning = {
+        "strategy": "hash",
+        "column": "id",
+        "partitions": [
+            {"name": "events_p0", "modulus": 2, "remainder": 0},
+            {"name": "events_p1", "modulus": 2, "remainder": 1},
+        ],
+    }
+
+    create_target_table(conn, get_table(), partitioning)
+
+    assert statements[0].endswith("PARTITION BY HASH (id)")
+    assert statements[1:] == [
+        "CREATE TABLE events_p0 PARTITION OF events "
+        "FOR VALUES WITH (MODULUS 2, REMAINDER 0)",
+        "CREATE TABLE events_p1 PARTITION OF events "
+        "FOR VALUES WITH (MODULUS 2, REMAINDER 1)",
+    ]
+
+
+def test_create_target_table_plain():
+    from app.fanout_utils import create_target_table
+
+    statements = []
+    conn = create_mock_engine(
+        "postgresql+psycopg2://",
+        lambda sql, *args, **kwargs: statements.append(
+            str(sql.compile(dialect=conn.dialect)).strip()
+        ),
+    )
+
+    create_target_table(conn, get_table(), None)
+
+    assert len(statements) == 1
+    assert "PARTITION BY" not in statements[0]
+
+
+def test_create_missing_tables():
+    from app.fanout_utils import create_missing_tables, create_target_table
+
+    def get_engine(exists):
+        conn = AsyncMock()
+        conn.run_sync.side_effect = [exists, None]
+        cm = MagicMock()
+        cm.__aenter__.return_value = conn
+        cm.__aexit__.return_value = None
+        engine = Mock(spec=AsyncEngine)
+        engine.begin.return_value = cm
+        return engine, conn
+
+    default, default_conn = get_engine(True)
+    replica, replica_conn = get_engine(False)
+    partitioning = {"strategy": "hash", "column": "id", "partitions": []}
+    table = get_table()
+
+    created = asyncio.run(
+        create_missing_tables(
+            table, {"default": default, "replica": replica}, partitioning
+        )
+    )
+
+    assert created == ["replica"]
+    assert default_conn.run_sync.call_count == 1
+    assert replica_conn.run_sync.call_args.args == (
+        create_target_table,
+        table,
+        partitioning,
+    )
@@ -0,0 +1,236 @@
+from unittest.mock import MagicMock, Mock
+
+import pytest
+import sqlalchemy
+from sqlalchemy import Column, Integer, MetaData, String, Table
+
+
+@pytest.fixture
+def leetcode_metadata():
+    metadata = MetaData()
+    Table(
+        "employee",
+        metadata,
+        Column("id", Integer, primary_key=True),
+        Column("name", String(255)),
+        Column("salary", Integer),
+        Column("department_id", Integer),
+    )
+    Table(
+        "department",
+        metadata,
+        Column("id", Integer, primary_key=True),
+        Column("name", String(255)),
+    )
+    return metadata
+
+
+def get_join_plan():
+    return {
+        "Node Type": "Sort",
+        "Sort Key": ["e.salary DESC"],
+        "Plans": [
+            {
+                "Node Type": "Hash Join",
+                "Hash Cond": "(e.department_id = d.id)",
+                "Plans": [
+                    {
+                        "Node Type": "Seq Scan",
+                        "Relation Name": "employee",
+                        "Alias": "e",
+                        "Filter": "(salary > 1000)",
+                    },
+                    {
+                        "Node Type": "Seq Scan",
+                        "Relation Name": "department",
+                        "Alias": "d",
+                        "Filter": "((name)::text = 'IT'::text)",
+                    },
+                ],
+            }
+        ],
+    }
+
+
+def test_collect_plan_columns(leetcode_metadata):
+    from app.index_advisor_utils import collect_plan_columns
+
+    refs = collect_plan_columns(get_join_plan(), leetcode_metadata)
+
+    assert refs == {
+        "employee": {
+            "filter": {"salary"},
+            "join": {"department_id"},
+            "sort": {"salary"},
+        },
+        "department": {"filter": {"name"}, "join": {"id"}},
+    }
+
+
+def test_collect_plan_columns_unqualified_sort_key(leetcode_metadata):
+    from app.index_advisor_utils import collect_plan_columns
+
+    plan = get_join_plan()
+    plan["Sort Key"] = ["salary", "name"]
+
+    refs = collect_plan_columns(plan, leetcode_metadata)
+
+    # "name" exists in both tables, so it can't be attributed
+    assert refs["employee"]["sort"] == {"salary"}
+    assert "sort" not in refs["department"]
+
+
+def test_propose_candidates(leetcode_metadata):
+    from app.index_advisor_utils import collect_plan_columns, propose_candidates
+
+    refs = collect_plan_columns(get_join_plan(), leetcode_metadata)
+
+    candidates = propose_candidates(refs, leetcode_metadata, 20)
+
+    assert candidates == [
+        ("department", ("name",)),
+        ("department", ("name", "id")),
+        ("employee", ("salary",)),
+        ("employee", ("department_id",)),
+        ("employee", ("salary", "department_id")),
+    ]  # department.id is already covered by the primary key
+
+
+def test_propose_candidates_limit(leetcode_metadata):
+    from app.index_advisor_utils import collect_plan_columns, propose_candidates
+
+    refs = collect_plan_columns(get_join_plan(), leetcode_metadata)
+
+    assert len(propose_candidates(refs, leetcode_metadata, 2)) == 2
+
+
+def test_get_index_definition():
+    from app.index_advisor_utils import get_index_definition
+
+    engine = sqlalchemy.create_engine("postgresql://", module=MagicMock())
+
+    assert (
+        get_index_definition("employee", ("salary", "name"), engine)
+        == "CREATE INDEX ON employee (salary, name)"
+    )
+    assert (
+        get_index_definition("employee", ("salary",), engine, "_advisor_salary")
+        == "CREATE INDEX _advisor_salary ON employee (salary)"
+    )
+
+
+def test_advise_indexes_ranking(mocker, leetcode_metadata, get_settings):
+    from app.index_advisor_utils import advise_indexes
+    from app.models import WorkloadQuery
+
+    engine = sqlalchemy.create_engine("postgresql://", module=MagicMock())
+    conn = MagicMock()
+    mocker.patch.object(engine, "connect").return_value.__enter__.return_value = conn
+    conn.execute.return_value.scalar_one.return_value = 8192
+
+    costs = iter([100.0, 40.0, 90.0, 95.0])
+
+    def explain_plan(conn, sql, analyze=False):
+        if sql == "plan":
+            return {"Plan": get_join_plan()}
+        return {"Plan": {"Total Cost": next(costs)}}
+
+    mocker.patch("app.index_advisor_utils.explain_plan", side_effect=explain_plan)
+    mocker.patch(
+        "app.index_advisor_utils.measure_queries",
+        side_effect=lambda conn, queries, mode, repeats: {"q1": next(costs)},
+    )
+    reflect_tables = mocker.patch("app.index_advisor_utils.reflect_tables")
+    get_settings.index_advisor_max_candidates = 3
+
+    result = advise_indexes(
+        engine, leetcode_metadata, [WorkloadQuery(name="q1", sql="plan")], get_settings
+    )
+
+    reflect_tables.assert_called_once_with(
+        conn, ["department", "employee"], leetcode_metadata
+    )
+
+    assert result["baseline"] == {"q1": 100.0}
+    assert [index["columns"] for index in result["indexes"]] == [
+        ["name"],
+        ["name", "id"],
+        ["salary"],
+    ]
+    assert result["indexes"][0]["benefit"] == 60
+    assert result["indexes"][0]["benefit_pct"] == 60
+    assert result["indexes"][0]["size_bytes"] == 8192
+
+
+def test_advise_indexes_candidate_failure(mocker, leetcode_metadata, get_settings):
+    from app.index_advisor_utils import advise_indexes
+    from app.models import WorkloadQuery
+
+    engine = sqlalchemy.create_engine("postgresql://", module=MagicMock())
+    conn = MagicMock()
+    mocker.patch.object(engine, "connect").return_value.__enter__.return_value = conn
+
+    def execute(statement, params=None):
+        if "(name)" in str(statement):
+            raise sqlalchemy.exc.ProgrammingError(
+                str(statement), {}, Exception("no default operator class\nDETAIL")
+            )
+        return MagicMock(**{"scalar_one.return_value": 8192})
+
+    conn.execute.side_effect = execute
+    mocker.patch(
+        "app.index_advisor_utils.explain_plan",
+        return_value={"Plan": get_join_plan()},
+    )
+    mocker.patch("app.index_advisor_utils.measure_queries", return_value={"q1": 100.0})
+    mocker.patch("app.index_advisor_utils.reflect_tables")
+    get_settings.index_advisor_max_candidates = 3
+
+    result = advise_indexes(
+        engine, leetcode_metadata, [WorkloadQuery(name="q1", sql="plan")], get_settings
+    )
+
+    # the failed candidate is reported, the others are still measured
+    assert [index["columns"] for index in result["indexes"]] == [
+        ["name", "id"],
+        ["salary"],
+    ]
+    assert result["failed"] == [
+        {
+            "table": "department",
+            "columns": ["name"],
+            "definition": "CREATE INDEX ON department (name)",
+            "error": "no default operator class",
+        }
+    ]
+
+
+def test_measure_queries_runtime(mocker):
+    from app.index_advisor_utils import measure_queries
+    from app.models import WorkloadQuery
+
+    timings = iter([50.0, 9.0, 7.0, 30.0])
+    explain_plan = mocker.patch(
+        "app.index_advisor_utils.explain_plan",
+        side_effect=lambda conn, sql, analyze: {"Execution Time": next(timings)},
+    )
+
+    result = measure_queries(Mock(), [WorkloadQuery(name="q1", sql="q")], "runtime", 3)
+
+    # the cold first run is left out, the median of the rest is kept
+    assert result == {"q1": 9.0}
+    assert explain_plan.call_count == 4
+
+
+def test_advise_indexes_failure(mock_engine_exception, leetcode_metadata, get_settings):
+    from app.index_advisor_utils import advise_indexes
+    from app.models import WorkloadQuery
+
+    with pytest.raises(Exception) as excinfo:
+        advise_indexes(
+            mock_engine_exception,
+            leetcode_metadata,
+            [WorkloadQuery(name="q1", sql="SELECT 1")],
+            get_settings,
+        )
+    assert "Mocked error" in str(excinfo.value)
@@ -0,0 +1,145 @@
+from unittest.mock import MagicMock, Mock
+
+import pytest
+import sqlalchemy
+from sqlalchemy import Column, Integer, MetaData, String, Table
+from sqlalchemy.dialects import postgresql
+
+
+def get_table():
+    return Table(
+        "orders",
+        MetaData(),
+        Column("id", Integer, primary_key=True),
+        Column("status", String(20)),
+        Column("total", Integer),
+    )
+
+
+def get_index(**kwargs):
+    from app.models import IndexSpec
+
+    return IndexSpec(**kwargs)
+
+
+def get_engine():
+    conn = Mock()
+    conn.execute.return_value.scalar_one.return_value = 8192
+    cm = MagicMock()
+    cm.__enter__.return_value = conn
+
+    engine = Mock(spec=sqlalchemy.Engine)
+    engine.dialect = postgresql.dialect()
+    engine.connect.return_value.execution_options.return_value = cm
+    engine.connect.return_value.__enter__ = Mock(return_value=conn)
+    engine.connect.return_value.__exit__ = Mock(return_value=None)
+    engine.begin.return_value = cm
+    return engine, conn
+
+
+@pytest.mark.parametrize(
+    "index, concurrently, expected",
+    [
+        (
+            {"columns": ["status", "total"]},
+            True,
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx ON orders USING btree "
+            "(status, total)",
+        ),
+        (
+            {
+                "columns": ["status"],
+                "unique": True,
+                "include": ["total"],
+                "where": "total > 0",
+            },
+            False,
+            "CREATE UNIQUE INDEX IF NOT EXISTS idx ON orders USING btree (status) "
+            "INCLUDE (total) WHERE total > 0",
+        ),
+        (
+            {"columns": ["status"], "method": "gin", "opclass": "gin_trgm_ops"},
+            False,
+            "CREATE INDEX IF NOT EXISTS idx ON orders USING gin (status gin_trgm_ops)",
+        ),
+        (
+            {"columns": ["id"], "method": "brin"},
+            False,
+            "CREATE INDEX IF NOT EXISTS idx ON orders USING brin (id)",
+        ),
+    ],
+)
+def test_get_index_statement(index, concurrently, expected):
+    from app.index_utils import get_index_statement
+
+    statement = get_index_statement(
+        get_table(), "idx", get_index(**index), postgresql.dialect(), concurrently
+    )
+
+    assert statement == expected
+
+
+def test_save_indexes():
+    from app.index_utils import save_indexes
+
+    conn = Mock()
+    save_indexes(conn, "orders", [get_index(columns=["status"])])
+
+    params = conn.execute.call_args.args[0].compile().params
+    assert params["name"] == "orders_status_idx"
+    assert params["status"] == "pending"
+    assert params["definition"]["method"] == "btree"
+
+
+def test_build_index_success():
+    from app.index_utils import build_index
+
+    engine, conn = get_engine()
+    index_row = {
+        "name": "orders_status_idx",
+        "definition": get_index(columns=["status"]).model_dump(mode="json"),
+    }
+
+    result = build_index(get_table(), index_row, engine)
+
+    assert result["status"] == "built"
+    assert result["size_bytes"] == 8192
+    assert result["concurrently"] is True
+    assert "CONCURRENTLY" in str(conn.execute.call_args_list[0].args[0])
+    # the status update is the last statement
+    params = conn.execute.call_args_list[-1].args[0].compile().params
+    assert params["status"] == "built"
+
+
+def test_build_index_partitioned_is_not_concurrent():
+    from app.index_utils import build_index
+
+    engine, conn = get_engine()
+    index_row = {
+        "name": "orders_status_idx",
+        "definition": get_index(columns=["status"]).model_dump(mode="json"),
+    }
+
+    result = build_index(get_table(), index_row, engine, partitioned=True)
+
+    assert result["concurrently"] is False
+    assert "CONCURRENTLY" not in result["statement"]
+
+
+def test_build_index_failure():
+    from app.index_utils import build_index
+
+    engine, conn = get_engine()
+    conn.execute.side_effect = [Exception("Mocked error"), None, None]
+    index_row = {
+        "name": "orders_status_idx",
+        "definition": get_index(columns=["status"]).model_dump(mode="json"),
+    }
+
+    result = build_index(get_table(), index_row, engine)
+
+    assert result["status"] == "failed"
+    assert result["error"] == "Mocked error"
+    assert "DROP INDEX CONCURRENTLY IF EXISTS orders_status_idx" in str(
+        conn.execute.call_args_list[1].args[0]
+    )
@@ -0,0 +1,143 @@
+from datetime import datetime
+
+import pytest
+import sqlalchemy
+
+
+def test_dump_and_load_counters():
+    from app.job_utils import dump_counters, load_counters
+
+    fields = [
+        sqlalchemy.Column("id", sqlalchemy.types.Integer),
+        sqlalchemy.Column("born", sqlalchemy.types.Date),
+    ]
+    counters = {"id": 42, "born": datetime(2000, 1, 5)}
+
+    state = dump_counters(counters)
+
+    assert state == {"id": 42, "born": "2000-01-05T00:00:00"}
+    assert load_counters(state, fields) == counters
+
+
+def test_get_batch_seed():
+    from app.job_utils import get_batch_seed
+
+    assert get_batch_seed(1, 0) != get_batch_seed(1, 1)
+    assert get_batch_seed(1, 1) != get_batch_seed(2, 1)
+
+
+def test_create_job_success(mock_engine_success, get_settings):
+    from app.job_utils import create_job
+
+    get_settings.seed = 7
+    conn = mock_engine_success.begin.return_value.__enter__.return_value
+    conn.execute.return_value.one.return_value._mapping = {"id": 1, "seed": 7}
+
+    job = create_job(mock_engine_success, "dummy", 100, get_settings, "dummy_p0", 50)
+
+    assert job == {"id": 1, "seed": 7}
+    params = conn.execute.call_args[0][0].compile().params
+    assert params["seed"] == 7
+    assert params["target"] == "dummy_p0"
+    assert params["row_offset"] == 50
+    assert params["plan_rows"] == 100
+    assert params["last_batch"] == -1
+
+
+def test_create_job_failure(mock_engine_exception, get_settings):
+    from app.job_utils import create_job
+
+    mock_engine_exception.begin.side_effect = Exception("Mocked error")
+
+    with pytest.raises(Exception) as excinfo:
+        create_job(mock_engine_exception, "dummy", 100, get_settings)
+    assert "Mocked error" in str(excinfo.value)
+
+
+def test_get_checkpoint_statement():
+    from app.job_utils import get_checkpoint_statement
+
+    stmt = get_checkpoint_statement(3, 2, 300, {"born": datetime(2000, 1, 2)})
+
+    params = stmt.compile().params
+    assert params["last_batch"] == 2
+    assert params["rows_inserted"] == 300
+    assert params["counter_state"] == {"born": "2000-01-02T00:00:00"}
+
+
+def test_set_job_status_failure(mock_engine_exception):
+    from app.job_utils import set_job_status
+
+    mock_engine_exception.begin.side_effect = Exception("Mocked error")
+
+    with pytest.raises(Exception) as excinfo:
+        set_job_status(mock_engine_exception, 1, "failed", "boom")
+    assert "Mocked error" in str(excinfo.value)
+
+
+def test_get_job(mock_engine_success):
+    from unittest.mock import Mock
+
+    from app.job_utils import get_job
+
+    conn = mock_engine_success.connect.return_value.__enter__.return_value
+    conn.execute.return_value.first.return_value = Mock(
+        _mapping={"id": 3, "status": "running"}
+    )
+
+    assert get_job(mock_engine_success, 3) == {"id": 3, "status": "running"}
+    params = conn.execute.call_args[0][0].compile().params
+    assert params["id_1"] == 3
+
+
+def test_get_job_not_found(mock_engine_success):
+    from app.job_utils import get_job
+
+    conn = mock_engine_success.connect.return_value.__enter__.return_value
+    conn.execute.return_value.first.return_value = None
+
+    assert get_job(mock_engine_success, 3) is None
+
+
+@pytest.mark.parametrize("table_name", [None, "dummy"])
+def test_get_jobs(mock_engine_success, table_name):
+    from unittest.mock import Mock
+
+    from app.job_utils import get_jobs
+
+    conn = mock_engine_success.connect.return_value.__enter__.return_value
+    conn.execute.return_value = [
+        Mock(_mapping={"id": 1, "table_name": "dummy"}),
+        Mock(_mapping={"id": 2, "table_name": "dummy"}),
+    ]
+
+    jobs = get_jobs(mock_engine_success, table_name)
+
+    assert [job["id"] for job in jobs] == [1, 2]
+    stmt = str(conn.execute.call_args[0][0])
+    assert ("WHERE" in stmt) == (table_name is not None)
+    assert "ORDER BY" in stmt
+
+
+def test_set_job_status(mock_engine_success):
+    from app.job_utils import set_job_status
+
+    conn = mock_engine_success.begin.return_value.__enter__.return_value
+
+    set_job_status(mock_engine_success, 4, "failed", "boom")
+
+    params = conn.execute.call_args[0][0].compile().params
+    assert params["status"] == "failed"
+    assert params["error"] == "boom"
+    assert params["id_1"] == 4
+
+
+def test_set_job_status_execute_failure(mock_engine_success):
+    from app.job_utils import set_job_status
+
+    conn = mock_engine_success.begin.return_value.__enter__.return_value
+    conn.execute.side_effect = Exception("Mocked error")
+
+    with pytest.raises(Exception) as excinfo:
+        set_job_status(mock_engine_success, 4, "completed")
+    assert "Mocked error" in str(excinfo.value)
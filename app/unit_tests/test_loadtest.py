@@ -0,0 +1,276 @@
+import asyncio
+import os
+import time
+from argparse import ArgumentTypeError, Namespace
+
+import pytest
+
+
+def get_args(**kwargs):
+    from loadtest import parse_weights
+
+    return Namespace(
+        **{
+            "weights": parse_weights("create_table=1,generate=3,leetcode=1"),
+            "rows": 10,
+            "columns": 3,
+            "leetcode_rows": 2,
+            "tables_per_client": 2,
+            "table_prefix": "loadtest",
+            "seed": 1,
+            **kwargs,
+        }
+    )
+
+
+def test_parse_weights():
+    from loadtest import parse_weights
+
+    assert parse_weights("generate=2,leetcode=0.5") == {
+        "generate": 2.0,
+        "leetcode": 0.5,
+    }
+    with pytest.raises(ArgumentTypeError):
+        parse_weights("drop_table=1")
+    with pytest.raises(ArgumentTypeError):
+        parse_weights("generate=0")
+
+
+def test_payloads_are_valid():
+    from app.models import CreateTablePayload, GeneratePayload
+    from loadtest import get_create_table_payload, get_generate_payload
+
+    payload = CreateTablePayload(**get_create_table_payload("loadtest_0_1", 8))
+    assert len(payload.fields) == 9
+    assert payload.force_recreate_table is True
+    GeneratePayload(**get_generate_payload("loadtest_0_1", 100)[0])
+
+
+def test_get_leetcode_script():
+    from loadtest import get_leetcode_script
+
+    lines = get_leetcode_script("lc_0_0", 3).split("\n")
+
+    assert lines[0].startswith("CREATE TABLE IF NOT EXISTS lc_0_0 ")
+    assert lines[1] == "TRUNCATE TABLE lc_0_0"
+    assert len(lines) == 5
+    assert lines[-1] == "INSERT INTO lc_0_0 (id, name, score) VALUES (2, 'name_2', 2)"
+
+
+def test_summarize():
+    from loadtest import Results, summarize
+
+    results = Results()
+    results.record("generate", 200, 10.0)
+    results.record("generate", 200, 30.0)
+    results.record("generate", 500, 5.0)
+    results.record("leetcode", "ReadTimeout", 1000.0)
+
+    report = summarize(results, 2.0)
+
+    assert report["operations"]["generate"]["transactions"] == 2
+    assert report["operations"]["generate"]["errors"] == 1
+    assert report["operations"]["generate"]["error_rate"] == 0.3333
+    assert report["operations"]["generate"]["statuses"] == {"200": 2, "500": 1}
+    assert report["operations"]["leetcode"]["error_rate"] == 1
+    assert report["total"]["tps"] == 1.0
+    assert report["total"]["error_rate"] == 0.5
+    assert report["total"]["latency_p50_ms"] == 10.0
+
+
+def test_read_tree_usage():
+    from loadtest import read_tree_usage
+
+    usage = read_tree_usage(os.getpid())
+
+    assert usage["processes"] >= 1
+    assert usage["threads"] >= 1
+    assert usage["rss_bytes"] > 0
+
+
+def test_run_client():
+    import httpx
+
+    from loadtest import Results, run_client
+
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request.url.path)
+        return httpx.Response(500 if request.url.path == "/generate" else 200)
+
+    async def run():
+        results = Results()
+        async with httpx.AsyncClient(
+            base_url="http://test", transport=httpx.MockTransport(handler)
+        ) as client:
+            await run_client(0, client, get_args(), time.perf_counter() + 0.05, results)
+        return results
+
+    results = asyncio.run(run())
+
+    assert len(requests) > 0
+    # a table is created before it is generated into
+    assert requests.index("/create_table") < requests.index("/generate")
+    assert results.errors["generate"] == requests.count("/generate")
+    assert results.errors["create_table"] == 0
+
+
+def get_parsed_args(*argv):
+    from loadtest import get_parser
+
+    return get_parser().parse_args(list(argv))
+
+
+def test_get_parser():
+    args = get_parsed_args()
+    assert args.url is None
+    assert args.clients == 8
+    assert args.weights == {"create_table": 1.0, "generate": 3.0, "leetcode": 1.0}
+
+    args = get_parsed_args(
+        "--url", "http://db:8005", "--clients", "2", "--weights", "generate=1"
+    )
+    assert args.url == "http://db:8005"
+    assert args.clients == 2
+    assert args.weights == {"generate": 1.0}
+
+
+def test_start_server():
+    from unittest.mock import patch
+
+    from loadtest import start_server
+
+    with patch("loadtest.subprocess.Popen") as popen:
+        start_server(get_parsed_args("--port", "9000", "--workers", "3"))
+
+    command = popen.call_args.args[0]
+    assert command[1:4] == ["-m", "uvicorn", "main:app"]
+    assert command[command.index("--port") + 1] == "9000"
+    assert command[command.index("--workers") + 1] == "3"
+    assert popen.call_args.kwargs["cwd"].endswith("app")
+
+
+def test_wait_ready():
+    from unittest.mock import AsyncMock, patch
+
+    import httpx
+
+    from loadtest import wait_ready
+
+    responses = iter([httpx.ConnectError("refused"), 503, 200])
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        response = next(responses)
+        if isinstance(response, Exception):
+            raise response
+        return httpx.Response(response)
+
+    async def run():
+        async with httpx.AsyncClient(
+            base_url="http://test", transport=httpx.MockTransport(handler)
+        ) as client:
+            await wait_ready(client, 60)
+
+    with patch("loadtest.asyncio.sleep", AsyncMock()) as sleep:
+        asyncio.run(run())
+    assert sleep.await_count == 2
+
+
+def test_wait_ready_timeout():
+    import httpx
+
+    from loadtest import wait_ready
+
+    async def run():
+        async with httpx.AsyncClient(
+            base_url="http://test",
+            transport=httpx.MockTransport(lambda request: httpx.Response(503)),
+        ) as client:
+            await wait_ready(client, 0)
+
+    with pytest.raises(RuntimeError, match="not ready"):
+        asyncio.run(run())
+
+
+def test_resource_sampler():
+    from loadtest import ResourceSampler
+
+    sampler = ResourceSampler(os.getpid(), 0.01)
+    assert sampler.summarize() == {}
+
+    async def run():
+        stop = asyncio.Event()
+        task = asyncio.create_task(sampler.run(stop))
+        await asyncio.sleep(0.05)
+        stop.set()
+        await task
+
+    asyncio.run(run())
+    summary = sampler.summarize()
+
+    assert summary["processes"] >= 1
+    assert summary["cpu_avg_percent"] >= 0
+    assert summary["rss_max_mb"] > 0
+    assert summary["threads_max"] >= 1
+
+
+def get_transport():
+    import httpx
+
+    return httpx.MockTransport(lambda request: httpx.Response(200, json={}))
+
+
+def test_run_starts_and_stops_server():
+    from unittest.mock import Mock, patch
+
+    from loadtest import run
+
+    server = Mock(pid=os.getpid())
+    args = get_parsed_args("--clients", "2", "--duration", "0.05", "--seed", "1")
+
+    with patch("loadtest.start_server", return_value=server) as start_server:
+        report = asyncio.run(run(args, get_transport()))
+
+    start_server.assert_called_once_with(args)
+    server.terminate.assert_called_once()
+    assert report["config"]["url"] == "http://127.0.0.1:8099"
+    assert report["config"]["workers"] == 1
+    assert report["total"]["errors"] == 0
+    assert report["total"]["transactions"] > 0
+    assert report["server"]["processes"] >= 1
+
+
+def test_run_against_url():
+    from unittest.mock import patch
+
+    from loadtest import run
+
+    args = get_parsed_args("--url", "http://api:8005", "--duration", "0.02")
+
+    with patch("loadtest.start_server") as start_server:
+        report = asyncio.run(run(args, get_transport()))
+
+    start_server.assert_not_called()
+    assert report["config"]["url"] == "http://api:8005"
+    assert report["config"]["workers"] is None
+    assert report["server"] == {}
+
+
+def test_main(tmp_path, capsys):
+    import json
+    from unittest.mock import AsyncMock, patch
+
+    from loadtest import main
+
+    output = tmp_path / "report.json"
+    argv = ["loadtest.py", "--url", "http://api:8005", "--output", str(output)]
+
+    with (
+        patch("sys.argv", argv),
+        patch("loadtest.run", AsyncMock(return_value={"total": {"tps": 1.0}})),
+    ):
+        main()
+
+    assert json.loads(capsys.readouterr().out) == {"total": {"tps": 1.0}}
+    assert json.loads(output.read_text()) == {"total": {"tps": 1.0}}
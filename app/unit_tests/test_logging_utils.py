@@ -0,0 +1,96 @@
+import asyncio
+import json
+import logging
+
+import pytest
+
+
+@pytest.fixture
+def root_logger():
+    root = logging.getLogger()
+    handlers, level = list(root.handlers), root.level
+    yield root
+    root.handlers[:] = handlers
+    root.setLevel(level)
+
+
+def test_json_formatter():
+    from app.logging_utils import JsonFormatter, job_id_var, request_id_var
+
+    record = logging.makeLogRecord(
+        {"name": "app.test", "levelname": "INFO", "msg": "took %d ms", "args": (5,)}
+    )
+    record.stage = "commit_batch"
+    request_token = request_id_var.set("abc")
+    job_token = job_id_var.set(7)
+    try:
+        entry = json.loads(JsonFormatter().format(record))
+    finally:
+        request_id_var.reset(request_token)
+        job_id_var.reset(job_token)
+
+    assert entry["message"] == "took 5 ms"
+    assert entry["logger"] == "app.test"
+    assert entry["request_id"] == "abc"
+    assert entry["job_id"] == 7
+    assert entry["stage"] == "commit_batch"
+    assert "args" not in entry
+
+
+def test_span_logs_stage_timing(caplog):
+    from app.logging_utils import span
+
+    with caplog.at_level(logging.INFO):
+        with span("insert_batch", table="dummy") as fields:
+            fields["rows"] = 10
+
+    record = caplog.records[-1]
+    assert record.stage == "insert_batch"
+    assert record.table == "dummy"
+    assert record.rows == 10
+    assert record.duration_ms >= 0
+
+
+def test_span_is_silent_below_level(caplog):
+    from app.logging_utils import span
+
+    with caplog.at_level(logging.WARNING):
+        with span("insert_batch"):
+            pass
+
+    assert caplog.records == []
+
+
+def test_configure_logging(root_logger, get_settings):
+    from app.logging_utils import JsonFormatter, configure_logging
+
+    get_settings.log_level = "warning"
+    configure_logging(get_settings)
+
+    assert root_logger.level == logging.WARNING
+    assert len(root_logger.handlers) == 1
+    assert isinstance(root_logger.handlers[0].formatter, JsonFormatter)
+
+
+def test_request_id_middleware():
+    from app.logging_utils import RequestIdMiddleware, request_id_var
+
+    seen = []
+    sent = []
+
+    async def endpoint(scope, receive, send):
+        seen.append(request_id_var.get())
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+
+    async def send(message):
+        sent.append(message)
+
+    middleware = RequestIdMiddleware(endpoint)
+    scope = {"type": "http", "headers": [(b"x-request-id", b"req-1")]}
+    asyncio.run(middleware(scope, None, send))
+    asyncio.run(middleware({"type": "http", "headers": []}, None, send))
+
+    assert seen[0] == "req-1"
+    assert len(seen[1]) == 32
+    assert dict(sent[0]["headers"])[b"x-request-id"] == b"req-1"
+    assert request_id_var.get() is None
@@ -0,0 +1,829 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+import sqlalchemy
+from fastapi import HTTPException
+from sqlalchemy import Column, Integer, MetaData, String, Table
+
+
+def get_table(name="players"):
+    return Table(
+        name,
+        MetaData(),
+        Column("id", Integer, primary_key=True),
+        Column("email", String(50)),
+    )
+
+
+def get_job(**kwargs):
+    return {
+        "id": 1,
+        "table_name": "players",
+        "row_number": 10,
+        "row_offset": 0,
+        "rows_inserted": 4,
+        "status": "failed",
+        "target": None,
+        "plan_rows": 10,
+        "ordering": None,
+        **kwargs,
+    }
+
+
+@pytest.fixture
+def main(mocker):
+    import main
+
+    table = get_table()
+    mocker.patch.object(main, "reflect_tables_async", AsyncMock())
+    mocker.patch.object(main, "get_unique_columns", AsyncMock(return_value=[]))
+    mocker.patch.object(main.state_utils, "ensure_state_tables")
+    mocker.patch.object(
+        main.data_structure_utils, "get_existing_table", return_value=table
+    )
+    mocker.patch.object(
+        main.data_content_utils, "get_row_count_async", AsyncMock(return_value=0)
+    )
+    mocker.patch.object(main.partition_utils, "get_table_partitions", return_value=None)
+    mocker.patch.object(main.job_utils, "set_job_status")
+    yield main
+    main.active_loads.clear()
+    main.active_jobs.clear()
+    main.churn_workloads.clear()
+    main.churn_tasks.clear()
+    main.churn_starting.clear()
+
+
+def test_status(main):
+    main.active_loads.add("players")
+
+    assert asyncio.run(main.status()) == {"status": "ok", "active_loads": ["players"]}
+
+
+def test_ready(main, mocker):
+    mocker.patch.object(main.utils, "check_db_ready", AsyncMock(return_value=True))
+    assert asyncio.run(main.ready())["status"] == "ready"
+
+    main.utils.check_db_ready.return_value = False
+    with pytest.raises(HTTPException) as excinfo:
+        asyncio.run(main.ready())
+    assert excinfo.value.status_code == 503
+
+
+def test_create_table(main, mocker):
+    from app.models import CreateTablePayload
+
+    mocker.patch.object(main, "engine")
+    mocker.patch.object(main.data_structure_utils, "reflect_tables")
+    mocker.patch.object(main.data_structure_utils, "drop_table")
+    mocker.patch.object(main.data_structure_utils, "get_columns_definition")
+    create_table = mocker.patch.object(main.data_structure_utils, "create_table")
+    payload = CreateTablePayload(
+        table_name="players", fields=[{"name": "email", "type": "email"}]
+    )
+
+    with pytest.raises(HTTPException) as excinfo:
+        main.create_table(payload)
+    assert excinfo.value.status_code == 500
+
+    payload.force_recreate_table = True
+    assert main.create_table(payload)["message"] == "Table created successfully"
+    main.data_structure_utils.drop_table.assert_called_once()
+
+    create_table.side_effect = ValueError("bad index")
+    with pytest.raises(HTTPException) as excinfo:
+        main.create_table(payload)
+    assert excinfo.value.status_code == 400
+
+
+def test_run_job_failure(main, mocker):
+    mocker.patch.object(
+        main.data_content_utils,
+        "insert_generated_values",
+        AsyncMock(side_effect=RuntimeError("disk full\ndetail")),
+    )
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(main.run_job(get_table(), get_job(), []))
+
+    main.job_utils.set_job_status.assert_called_once_with(
+        main.engine, 1, main.job_utils.FAILED, "disk full"
+    )
+
+
+def test_load_table(main, mocker):
+    mocker.patch.object(main.job_utils, "create_job", return_value=get_job(id=7))
+
+    async def insert(*args, **kwargs):
+        # registered before the insert starts
+        assert 7 in main.active_jobs
+        assert "players" in main.active_loads
+        return 10
+
+    mocker.patch.object(main.data_content_utils, "insert_generated_values", insert)
+
+    assert asyncio.run(main.load_table(get_table(), 10, [])) == [7]
+    assert main.active_jobs == set()
+    assert main.active_loads == set()
+    main.job_utils.set_job_status.assert_called_once_with(
+        main.engine, 7, main.job_utils.COMPLETED
+    )
+
+
+def test_load_partitioned_table(main, mocker):
+    loads = [
+        {
+            "partition": "players_{}".format(i),
+            "row_number": 5,
+            "row_offset": 5 * i,
+            "target": None,
+            "column_values": None,
+        }
+        for i in range(3)
+    ]
+    mocker.patch.object(
+        main.partition_utils, "plan_partition_loads", return_value=loads
+    )
+    mocker.patch.object(
+        main.job_utils,
+        "create_job",
+        side_effect=[get_job(id=i, row_number=5) for i in range(3)],
+    )
+    mocker.patch.object(main.settings, "partition_load_concurrency", 1)
+    registered = []
+
+    async def insert(*args, **kwargs):
+        # jobs still waiting for the semaphore are registered too
+        registered.append(set(main.active_jobs))
+        return 5
+
+    mocker.patch.object(main.data_content_utils, "insert_generated_values", insert)
+
+    result = asyncio.run(main.load_partitioned_table(get_table(), 15, [], {}))
+
+    assert result == [0, 1, 2]
+    assert registered == [{0, 1, 2}] * 3
+    assert main.active_jobs == set()
+    assert main.active_loads == set()
+
+
+def test_generate_data(main, mocker):
+    from app.models import GeneratePayload
+
+    mocker.patch.object(main, "load_table", AsyncMock(return_value=[1]))
+    mocker.patch.object(main, "build_indexes", AsyncMock(return_value={}))
+    mocker.patch.object(main, "maintain_tables", AsyncMock(return_value={}))
+    payload = [GeneratePayload(table_name="Players", row_number=10)]
+
+    result = asyncio.run(main.generate_data(payload, maintenance=True))
+
+    assert result == {
+        "Total rows in tables": {"Players": 0},
+        "jobs": {"Players": [1]},
+        "indexes": {},
+        "maintenance": {},
+    }
+    main.reflect_tables_async.assert_called_once_with(["players"])
+
+
+def test_generate_data_partitioned(main, mocker):
+    from app.models import GeneratePayload, ThrottleSpec
+
+    mocker.patch.object(
+        main.partition_utils, "get_table_partitions", return_value={"strategy": "list"}
+    )
+    mocker.patch.object(
+        main.partition_utils,
+        "get_partition_row_counts",
+        AsyncMock(return_value={"players_0": 10}),
+    )
+    mocker.patch.object(main, "load_partitioned_table", AsyncMock(return_value=[1]))
+    throttle = mocker.patch.object(main.throttle_utils, "Throttle")
+    throttle.return_value.get_stats.return_value = {"pauses": 0}
+    payload = [
+        GeneratePayload(
+            table_name="players",
+            row_number=10,
+            throttle=ThrottleSpec(rows_per_second=100),
+        )
+    ]
+
+    result = asyncio.run(main.generate_data(payload, indexes=False))
+
+    assert result["Rows in partitions"] == {"players": {"players_0": 10}}
+    assert result["throttle"] == {"players": {"pauses": 0}}
+
+    main.load_partitioned_table.side_effect = ValueError("no partitions")
+    with pytest.raises(HTTPException) as excinfo:
+        asyncio.run(main.generate_data(payload, indexes=False))
+    assert excinfo.value.status_code == 400
+
+
+def test_generate_data_errors(main, mocker):
+    from app.models import GeneratePayload
+
+    payload = [GeneratePayload(table_name="players", row_number=10)]
+
+    main.data_content_utils.get_row_count_async.return_value = 5
+    main.get_unique_columns.return_value = ["email"]
+    with pytest.raises(HTTPException) as excinfo:
+        asyncio.run(main.generate_data(payload))
+    assert "unique constraints" in excinfo.value.detail
+
+    main.get_unique_columns.return_value = []
+    mocker.patch.object(
+        main.ordering_utils, "validate_ordering", side_effect=ValueError("bad order")
+    )
+    with pytest.raises(HTTPException) as excinfo:
+        asyncio.run(main.generate_data(payload))
+    assert excinfo.value.detail == "bad order"
+
+    main.data_structure_utils.get_existing_table.return_value = None
+    with pytest.raises(HTTPException) as excinfo:
+        asyncio.run(main.generate_data(payload))
+    assert excinfo.value.status_code == 404
+
+
+def test_generate_data_dry_run(main, mocker):
+    from app.models import GeneratePayload
+
+    mocker.patch.object(main.estimate_utils, "estimate_table", return_value={})
+    mocker.patch.object(main.estimate_utils, "get_totals", return_value={})
+    exceeded = mocker.patch.object(
+        main.estimate_utils, "get_exceeded_limits", return_value=[]
+    )
+    payload = [GeneratePayload(table_name="players", row_number=10)]
+
+    result = asyncio.run(main.generate_data(payload, dry_run=True))
+    assert result == {"tables": {"players": {}}, "total": {}, "exceeded": []}
+
+    mocker.patch.object(main.settings, "estimate_enforce_limits", True)
+    exceeded.return_value = ["rows over 100"]
+    with pytest.raises(HTTPException) as excinfo:
+        asyncio.run(main.generate_data(payload))
+    assert "rows over 100" in excinfo.value.detail
+
+
+def test_get_generation_jobs(main, mocker):
+    mocker.patch.object(main.job_utils, "get_jobs", return_value=[get_job()])
+
+    assert main.get_generation_jobs("players") == {"jobs": [get_job()]}
+
+
+def test_resume_generation_job(main, mocker):
+    mocker.patch.object(main.job_utils, "get_job", return_value=get_job())
+    mocker.patch.object(
+        main.data_content_utils, "insert_generated_values", AsyncMock(return_value=6)
+    )
+
+    result = asyncio.run(main.resume_generation_job(1, None))
+
+    assert result["resumed_from_row"] == 4
+    assert result["rows_inserted"] == 6
+    assert main.active_jobs == set()
+
+
+def test_resume_generation_job_concurrent(main, mocker):
+    mocker.patch.object(main.job_utils, "get_job", return_value=get_job())
+
+    async def insert(*args, **kwargs):
+        await asyncio.sleep(0.01)
+        return 6
+
+    mocker.patch.object(main.data_content_utils, "insert_generated_values", insert)
+
+    async def resume_twice():
+        return await asyncio.gather(
+            main.resume_generation_job(1, None),
+            main.resume_generation_job(1, None),
+            return_exceptions=True,
+        )
+
+    results = asyncio.run(resume_twice())
+
+    errors = [result for result in results if isinstance(result, HTTPException)]
+    assert len(errors) == 1
+    assert errors[0].status_code == 409
+    assert main.active_jobs == set()
+
+
+def test_resume_generation_job_errors(main, mocker):
+    get = mocker.patch.object(main.job_utils, "get_job", return_value=None)
+    with pytest.raises(HTTPException) as excinfo:
+        asyncio.run(main.resume_generation_job(1, None))
+    assert excinfo.value.status_code == 404
+    # released, so the next resume is not refused
+    assert main.active_jobs == set()
+
+    get.return_value = get_job(status=main.job_utils.COMPLETED)
+    with pytest.raises(HTTPException) as excinfo:
+        asyncio.run(main.resume_generation_job(1, None))
+    assert excinfo.value.status_code == 400
+
+    main.active_jobs.add(1)
+    with pytest.raises(HTTPException) as excinfo:
+        asyncio.run(main.resume_generation_job(1, None))
+    assert excinfo.value.status_code == 409
+    main.active_jobs.clear()
+
+    get.return_value = get_job(target="players_9")
+    mocker.patch.object(main.partition_utils, "get_table_partitions", return_value={})
+    mocker.patch.object(main.partition_utils, "plan_partition_loads", return_value=[])
+    with pytest.raises(HTTPException) as excinfo:
+        asyncio.run(main.resume_generation_job(1, None))
+    assert "no longer exists" in excinfo.value.detail
+
+    main.data_structure_utils.get_existing_table.return_value = None
+    with pytest.raises(HTTPException) as excinfo:
+        asyncio.run(main.resume_generation_job(1, None))
+    assert excinfo.value.status_code == 404
+    assert main.active_jobs == set()
+
+
+def test_generate_fanout(main, mocker):
+    from app.models import FanoutGeneratePayload
+
+    mocker.patch.object(main, "target_engines", {"a": MagicMock(), "b": MagicMock()})
+    mocker.patch.object(
+        main.fanout_utils, "create_missing_tables", AsyncMock(return_value=["b"])
+    )
+    mocker.patch.object(
+        main.fanout_utils,
+        "insert_fanout",
+        AsyncMock(return_value=({"a": {}, "b": {}}, 1.5)),
+    )
+    mocker.patch.object(main, "AsyncSession", return_value=MagicMock(close=AsyncMock()))
+    payload = FanoutGeneratePayload(table_name="players", row_number=10)
+
+    result = asyncio.run(main.generate_fanout(payload))
+
+    assert result["created_tables"] == ["b"]
+    assert result["targets"] == {"a": {"total_rows": 0}, "b": {"total_rows": 0}}
+    assert main.active_loads == set()
+
+    main.fanout_utils.insert_fanout.side_effect = main.fanout_utils.FanoutError(
+        "target b failed", {}
+    )
+    with pytest.raises(HTTPException) as excinfo:
+        asyncio.run(main.generate_fanout(payload))
+    assert excinfo.value.status_code == 500
+
+
+def test_generate_fanout_errors(main, mocker):
+    from app.models import FanoutGeneratePayload
+
+    mocker.patch.object(main, "target_engines", {"a": MagicMock()})
+
+    payload = FanoutGeneratePayload(table_name="players", row_number=10, targets=["c"])
+    with pytest.raises(HTTPException) as excinfo:
+        asyncio.run(main.generate_fanout(payload))
+    assert excinfo.value.status_code == 404
+
+    payload = FanoutGeneratePayload(
+        table_name="players", row_number=10, shard_key="name"
+    )
+    with pytest.raises(HTTPException) as excinfo:
+        asyncio.run(main.generate_fanout(payload))
+    assert "Column name not found" in excinfo.value.detail
+
+    payload = FanoutGeneratePayload(table_name="players", row_number=10, shard_key="id")
+    with pytest.raises(HTTPException) as excinfo:
+        asyncio.run(main.generate_fanout(payload))
+    assert "generated by the database" in excinfo.value.detail
+
+    payload = FanoutGeneratePayload(
+        table_name="players", row_number=10, shard_key="email"
+    )
+    mocker.patch.object(
+        main.ordering_utils, "validate_ordering", side_effect=ValueError("bad order")
+    )
+    with pytest.raises(HTTPException) as excinfo:
+        asyncio.run(main.generate_fanout(payload))
+    assert excinfo.value.detail == "bad order"
+
+    main.data_structure_utils.get_existing_table.return_value = None
+    with pytest.raises(HTTPException) as excinfo:
+        asyncio.run(main.generate_fanout(payload))
+    assert excinfo.value.status_code == 404
+
+
+def test_generate_sized(main, mocker):
+    from app.models import SizedGeneratePayload
+
+    mocker.patch.object(main.sizing_utils, "estimate_row_width", return_value=100)
+    mocker.patch.object(
+        main.sizing_utils, "compute_row_counts", return_value={"players": 10}
+    )
+    mocker.patch.object(
+        main.sizing_utils,
+        "get_relation_sizes",
+        AsyncMock(return_value={"total_bytes": 8192}),
+    )
+    mocker.patch.object(main, "load_table", AsyncMock(return_value=[1]))
+    mocker.patch.object(main, "build_indexes", AsyncMock(return_value={}))
+    mocker.patch.object(main, "maintain_tables", AsyncMock(return_value={}))
+    payload = SizedGeneratePayload(tables={"players": 1}, scale_factor=1)
+
+    result = asyncio.run(main.generate_sized(payload, maintenance=True))
+
+    assert result["tables"]["players"] == {
+        "row_number": 10,
+        "row_width": 100,
+        "estimated_bytes": main.sizing_utils.estimate_table_bytes(100, 10),
+        "total_bytes": 8192,
+    }
+    assert result["indexes"] == {}
+    assert result["maintenance"] == {}
+
+    main.data_structure_utils.get_existing_table.return_value = None
+    with pytest.raises(HTTPException) as excinfo:
+        asyncio.run(main.generate_sized(payload))
+    assert excinfo.value.status_code == 404
+
+
+def test_indexes(main, mocker):
+    from app.models import IndexBuildPayload
+
+    mocker.patch.object(main.index_utils, "get_indexes", return_value=[])
+    mocker.patch.object(main.index_utils, "build_table_indexes", return_value={"a": 1})
+    assert main.get_indexes("players") == {"indexes": []}
+
+    payload = IndexBuildPayload(tables=["players"])
+    result = asyncio.run(main.build_table_indexes(payload))
+    assert result["tables"] == {"players": {"a": 1}}
+
+    main.active_loads.add("players")
+    with pytest.raises(HTTPException) as excinfo:
+        asyncio.run(main.build_table_indexes(payload))
+    assert excinfo.value.status_code == 409
+
+    main.data_structure_utils.get_existing_table.return_value = None
+    with pytest.raises(HTTPException) as excinfo:
+        asyncio.run(main.build_table_indexes(payload))
+    assert excinfo.value.status_code == 404
+
+
+def test_run_maintenance(main, mocker):
+    from app.models import MaintenancePayload
+
+    mocker.patch.object(main.maintenance_utils, "run_maintenance", return_value={})
+    payload = MaintenancePayload(tables=["players"])
+
+    result = asyncio.run(main.run_maintenance(payload))
+    assert result["tables"] == {"players": {}}
+
+    main.active_loads.add("players")
+    with pytest.raises(HTTPException) as excinfo:
+        asyncio.run(main.run_maintenance(payload))
+    assert excinfo.value.status_code == 409
+
+    main.data_structure_utils.get_existing_table.return_value = None
+    with pytest.raises(HTTPException) as excinfo:
+        asyncio.run(main.run_maintenance(payload))
+    assert excinfo.value.status_code == 404
+
+
+def test_generate_from_stats(main, mocker):
+    from app.models import StatsGeneratePayload
+
+    source, target = get_table("players"), get_table("players_copy")
+    main.data_structure_utils.get_existing_table.side_effect = [source, None]
+    mocker.patch.object(
+        main.data_structure_utils, "create_table_like", return_value=target
+    )
+    mocker.patch.object(main.pg_stats_utils, "get_table_stats", return_value={})
+    mocker.patch.object(main.pg_stats_utils, "get_estimated_row_count", return_value=20)
+    mocker.patch.object(main.pg_stats_utils, "insert_values_from_stats", AsyncMock())
+    mocker.patch.object(main.pg_stats_utils, "analyze_table")
+    mocker.patch.object(main.pg_stats_utils, "compare_table_stats", return_value={})
+    mocker.patch.object(main, "AsyncSession")
+    payload = StatsGeneratePayload(source_table="players", target_table="players_copy")
+
+    result = asyncio.run(main.generate_from_stats(payload))
+
+    assert result == {
+        "Total rows in tables": {"players_copy": 0},
+        "statistics": {},
+    }
+    assert main.pg_stats_utils.insert_values_from_stats.call_args.args[2] == 20
+
+
+def test_generate_from_stats_errors(main, mocker):
+    from app.models import StatsGeneratePayload
+
+    source, target = get_table("players"), get_table("players_copy")
+    get_existing = main.data_structure_utils.get_existing_table
+    stats = mocker.patch.object(main.pg_stats_utils, "get_table_stats", return_value={})
+    mocker.patch.object(main.pg_stats_utils, "get_estimated_row_count", return_value=0)
+    payload = StatsGeneratePayload(source_table="players", target_table="players_copy")
+
+    get_existing.side_effect = [source, target]
+    with pytest.raises(HTTPException) as excinfo:
+        asyncio.run(main.generate_from_stats(payload))
+    assert "Pass row_number explicitly" in excinfo.value.detail
+
+    get_existing.side_effect = [source, target]
+    main.data_content_utils.get_row_count_async.return_value = 5
+    with pytest.raises(HTTPException) as excinfo:
+        asyncio.run(main.generate_from_stats(payload))
+    assert "already contains data" in excinfo.value.detail
+
+    get_existing.side_effect = [source]
+    stats.side_effect = ValueError("not analyzed")
+    with pytest.raises(HTTPException) as excinfo:
+        asyncio.run(main.generate_from_stats(payload))
+    assert excinfo.value.detail == "not analyzed"
+
+    get_existing.side_effect = [None]
+    with pytest.raises(HTTPException) as excinfo:
+        asyncio.run(main.generate_from_stats(payload))
+    assert excinfo.value.status_code == 404
+
+
+def test_amplify_table(main, mocker):
+    from app.models import AmplifyPayload
+
+    amplify = mocker.patch.object(
+        main.amplify_utils, "amplify_table", return_value={"rows_added": 10}
+    )
+    payload = AmplifyPayload(table_name="players", factor=2)
+
+    result = asyncio.run(main.amplify_table(payload))
+    assert result == {"rows_added": 10, "Total rows in tables": {"players": 0}}
+    assert main.active_loads == set()
+
+    amplify.side_effect = ValueError("factor")
+    with pytest.raises(HTTPException) as excinfo:
+        asyncio.run(main.amplify_table(payload))
+    assert excinfo.value.status_code == 400
+
+    amplify.side_effect = sqlalchemy.exc.IntegrityError(
+        "INSERT", {}, Exception("duplicate key\ndetail")
+    )
+    with pytest.raises(HTTPException) as excinfo:
+        asyncio.run(main.amplify_table(payload))
+    assert excinfo.value.status_code == 409
+    assert excinfo.value.detail.endswith("duplicate key")
+
+    main.active_loads.add("players")
+    with pytest.raises(HTTPException) as excinfo:
+        asyncio.run(main.amplify_table(payload))
+    assert excinfo.value.status_code == 409
+
+    main.data_structure_utils.get_existing_table.return_value = None
+    with pytest.raises(HTTPException) as excinfo:
+        asyncio.run(main.amplify_table(payload))
+    assert excinfo.value.status_code == 404
+
+
+def test_run_workload(main, mocker):
+    from app.models import WorkloadPayload
+
+    workload_engine = MagicMock(dispose=AsyncMock())
+    mocker.patch.object(main.utils, "get_async_db_engine", return_value=workload_engine)
+    mocker.patch.object(
+        main.workload_utils, "run_workload", AsyncMock(return_value={"tps": 10})
+    )
+    mocker.patch.object(main.workload_utils, "get_dataset_snapshot", return_value={})
+    mocker.patch.object(main.workload_utils, "save_workload_run", return_value=3)
+    mocker.patch.object(main.workload_utils, "get_workload_runs", return_value=[])
+    payload = WorkloadPayload(
+        name="reads",
+        queries=[{"name": "q", "sql": "SELECT 1"}],
+        clients=2,
+        duration_seconds=1,
+    )
+
+    result = asyncio.run(main.run_workload(payload))
+
+    assert result == {"id": 3, "dataset": {}, "result": {"tps": 10}}
+    workload_engine.dispose.assert_called_once()
+    assert main.get_workload_runs("reads") == {"runs": []}
+
+
+def test_churn(main, mocker):
+    from app.models import ChurnPayload
+
+    churn_engine = MagicMock(dispose=AsyncMock())
+    mocker.patch.object(main.utils, "get_async_db_engine", return_value=churn_engine)
+    notes = Table(
+        "notes",
+        MetaData(),
+        Column("id", Integer, primary_key=True),
+        Column("body", sqlalchemy.Text),
+    )
+    mocker.patch.object(
+        main.churn_utils, "get_churn_target", AsyncMock(return_value={"table": notes})
+    )
+    get_text_corpus = mocker.patch.object(main.text_corpus_utils, "get_text_corpus")
+    mocker.patch.object(main.workload_utils, "get_dataset_snapshot", return_value={})
+    save = mocker.patch.object(main.workload_utils, "save_workload_run")
+    workload = MagicMock(engine=churn_engine, running=True, error=None)
+    workload.run = AsyncMock(return_value={"tps": 10})
+    workload.get_status.return_value = {"running": False}
+    mocker.patch.object(main.churn_utils, "ChurnWorkload", return_value=workload)
+    payload = ChurnPayload(name="churn", tables=["players"], duration_seconds=1)
+
+    async def start_and_stop():
+        result = await main.start_churn(payload)
+        with pytest.raises(HTTPException) as excinfo:
+            await main.start_churn(payload)
+        assert excinfo.value.status_code == 409
+        return result, await main.stop_churn("churn")
+
+    result, stopped = asyncio.run(start_and_stop())
+
+    assert result == {"name": "churn", "running": True, "duration_seconds": 1}
+    assert stopped == {"running": False}
+    save.assert_called_once()
+    churn_engine.dispose.assert_called_once()
+    # built before the clients start
+    get_text_corpus.assert_called_once()
+    assert main.get_churn_workloads() == {"churn": [{"running": False}]}
+    assert main.churn_starting == set()
+
+    with pytest.raises(HTTPException) as excinfo:
+        asyncio.run(main.stop_churn("other"))
+    assert excinfo.value.status_code == 404
+
+
+def test_churn_errors(main, mocker):
+    from app.models import ChurnPayload
+
+    payload = ChurnPayload(name="churn", tables=["players"], duration_seconds=1)
+    mocker.patch.object(
+        main.churn_utils,
+        "get_churn_target",
+        AsyncMock(side_effect=ValueError("no integer key")),
+    )
+    with pytest.raises(HTTPException) as excinfo:
+        asyncio.run(main.start_churn(payload))
+    assert excinfo.value.detail == "no integer key"
+
+    main.data_structure_utils.get_existing_table.return_value = None
+    with pytest.raises(HTTPException) as excinfo:
+        asyncio.run(main.start_churn(payload))
+    assert excinfo.value.status_code == 404
+    assert main.churn_starting == set()
+
+    workload = MagicMock(payload=payload, engine=MagicMock(dispose=AsyncMock()))
+    workload.run = AsyncMock(side_effect=RuntimeError("connection lost\ndetail"))
+    asyncio.run(main.run_churn(workload))
+    assert workload.error == "connection lost"
+
+
+def test_explain(main, mocker):
+    from app.models import ExplainPayload
+
+    plan = {"Plan": {}, "Planning Time": 0.1, "Execution Time": 1.0}
+    get_runs = mocker.patch.object(
+        main.explain_utils,
+        "get_explain_runs",
+        return_value=[{"id": 1, "plan": plan, "dataset": {}}],
+    )
+    mocker.patch.object(main.explain_utils, "explain_query", return_value=plan)
+    mocker.patch.object(main.explain_utils, "save_explain_run", return_value=2)
+    mocker.patch.object(main.explain_utils, "diff_plans", return_value={})
+    mocker.patch.object(main.workload_utils, "get_dataset_snapshot", return_value={})
+
+    result = main.explain_query(ExplainPayload(label="q", sql="SELECT 1"))
+    assert result["id"] == 2
+    assert result["diff"] == {}
+
+    get_runs.return_value = [
+        {"id": 1, "plan": plan, "dataset": {}},
+        {"id": 2, "plan": plan, "dataset": {}},
+    ]
+    assert main.diff_explain_runs("q")["compare"] == {"id": 2, "dataset": {}}
+
+    get_runs.return_value = []
+    with pytest.raises(HTTPException) as excinfo:
+        main.diff_explain_runs("q")
+    assert excinfo.value.status_code == 404
+
+
+def test_advise_indexes(main, mocker):
+    from app.models import IndexAdvisorPayload
+
+    advise = mocker.patch.object(
+        main.index_advisor_utils, "advise_indexes", return_value={}
+    )
+
+    assert (
+        main.advise_indexes(
+            IndexAdvisorPayload(queries=[{"name": "q", "sql": "SELECT 1"}])
+        )
+        == {}
+    )
+    advise.assert_called_once()
+
+
+def test_profiles(main, mocker):
+    mocker.patch.object(main.profiling_utils, "get_profiles", return_value=[])
+    get_profile = mocker.patch.object(
+        main.profiling_utils, "get_profile", return_value={"id": "a"}
+    )
+    get_stacks = mocker.patch.object(
+        main.profiling_utils, "get_collapsed_stacks", return_value="main 1"
+    )
+
+    assert main.get_profiles() == {"profiles": []}
+    assert main.get_profile("a") == {"id": "a"}
+    assert main.get_profile_stacks("a") == "main 1"
+
+    for endpoint, mock in [
+        (main.get_profile, get_profile),
+        (main.get_profile_stacks, get_stacks),
+    ]:
+        mock.return_value = None
+        with pytest.raises(HTTPException) as excinfo:
+            endpoint("a")
+        assert excinfo.value.status_code == 404
+
+        mock.side_effect = ValueError("bad id")
+        with pytest.raises(HTTPException) as excinfo:
+            endpoint("../a")
+        assert excinfo.value.status_code == 400
+
+
+def test_load_partitioned_table_failure(main, mocker):
+    loads = [
+        {
+            "partition": "players_{}".format(i),
+            "row_number": 5,
+            "row_offset": 5 * i,
+            "target": None,
+            "column_values": None,
+        }
+        for i in range(3)
+    ]
+    mocker.patch.object(
+        main.partition_utils, "plan_partition_loads", return_value=loads
+    )
+    mocker.patch.object(
+        main.job_utils,
+        "create_job",
+        side_effect=[get_job(id=i, row_number=5) for i in range(3)],
+    )
+    mocker.patch.object(main.settings, "partition_load_concurrency", 3)
+    cancelled = []
+
+    async def insert(*args, job, **kwargs):
+        if job["id"] == 0:
+            await asyncio.sleep(0)
+            raise RuntimeError("disk full")
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            # the table is still reserved while the others stop
+            cancelled.append((job["id"], "players" in main.active_loads))
+            raise
+        return 5
+
+    mocker.patch.object(main.data_content_utils, "insert_generated_values", insert)
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(main.load_partitioned_table(get_table(), 15, [], {}))
+
+    assert sorted(cancelled) == [(1, True), (2, True)]
+    assert main.active_jobs == set()
+    assert main.active_loads == set()
+    statuses = {
+        call.args[1]: call.args[2:] for call in main.job_utils.set_job_status.mock_calls
+    }
+    assert statuses == {
+        0: (main.job_utils.FAILED, "disk full"),
+        1: (main.job_utils.FAILED, "Cancelled after another partition load failed"),
+        2: (main.job_utils.FAILED, "Cancelled after another partition load failed"),
+    }
+
+
+def test_create_tables_leetcode(main, mocker):
+    engine = mocker.patch.object(main, "engine")
+    connection = engine.connect.return_value.__enter__.return_value
+    reflect_tables = mocker.patch.object(main.data_structure_utils, "reflect_tables")
+    sql = "\n".join(
+        [
+            "Create table If Not Exists Employee (id int, salary int)",
+            "Create table Department(id int, name varchar(255))",
+            "Truncate table Employee",
+            "insert into Employee (id, salary) values ('1', '100')",
+        ]
+    )
+
+    result = main.create_tables_leetcode(sql)
+
+    # reflected as Postgres stores them, so later lookups find them
+    assert result["tables"] == ["employee", "department"]
+    reflect_tables.assert_called_once_with(
+        connection, ["employee", "department"], main.db_metadata
+    )
+    assert connection.execute.call_count == 4
+    connection.commit.assert_called_once()
+
+    connection.execute.side_effect = Exception("syntax error")
+    with pytest.raises(HTTPException) as excinfo:
+        main.create_tables_leetcode(sql)
+    assert excinfo.value.status_code == 500
+    connection.rollback.assert_called_once()
@@ -0,0 +1,61 @@
+from unittest.mock import MagicMock, Mock
+
+import pytest
+import sqlalchemy
+from sqlalchemy import Column, Integer, MetaData, Table
+from sqlalchemy.dialects import postgresql
+
+
+def get_table():
+    return Table("events", MetaData(), Column("id", Integer, primary_key=True))
+
+
+def test_get_table_health(mock_engine_success):
+    from app.maintenance_utils import get_table_health
+
+    mock_engine_success.dialect = postgresql.dialect()
+    conn = mock_engine_success.connect.return_value.__enter__.return_value
+    conn.execute.return_value.first.return_value = (1000, 10, 8, 6, 65536, 16384, 3)
+
+    health = get_table_health(get_table(), mock_engine_success)
+
+    assert health == {
+        "live_tuples": 1000,
+        "dead_tuples": 10,
+        "all_visible_ratio": 0.75,
+        "frozen_xid_age": 3,
+        "table_bytes": 65536,
+        "indexes_bytes": 16384,
+    }
+    assert conn.execute.call_args.args[1] == {"table_name": "events"}
+
+
+def test_vacuum_table():
+    from app.maintenance_utils import vacuum_table
+
+    conn = Mock()
+    cm = MagicMock()
+    cm.__enter__.return_value = conn
+    engine = Mock(spec=sqlalchemy.Engine)
+    engine.dialect = postgresql.dialect()
+    engine.connect.return_value.execution_options.return_value = cm
+
+    seconds = vacuum_table(get_table(), engine)
+
+    assert seconds >= 0
+    engine.connect.return_value.execution_options.assert_called_once_with(
+        isolation_level="AUTOCOMMIT"
+    )
+    assert str(conn.execute.call_args.args[0]) == "VACUUM (FREEZE, ANALYZE) events"
+
+    vacuum_table(get_table(), engine, freeze=False)
+    assert str(conn.execute.call_args.args[0]) == "VACUUM (ANALYZE) events"
+
+
+def test_run_maintenance_failure(mock_engine_exception):
+    from app.maintenance_utils import run_maintenance
+
+    mock_engine_exception.dialect = postgresql.dialect()
+    with pytest.raises(Exception) as excinfo:
+        run_maintenance(get_table(), mock_engine_exception)
+    assert "Mocked error" in str(excinfo.value)
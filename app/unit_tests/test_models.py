@@ -79,3 +79,281 @@ def test_successful_payload_creation(get_settings):
 
     assert payload.table_name == "valid_table_name"
     assert payload.row_number == 100
+
+
+def test_sized_payload_target_size():
+    from app.models import SizedGeneratePayload
+
+    payload = SizedGeneratePayload(tables={"orders": 10}, target_size="1.5 GB")
+
+    assert payload.get_target_bytes() == int(1.5 * 1024**3)
+
+
+def test_sized_payload_requires_one_size():
+    from app.models import SizedGeneratePayload
+
+    with pytest.raises(ValueError) as excinfo:
+        SizedGeneratePayload(tables={"orders": 10}, scale_factor=5, target_size="1GB")
+    assert "Exactly one of scale_factor or target_size is required." in str(
+        excinfo.value
+    )
+
+
+def test_sized_payload_wrong_target_size():
+    from app.models import SizedGeneratePayload
+
+    with pytest.raises(ValueError) as excinfo:
+        SizedGeneratePayload(tables={"orders": 10}, target_size="lots")
+    assert "target_size must look like 500MB" in str(excinfo.value)
+
+
+def test_partitioned_payload_creation():
+    from app.models import CreateTablePayload
+
+    payload = CreateTablePayload(
+        table_name="events",
+        fields=[
+            {"name": "created_at", "type": "date"},
+            {"name": "kind", "type": "string"},
+        ],
+        partition={
+            "strategy": "range",
+            "column": "created_at",
+            "partitions": 4,
+            "bounds": ["2020-01-01", "2024-01-01"],
+        },
+    )
+
+    assert payload.partition.strategy == "range"
+
+
+@pytest.mark.parametrize(
+    "partition, message",
+    [
+        ({"strategy": "hash", "column": "id"}, "HASH partitioning takes"),
+        ({"strategy": "range", "column": "id", "bounds": [1]}, "at least two"),
+        ({"strategy": "list", "column": "kind", "bounds": [[]]}, "non-empty lists"),
+        ({"strategy": "hash", "column": "other", "partitions": 2}, "must be one of"),
+        ({"strategy": "range", "column": "kind", "bounds": [1, 2]}, "integer, float"),
+        (
+            {"strategy": "hash", "column": "kind", "partitions": 2},
+            "must be the partition",
+        ),
+    ],
+)
+def test_partitioned_payload_validation(partition, message):
+    from app.models import CreateTablePayload
+
+    with pytest.raises(ValueError) as excinfo:
+        CreateTablePayload(
+            table_name="events",
+            fields=[
+                {"name": "id", "type": "integer", "primary_key": True},
+                {"name": "kind", "type": "string"},
+            ],
+            partition=partition,
+        )
+    assert message in str(excinfo.value)
+
+
+def test_fanout_payload_creation():
+    from app.models import FanoutGeneratePayload
+
+    payload = FanoutGeneratePayload(
+        table_name="events", row_number=100, mode="shard", shard_key="email"
+    )
+
+    assert payload.targets == []
+    assert payload.shard_key == "email"
+
+
+@pytest.mark.parametrize(
+    "kwargs, message",
+    [
+        ({"mode": "shard"}, "shard_key is required"),
+        ({"row_number": 0}, "positive number"),
+        ({"targets": ["a", "a"]}, "targets must be unique"),
+        ({"mode": "mirror"}, "Input should be"),
+    ],
+)
+def test_fanout_payload_validation(kwargs, message):
+    from app.models import FanoutGeneratePayload
+
+    with pytest.raises(ValueError) as excinfo:
+        FanoutGeneratePayload(table_name="events", **kwargs)
+    assert message in str(excinfo.value)
+
+
+def test_amplify_payload_validation():
+    from app.models import AmplifyPayload
+
+    assert AmplifyPayload(table_name="users", factor=1000).perturb is False
+    with pytest.raises(ValueError) as excinfo:
+        AmplifyPayload(table_name="users", factor=1)
+    assert "factor must be at least 2" in str(excinfo.value)
+
+
+def test_maintenance_payload_validation():
+    from app.models import MaintenancePayload
+
+    assert MaintenancePayload(tables=["users"]).freeze is True
+    with pytest.raises(ValueError) as excinfo:
+        MaintenancePayload(tables=[])
+    assert "tables must not be empty" in str(excinfo.value)
+
+
+@pytest.mark.parametrize(
+    "ordering, message",
+    [
+        ({"order": "partial", "disorder": 2}, "between 0 and 1"),
+        ({"order": "clustered"}, "needs ordering.by"),
+        ({"order": "sorted", "by": "other"}, "only used by clustered"),
+        ({"order": "timeseries", "step_seconds": 0}, "positive number"),
+    ],
+)
+def test_generate_payload_ordering_validation(ordering, message):
+    from app.models import GeneratePayload
+
+    with pytest.raises(ValueError) as excinfo:
+        GeneratePayload(table_name="events", ordering={"score": ordering})
+    assert message in str(excinfo.value)
+
+
+@pytest.mark.parametrize(
+    "kwargs, message",
+    [
+        ({"tables": []}, "tables must not be empty"),
+        ({"clients": 0}, "clients must be between"),
+        ({"hot_ratio": 0}, "hot_ratio and hot_share"),
+        ({"update_weight": 0, "delete_weight": 0, "insert_weight": 0}, "weights"),
+    ],
+)
+def test_churn_payload_validation(kwargs, message):
+    from app.models import ChurnPayload
+
+    with pytest.raises(ValueError) as excinfo:
+        ChurnPayload(**{"name": "churn", "tables": ["players"], **kwargs})
+    assert message in str(excinfo.value)
+
+
+def test_throttle_spec_validation():
+    from app.models import ThrottleSpec
+
+    with pytest.raises(ValueError) as excinfo:
+        ThrottleSpec(rows_per_second=0)
+    assert "positive numbers" in str(excinfo.value)
+
+    with pytest.raises(ValueError) as excinfo:
+        ThrottleSpec(backoff=False)
+    assert "rate limit or backoff" in str(excinfo.value)
+
+
+def test_create_table_payload_indexes():
+    from app.models import CreateTablePayload
+
+    payload = CreateTablePayload(
+        table_name="orders",
+        fields=[{"name": "status", "type": "string"}, {"name": "total", "type": "int"}],
+        indexes=[{"columns": ["status"], "include": ["total"]}],
+    )
+
+    assert payload.indexes[0].method == "btree"
+
+
+@pytest.mark.parametrize(
+    "index, message",
+    [
+        ({"columns": []}, "columns must not be empty"),
+        (
+            {"columns": ["status"], "method": "gin", "unique": True},
+            "btree indexes only",
+        ),
+        ({"columns": ["status", "total"], "method": "hash"}, "single column"),
+        ({"columns": ["missing"]}, "must be one of fields"),
+        ({"columns": ["status"], "where": " "}, "where must not be empty"),
+        ({"columns": ["status"], "unique": True}, "unique or primary_key field"),
+    ],
+)
+def test_create_table_payload_index_validation(index, message):
+    from app.models import CreateTablePayload
+
+    with pytest.raises(ValueError) as excinfo:
+        CreateTablePayload(
+            table_name="orders",
+            fields=[
+                {"name": "status", "type": "string"},
+                {"name": "total", "type": "int"},
+            ],
+            indexes=[index],
+        )
+    assert message in str(excinfo.value)
+
+
+def test_index_spec_get_name():
+    from app.models import IndexSpec
+
+    assert IndexSpec(columns=["status", "total"]).get_name("orders") == (
+        "orders_status_total_idx"
+    )
+    assert IndexSpec(columns=["status"], method="gin").get_name("orders") == (
+        "orders_status_gin_idx"
+    )
+    assert IndexSpec(columns=["id"], name="by_id").get_name("orders") == "by_id"
+    assert len(IndexSpec(columns=["status"]).get_name("o" * 60)) == 63
+
+
+@pytest.mark.parametrize(
+    "table_name, indexes",
+    [
+        ("orders", [{"columns": ["status"]}, {"columns": ["status"], "where": "x"}]),
+        (
+            "orders",
+            [
+                {"columns": ["total"]},
+                {"columns": ["status"], "name": "orders_total_idx"},
+            ],
+        ),
+        # both names are cut to the same 63 characters
+        ("o" * 55, [{"columns": ["status"]}, {"columns": ["status", "total"]}]),
+    ],
+)
+def test_create_table_payload_index_name_collision(table_name, indexes):
+    from app.models import CreateTablePayload
+
+    with pytest.raises(ValueError) as excinfo:
+        CreateTablePayload(
+            table_name=table_name,
+            fields=[
+                {"name": "status", "type": "string"},
+                {"name": "total", "type": "int"},
+            ],
+            indexes=indexes,
+        )
+    assert "set indexes[].name" in str(excinfo.value)
+
+
+def test_create_table_payload_index_methods():
+    from app.models import CreateTablePayload
+
+    payload = CreateTablePayload(
+        table_name="orders",
+        fields=[{"name": "status", "type": "string"}],
+        indexes=[{"columns": ["status"]}, {"columns": ["status"], "method": "hash"}],
+    )
+
+    assert len(payload.indexes) == 2
+
+
+def test_create_table_payload_unique_index():
+    from app.models import CreateTablePayload
+
+    payload = CreateTablePayload(
+        table_name="orders",
+        fields=[
+            {"name": "code", "type": "string", "unique": True},
+            {"name": "total", "type": "int"},
+        ],
+        indexes=[{"columns": ["code", "total"], "unique": True}],
+    )
+
+    assert payload.indexes[0].unique is True
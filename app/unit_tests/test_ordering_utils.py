@@ -0,0 +1,178 @@
+from datetime import date, datetime
+
+import pytest
+from sqlalchemy import Column, Date, DateTime, Integer, MetaData, String, Table
+
+
+def get_table():
+    return Table(
+        "events",
+        MetaData(),
+        Column("id", Integer, primary_key=True),
+        Column("score", Integer),
+        Column("kind", String(20)),
+        Column("day", Date),
+        Column("created_at", DateTime),
+    )
+
+
+def get_ordering(**kwargs):
+    from app.models import ColumnOrdering
+
+    return ColumnOrdering(**kwargs)
+
+
+def get_rows(values):
+    return [{"score": value, "kind": "k{}".format(value)} for value in values]
+
+
+def test_apply_ordering_sorted_across_batches(get_settings):
+    from app.ordering_utils import apply_ordering
+
+    ordering = {"score": get_ordering(order="sorted")}
+    first = get_rows([5, 1, 9, 3])
+    second = get_rows([2, 8, 4, 7])
+
+    apply_ordering(first, get_table(), ordering, 0, 8, get_settings, [], set())
+    apply_ordering(second, get_table(), ordering, 4, 8, get_settings, [], set())
+
+    scores = [row["score"] for row in first + second]
+    assert scores == sorted(scores)
+    assert get_settings.min_int <= scores[0] and scores[-1] <= get_settings.max_int
+
+
+def test_apply_ordering_descending_keeps_nulls(get_settings):
+    from app.ordering_utils import apply_ordering
+
+    rows = get_rows([5, None, 9, 3])
+    apply_ordering(
+        rows,
+        get_table(),
+        {"score": get_ordering(order="sorted", descending=True)},
+        0,
+        4,
+        get_settings,
+        [],
+        set(),
+    )
+
+    assert rows[1]["score"] is None
+    scores = [row["score"] for row in rows if row["score"] is not None]
+    assert scores == sorted(scores, reverse=True)
+
+
+def test_apply_ordering_unique_and_forced_columns_keep_values(get_settings):
+    from app.ordering_utils import apply_ordering
+
+    rows = get_rows([5, 1, 9, 3])
+    apply_ordering(
+        rows,
+        get_table(),
+        {"score": get_ordering(order="sorted"), "kind": get_ordering(order="sorted")},
+        0,
+        4,
+        get_settings,
+        ["score"],
+        {"kind"},
+    )
+
+    assert [row["score"] for row in rows] == [1, 3, 5, 9]
+    assert [row["kind"] for row in rows] == ["k1", "k3", "k5", "k9"]
+
+
+def test_apply_ordering_partial(get_settings):
+    from app.ordering_utils import apply_ordering
+
+    values = list(range(1000))
+    rows = get_rows(values)
+    apply_ordering(
+        rows,
+        get_table(),
+        {"score": get_ordering(order="partial", disorder=0.1)},
+        0,
+        1000,
+        get_settings,
+        ["score"],
+        set(),
+    )
+
+    scores = [row["score"] for row in rows]
+    assert sorted(scores) == values
+    moved = sum(1 for i, score in enumerate(scores) if score != i)
+    assert 0 < moved <= 100
+
+
+def test_apply_ordering_timeseries(get_settings):
+    from app.ordering_utils import apply_ordering
+
+    rows = [{"created_at": datetime(2021, 1, 1), "day": "2020-05-01"} for _ in range(3)]
+    apply_ordering(
+        rows,
+        get_table(),
+        {
+            "created_at": get_ordering(order="timeseries", step_seconds=30),
+            "day": get_ordering(order="timeseries", step_seconds=86_400),
+        },
+        2,
+        10,
+        get_settings,
+        [],
+        set(),
+    )
+
+    assert [row["created_at"].second for row in rows] == [0, 30, 0]
+    assert [row["day"] for row in rows] == [
+        date(2000, 1, 3),
+        date(2000, 1, 4),
+        date(2000, 1, 5),
+    ]
+
+
+def test_apply_ordering_clustered(get_settings):
+    from app.ordering_utils import apply_ordering
+
+    rows = [
+        {"score": 30, "kind": "b"},
+        {"score": 10, "kind": "c"},
+        {"score": 20, "kind": "a"},
+    ]
+    apply_ordering(
+        rows,
+        get_table(),
+        {"kind": get_ordering(order="clustered", by="score")},
+        0,
+        3,
+        get_settings,
+        [],
+        set(),
+    )
+
+    assert [row["kind"] for row in rows] == ["c", "a", "b"]
+
+
+@pytest.mark.parametrize(
+    "ordering, message",
+    [
+        ({"missing": {"order": "sorted"}}, "not found"),
+        ({"id": {"order": "sorted"}}, "generated by the database"),
+        ({"score": {"order": "timeseries"}}, "needs a date column"),
+        ({"kind": {"order": "clustered", "by": "kind"}}, "cannot be clustered"),
+        (
+            {
+                "kind": {"order": "clustered", "by": "score"},
+                "score": {"order": "clustered", "by": "day"},
+            },
+            "another clustered column",
+        ),
+    ],
+)
+def test_validate_ordering(ordering, message):
+    from app.ordering_utils import validate_ordering
+
+    with pytest.raises(ValueError) as excinfo:
+        validate_ordering(
+            get_table(),
+            {name: get_ordering(**spec) for name, spec in ordering.items()},
+            [],
+        )
+    assert message in str(excinfo.value)
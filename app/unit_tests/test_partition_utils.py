@@ -0,0 +1,227 @@
+import asyncio
+from datetime import date
+from unittest.mock import Mock
+
+import pytest
+import sqlalchemy
+from sqlalchemy.dialects import postgresql
+
+
+def get_spec(**kwargs):
+    from app.models import PartitionSpec
+
+    return PartitionSpec(**kwargs)
+
+
+def test_get_partition_layout_range_split():
+    from app.partition_utils import get_partition_layout
+
+    spec = get_spec(
+        strategy="range",
+        column="created_at",
+        partitions=2,
+        bounds=["2020-01-01", "2020-01-11"],
+    )
+
+    layout = get_partition_layout("events", spec, sqlalchemy.types.Date())
+
+    assert layout == [
+        {"name": "events_p0", "from": date(2020, 1, 1), "to": date(2020, 1, 6)},
+        {"name": "events_p1", "from": date(2020, 1, 6), "to": date(2020, 1, 11)},
+        {"name": "events_default"},
+    ]
+
+
+def test_get_partition_layout_range_not_ascending():
+    from app.partition_utils import get_partition_layout
+
+    spec = get_spec(strategy="range", column="id", bounds=[10, 5])
+
+    with pytest.raises(ValueError) as excinfo:
+        get_partition_layout("events", spec, sqlalchemy.types.Integer())
+    assert "strictly ascending" in str(excinfo.value)
+
+
+def test_get_partition_layout_list_and_hash():
+    from app.partition_utils import get_partition_layout
+
+    list_spec = get_spec(strategy="list", column="kind", bounds=[["a", "b"], ["c"]])
+    hash_spec = get_spec(strategy="hash", column="id", partitions=2)
+
+    list_layout = get_partition_layout("events", list_spec, sqlalchemy.String())
+    hash_layout = get_partition_layout("events", hash_spec, sqlalchemy.Integer())
+
+    assert [p.get("values") for p in list_layout] == [["a", "b"], ["c"], None]
+    assert hash_layout[1] == {"name": "events_p1", "modulus": 2, "remainder": 1}
+
+
+def test_get_partition_bound_clause():
+    from app.partition_utils import get_partition_bound_clause
+
+    dialect = postgresql.dialect()
+
+    assert (
+        get_partition_bound_clause(
+            {"from": date(2020, 1, 1), "to": date(2021, 1, 1)},
+            sqlalchemy.Date(),
+            dialect,
+        )
+        == "FOR VALUES FROM ('2020-01-01') TO ('2021-01-01')"
+    )
+    assert (
+        get_partition_bound_clause(
+            {"values": ["a'b", "c"]}, sqlalchemy.String(), dialect
+        )
+        == "FOR VALUES IN ('a''b', 'c')"
+    )
+    assert (
+        get_partition_bound_clause({"modulus": 4, "remainder": 3}, None, dialect)
+        == "FOR VALUES WITH (MODULUS 4, REMAINDER 3)"
+    )
+    assert get_partition_bound_clause({"name": "events_default"}, None, dialect) == (
+        "DEFAULT"
+    )
+
+
+def test_create_partitions():
+    from app.partition_utils import create_partitions
+
+    table = sqlalchemy.Table(
+        "events",
+        sqlalchemy.MetaData(),
+        sqlalchemy.Column("id", sqlalchemy.Integer),
+    )
+    conn = Mock()
+    conn.dialect = postgresql.dialect()
+    spec = get_spec(strategy="hash", column="id", partitions=2)
+    layout = [
+        {"name": "events_p0", "modulus": 2, "remainder": 0},
+        {"name": "events_p1", "modulus": 2, "remainder": 1},
+    ]
+
+    create_partitions(conn, table, spec, layout)
+
+    statements = [str(call[0][0]) for call in conn.execute.call_args_list]
+    assert statements[0] == (
+        "CREATE TABLE events_p0 PARTITION OF events "
+        "FOR VALUES WITH (MODULUS 2, REMAINDER 0)"
+    )
+    assert statements[2].startswith("INSERT INTO _table_partitions")
+
+
+def test_get_table_partitions(mock_engine_success):
+    from app.partition_utils import get_table_partitions
+
+    table = sqlalchemy.Table(
+        "events",
+        sqlalchemy.MetaData(),
+        sqlalchemy.Column("created_at", sqlalchemy.types.Date),
+    )
+    conn = mock_engine_success.connect.return_value.__enter__.return_value
+    conn.execute.return_value.first.return_value = Mock(
+        strategy="range",
+        column="created_at",
+        partitions=[
+            {"name": "events_p0", "from": "2020-01-01", "to": "2020-01-06"},
+            {"name": "events_default"},
+        ],
+    )
+
+    assert get_table_partitions(mock_engine_success, table) == {
+        "strategy": "range",
+        "column": "created_at",
+        "partitions": [
+            {"name": "events_p0", "from": date(2020, 1, 1), "to": date(2020, 1, 6)},
+            {"name": "events_default"},
+        ],
+    }
+
+    # the table was recreated without the partition column
+    conn.execute.return_value.first.return_value.column = "missing"
+    assert get_table_partitions(mock_engine_success, table) is None
+
+    conn.execute.return_value.first.return_value = None
+    assert get_table_partitions(mock_engine_success, table) is None
+
+
+def test_get_key_values_generator_range():
+    from app.partition_utils import get_key_values_generator
+
+    partition = {"name": "events_p0", "from": 100, "to": 200}
+
+    unique_values = get_key_values_generator(partition, True, 50)
+    random_values = get_key_values_generator(partition, False, 50)(0, 1000)
+
+    assert unique_values(10, 3) == [110, 111, 112]
+    assert all(100 <= value < 200 for value in random_values)
+
+    with pytest.raises(ValueError) as excinfo:
+        get_key_values_generator(partition, True, 101)
+    assert "holds only 100 unique values" in str(excinfo.value)
+
+
+def test_get_key_values_generator_date_and_list():
+    from app.partition_utils import get_key_values_generator
+
+    dates = get_key_values_generator(
+        {"name": "p", "from": date(2020, 1, 1), "to": date(2020, 2, 1)}, False, 10
+    )(0, 100)
+    kinds = get_key_values_generator({"name": "p", "values": ["a", "b"]}, False, 10)(
+        0, 100
+    )
+
+    assert all(date(2020, 1, 1) <= value < date(2020, 2, 1) for value in dates)
+    assert set(kinds) <= {"a", "b"}
+
+
+def test_plan_partition_loads():
+    from app.partition_utils import plan_partition_loads
+
+    table = sqlalchemy.Table(
+        "events",
+        sqlalchemy.MetaData(),
+        sqlalchemy.Column("id", sqlalchemy.Integer, primary_key=True),
+        sqlalchemy.Column("kind", sqlalchemy.String),
+    )
+    range_partitioning = {
+        "strategy": "range",
+        "column": "id",
+        "partitions": [
+            {"name": "events_p0", "from": 0, "to": 100},
+            {"name": "events_p1", "from": 100, "to": 200},
+            {"name": "events_default"},
+        ],
+    }
+    hash_partitioning = {
+        "strategy": "hash",
+        "column": "id",
+        "partitions": [
+            {"name": "events_p0", "modulus": 2, "remainder": 0},
+            {"name": "events_p1", "modulus": 2, "remainder": 1},
+        ],
+    }
+
+    range_loads = plan_partition_loads(table, range_partitioning, 11, [])
+    hash_loads = plan_partition_loads(table, hash_partitioning, 11, [])
+
+    assert [load["row_number"] for load in range_loads] == [6, 5]
+    assert [load["row_offset"] for load in range_loads] == [0, 6]
+    assert range_loads[1]["target"].name == "events_p1"
+    assert range_loads[1]["column_values"]["id"](0, 2) == [100, 101]
+    assert all(load["target"] is table for load in hash_loads)
+    assert hash_loads[0]["column_values"] == {}
+
+
+def test_get_partition_row_counts(mock_table, mock_async_engine_success):
+    from app.partition_utils import get_partition_row_counts
+
+    mock_table.schema = None
+    conn = mock_async_engine_success.connect.return_value.__aenter__.return_value
+    conn.execute.return_value.fetchall.return_value = [("events_p0", 3)]
+    mock_async_engine_success.dialect = postgresql.dialect()
+
+    result = asyncio.run(
+        get_partition_row_counts(mock_table, mock_async_engine_success)
+    )
+
+    assert result == {"events_p0": 3}
@@ -0,0 +1,269 @@
+import asyncio
+from datetime import date
+from unittest.mock import Mock
+
+import pytest
+import sqlalchemy.types
+
+
+def get_stats(**kwargs):
+    from app.models import ColumnStats
+
+    return ColumnStats(column_name="dummy_column", **kwargs)
+
+
+def test_get_table_stats_success(mock_table, mock_engine_success):
+    from app.pg_stats_utils import get_table_stats
+
+    mock_table.schema = None
+    conn = mock_engine_success.connect.return_value.__enter__.return_value
+    conn.execute.return_value.fetchall.return_value = [
+        ("dummy_column", 0.1, -1.0, None, None, ["1", "50", "100"], 0.9)
+    ]
+
+    result_stats = get_table_stats(mock_table, mock_engine_success)
+
+    assert result_stats["dummy_column"].null_frac == 0.1
+    assert result_stats["dummy_column"].n_distinct == -1
+    assert result_stats["dummy_column"].most_common_vals == []
+    assert result_stats["dummy_column"].histogram_bounds == ["1", "50", "100"]
+    # one row per column, even when the table has inheritance children
+    assert "ORDER BY attname, inherited" in str(conn.execute.call_args.args[0])
+
+
+def test_get_table_stats_not_analyzed(mock_table, mock_engine_success):
+    from app.pg_stats_utils import get_table_stats
+
+    mock_table.schema = None
+    conn = mock_engine_success.connect.return_value.__enter__.return_value
+    conn.execute.return_value.fetchall.return_value = []
+
+    with pytest.raises(ValueError) as excinfo:
+        get_table_stats(mock_table, mock_engine_success)
+    assert "Run ANALYZE on it first" in str(excinfo.value)
+
+
+def test_get_table_stats_failure(mock_table, mock_engine_exception):
+    from app.pg_stats_utils import get_table_stats
+
+    mock_table.schema = None
+
+    with pytest.raises(Exception) as excinfo:
+        get_table_stats(mock_table, mock_engine_exception)
+    assert "Mocked error" in str(excinfo.value)
+
+
+def test_generate_column_from_stats_common_values(faker, get_settings):
+    from app.pg_stats_utils import generate_column_from_stats
+
+    field = sqlalchemy.Column("status", sqlalchemy.types.String, nullable=True)
+    stats = get_stats(
+        null_frac=0.2,
+        n_distinct=2,
+        most_common_vals=["active", "blocked"],
+        most_common_freqs=[0.6, 0.2],
+    )
+
+    result_values = generate_column_from_stats(
+        field, stats, faker, 0, 10_000, 10_000, get_settings
+    )
+
+    assert len(result_values) == 10_000
+    assert set(result_values) == {"active", "blocked", None}
+    assert 0.15 < result_values.count(None) / 10_000 < 0.25
+    assert 0.55 < result_values.count("active") / 10_000 < 0.65
+
+
+def test_generate_column_from_stats_histogram(faker, get_settings):
+    from app.pg_stats_utils import generate_column_from_stats
+
+    field = sqlalchemy.Column("score", sqlalchemy.types.Integer, nullable=False)
+    stats = get_stats(
+        null_frac=0.5, n_distinct=-0.1, histogram_bounds=["10", "20", "30"]
+    )
+
+    result_values = generate_column_from_stats(
+        field, stats, faker, 0, 1000, 1000, get_settings
+    )
+
+    assert None not in result_values  # NOT NULL column ignores null_frac
+    assert all(10 <= value <= 30 for value in result_values)
+    assert len(set(result_values)) <= 100
+
+
+def test_generate_column_from_stats_correlation(faker, get_settings):
+    from app.pg_stats_utils import generate_column_from_stats
+
+    field = sqlalchemy.Column("created_at", sqlalchemy.types.Date)
+    stats = get_stats(
+        n_distinct=-0.5,
+        histogram_bounds=["2020-01-01", "2020-06-01", "2021-01-01"],
+        correlation=1.0,
+    )
+
+    result_values = generate_column_from_stats(
+        field, stats, faker, 0, 1000, 1000, get_settings
+    )
+
+    assert all(isinstance(value, date) for value in result_values)
+    assert max(result_values[:500]) <= min(result_values[500:])
+
+
+def test_generate_column_from_stats_unique(faker, get_settings):
+    from app.pg_stats_utils import generate_column_from_stats
+
+    field = sqlalchemy.Column("id", sqlalchemy.types.Integer)
+    stats = get_stats(n_distinct=-1, histogram_bounds=["1", "100"], correlation=1.0)
+
+    first_batch = generate_column_from_stats(
+        field, stats, faker, 0, 50, 100, get_settings
+    )
+    second_batch = generate_column_from_stats(
+        field, stats, faker, 50, 50, 100, get_settings
+    )
+
+    assert first_batch == list(range(1, 51))
+    assert len(set(first_batch + second_batch)) == 100
+
+
+def test_generate_column_from_stats_unique_descending(faker, get_settings):
+    from app.pg_stats_utils import generate_column_from_stats
+
+    field = sqlalchemy.Column("id", sqlalchemy.types.Integer)
+    stats = get_stats(n_distinct=-1, histogram_bounds=["1", "100"], correlation=-1.0)
+
+    first_batch = generate_column_from_stats(
+        field, stats, faker, 0, 50, 100, get_settings
+    )
+    second_batch = generate_column_from_stats(
+        field, stats, faker, 50, 50, 100, get_settings
+    )
+
+    # descending over the whole table, not within each batch
+    assert first_batch + second_batch == list(range(100, 0, -1))
+
+
+def test_generate_column_from_stats_unique_string_length(faker, get_settings):
+    from app.pg_stats_utils import generate_column_from_stats
+
+    field = sqlalchemy.Column("code", sqlalchemy.types.String(8))
+    stats = get_stats(
+        n_distinct=-1, histogram_bounds=["abcdefgh", "zzzzzzzz"], correlation=1.0
+    )
+
+    result_values = generate_column_from_stats(
+        field, stats, faker, 0, 1000, 1000, get_settings
+    )
+
+    assert all(len(value) <= 8 for value in result_values)
+    assert len(set(result_values)) == 1000
+    assert result_values[999] == "efgh_999"
+
+
+def test_generate_column_from_stats_without_distribution(faker, get_settings):
+    from app.pg_stats_utils import generate_column_from_stats
+
+    field = sqlalchemy.Column("score", sqlalchemy.types.Float)
+
+    result_values = generate_column_from_stats(
+        field, get_stats(), faker, 0, 10, 10, get_settings
+    )
+
+    assert all(type(value) is float for value in result_values)
+
+
+def test_generate_values_from_stats_success(faker, get_settings):
+    from app.pg_stats_utils import generate_values_from_stats
+
+    fields = [
+        sqlalchemy.Column("id", sqlalchemy.types.Integer, primary_key=True),
+        sqlalchemy.Column("email", sqlalchemy.types.String, nullable=False),
+        sqlalchemy.Column("score", sqlalchemy.types.Float, nullable=False),
+    ]
+    stats = {"score": get_stats(n_distinct=-1, histogram_bounds=["0.5", "9.5"])}
+
+    result_rows = generate_values_from_stats(
+        fields, stats, faker, 0, 10, 10, get_settings
+    )
+
+    assert len(result_rows) == 10
+    for row in result_rows:
+        assert set(row) == {"email", "score"}  # identity does not return
+        assert 0.5 <= row["score"] <= 9.5
+
+
+def test_generate_values_from_stats_empty_list(faker, get_settings):
+    from app.pg_stats_utils import generate_values_from_stats
+
+    with pytest.raises(ValueError) as excinfo:
+        generate_values_from_stats([], {}, faker, 0, 10, 10, get_settings)
+    assert "No fields provided for value generation" in str(excinfo.value)
+
+
+def test_insert_values_from_stats_success(
+    mock_table, mock_async_session_success, get_settings
+):
+    from app.pg_stats_utils import insert_values_from_stats
+
+    mock_table.columns = [sqlalchemy.Column("score", sqlalchemy.types.Integer)]
+    get_settings.batch_size = 4
+    stats = {"score": get_stats(n_distinct=5, histogram_bounds=["1", "5"])}
+
+    inserted = asyncio.run(
+        insert_values_from_stats(
+            mock_table, stats, 10, mock_async_session_success, get_settings
+        )
+    )
+
+    assert inserted == 10
+    assert mock_async_session_success.commit.call_count == 3
+
+
+def test_insert_values_from_stats_failure(
+    mock_table, mock_async_session_exception, get_settings
+):
+    from app.pg_stats_utils import insert_values_from_stats
+
+    mock_table.columns = [sqlalchemy.Column("score", sqlalchemy.types.Integer)]
+
+    with pytest.raises(Exception) as excinfo:
+        asyncio.run(
+            insert_values_from_stats(
+                mock_table, {}, 10, mock_async_session_exception, get_settings
+            )
+        )
+    assert "Mocked error" in str(excinfo.value)
+
+
+def test_get_estimated_row_count(mock_table, mock_engine_success):
+    from app.pg_stats_utils import get_estimated_row_count
+
+    mock_table.schema = None
+
+    assert get_estimated_row_count(mock_table, mock_engine_success) == 42
+
+
+def test_compare_table_stats():
+    from app.pg_stats_utils import compare_table_stats
+
+    source = {"dummy_column": get_stats(null_frac=0.1, correlation=0.5)}
+    target = {"dummy_column": get_stats(null_frac=0.12, correlation=0.4)}
+
+    result = compare_table_stats(source, target)
+
+    assert result["dummy_column"]["null_frac"] == [0.1, 0.12]
+    assert result["dummy_column"]["correlation"] == [0.5, 0.4]
+    assert compare_table_stats(source, {}) == {}
+
+
+def test_create_table_like_success(mock_table, mock_metadata_success):
+    from app.data_structure_utils import create_table_like
+
+    mock_engine = Mock()
+    mock_engine.dialect.identifier_preparer.quote.return_value = '"copy"'
+    mock_engine.dialect.identifier_preparer.format_table.return_value = '"dummy"'
+    mock_engine.begin.side_effect = Exception("Mocked error")
+
+    with pytest.raises(Exception) as excinfo:
+        create_table_like(mock_table, "copy", mock_engine, mock_metadata_success)
+    assert "Mocked error" in str(excinfo.value)
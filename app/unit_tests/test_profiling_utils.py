@@ -0,0 +1,167 @@
+import asyncio
+import json
+import time
+import tracemalloc
+
+import pytest
+
+
+def busy_loop(seconds):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+def test_stack_sampler_collects_collapsed_stacks():
+    from app.profiling_utils import StackSampler
+
+    sampler = StackSampler(0.001)
+    sampler.start()
+    busy_loop(0.1)
+    sampler.stop()
+
+    collapsed = sampler.get_collapsed()
+    assert sampler.samples > 0
+    assert "test_profiling_utils.py:busy_loop" in collapsed
+    assert all(line.rsplit(" ", 1)[1].isdigit() for line in collapsed.splitlines())
+    assert not any(stack.startswith("profiler;") for stack in sampler.stacks)
+
+
+def test_get_top_allocations():
+    from app.profiling_utils import get_top_allocations
+
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    data = [str(i) * 10 for i in range(10_000)]
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+
+    allocations = get_top_allocations(before, after, 5)
+
+    assert len(data) == 10_000
+    assert len(allocations) <= 5
+    assert any("test_profiling_utils.py" in a["location"] for a in allocations)
+    assert all(a["size_bytes"] > 0 for a in allocations)
+
+
+@pytest.mark.parametrize(
+    "scope, expected",
+    [
+        ({"headers": [(b"x-profile", b"1")], "query_string": b""}, True),
+        ({"headers": [], "query_string": b"profile=true"}, True),
+        ({"headers": [(b"x-profile", b"0")], "query_string": b"profile=no"}, False),
+        ({"headers": [], "query_string": b""}, False),
+    ],
+)
+def test_is_profile_requested(scope, expected):
+    from app.profiling_utils import is_profile_requested
+
+    assert is_profile_requested(scope) is expected
+
+
+def test_profile_storage(tmp_path, get_settings):
+    from app.profiling_utils import (
+        get_collapsed_stacks,
+        get_profile,
+        get_profiles,
+        save_profile,
+    )
+
+    get_settings.profile_dir = str(tmp_path / "profiles")
+    assert get_profiles(get_settings) == []
+
+    report = {"id": "20260101_abc", "path": "/generate", "allocations": [1]}
+    save_profile(get_settings, report, "MainThread;main 3\n")
+
+    assert get_profiles(get_settings) == [{"id": "20260101_abc", "path": "/generate"}]
+    assert get_profile(get_settings, "20260101_abc") == report
+    assert get_collapsed_stacks(get_settings, "20260101_abc") == "MainThread;main 3\n"
+    assert get_profile(get_settings, "20260101_def") is None
+
+    with pytest.raises(ValueError) as excinfo:
+        get_profile(get_settings, "../secrets")
+    assert "Invalid profile id" in str(excinfo.value)
+
+
+def get_scope(headers):
+    return {
+        "type": "http",
+        "method": "POST",
+        "path": "/generate",
+        "headers": headers,
+        "query_string": b"",
+    }
+
+
+def test_profiling_middleware(tmp_path, get_settings):
+    from app.profiling_utils import ProfilingMiddleware
+
+    get_settings.profile_dir = str(tmp_path)
+    get_settings.profile_interval = 0.001
+    sent = []
+
+    async def endpoint(scope, receive, send):
+        busy_loop(0.05)
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"{}"})
+
+    async def send(message):
+        sent.append(message)
+
+    middleware = ProfilingMiddleware(endpoint, get_settings)
+    asyncio.run(middleware(get_scope([(b"x-profile", b"1")]), None, send))
+
+    profile_id = dict(sent[0]["headers"])[b"x-profile-id"].decode()
+    with open(tmp_path / "{}.json".format(profile_id)) as f:
+        report = json.load(f)
+    assert report["status"] == 200
+    assert report["samples"] > 0
+    assert (tmp_path / "{}.collapsed".format(profile_id)).exists()
+    assert not tracemalloc.is_tracing()
+
+
+def test_profiling_middleware_snapshots_off_loop(mocker, tmp_path, get_settings):
+    import threading
+
+    from app.profiling_utils import ProfilingMiddleware
+
+    get_settings.profile_dir = str(tmp_path)
+    take_snapshot = tracemalloc.take_snapshot
+    threads = []
+
+    def snapshot():
+        threads.append(threading.current_thread())
+        return take_snapshot()
+
+    mocker.patch.object(tracemalloc, "take_snapshot", side_effect=snapshot)
+
+    async def endpoint(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+
+    async def send(message):
+        pass
+
+    middleware = ProfilingMiddleware(endpoint, get_settings)
+    asyncio.run(middleware(get_scope([(b"x-profile", b"1")]), None, send))
+
+    assert len(threads) == 2
+    assert threading.main_thread() not in threads
+
+
+def test_profiling_middleware_passes_through(tmp_path, get_settings):
+    from app.profiling_utils import ProfilingMiddleware
+
+    get_settings.profile_dir = str(tmp_path)
+    sent = []
+
+    async def endpoint(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+
+    async def send(message):
+        sent.append(message)
+
+    middleware = ProfilingMiddleware(endpoint, get_settings)
+    asyncio.run(middleware(get_scope([]), None, send))
+
+    assert sent[0]["headers"] == []
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,24 @@
+import contextvars
+import random
+
+
+def test_get_random_shared():
+    from app.random_utils import get_random
+
+    random.seed(5)
+    expected = random.random()
+    random.seed(5)
+
+    assert get_random().random() == expected
+
+
+def test_get_random_context():
+    from app.random_utils import get_random, random_var
+
+    def draw():
+        random_var.set(random.Random(5))
+        return get_random().random()
+
+    assert contextvars.copy_context().run(draw) == random.Random(5).random()
+    # set in a copied context only
+    assert random_var.get() is None
@@ -0,0 +1,105 @@
+import asyncio
+
+import pytest
+import sqlalchemy.types
+
+
+def test_estimate_row_width_fixed_columns(mock_table, faker, get_settings):
+    from app.sizing_utils import estimate_row_width
+
+    mock_table.columns = [
+        sqlalchemy.Column("id", sqlalchemy.types.Integer, primary_key=True),
+        sqlalchemy.Column("score", sqlalchemy.types.Float, nullable=False),
+        sqlalchemy.Column("created_at", sqlalchemy.types.Date, nullable=False),
+    ]
+    get_settings.size_sample_rows = 10
+
+    row_width = estimate_row_width(mock_table, faker, get_settings, [])
+
+    assert row_width == 48  # 28 overhead + 4 + 8 + 4, aligned to 8
+
+
+def test_estimate_row_width_measures_strings(mock_table, faker, get_settings):
+    from app.sizing_utils import estimate_row_width
+
+    mock_table.columns = [
+        sqlalchemy.Column("username", sqlalchemy.types.String, nullable=False),
+    ]
+    get_settings.size_sample_rows = 10
+
+    row_width = estimate_row_width(mock_table, faker, get_settings, ["username"])
+
+    # dummy_value_1 .. dummy_value_10 are 13-14 bytes plus the varlena header
+    assert row_width == 48
+
+
+def test_compute_row_counts_scale_factor(get_settings):
+    from app.sizing_utils import compute_row_counts
+
+    get_settings.scale_factor_rows = 1000
+
+    row_counts = compute_row_counts(
+        {"accounts": 1, "branches": 0.01}, {}, get_settings, scale_factor=50
+    )
+
+    assert row_counts == {"accounts": 50_000, "branches": 500}
+
+
+def test_compute_row_counts_target_bytes(get_settings):
+    from app.sizing_utils import compute_row_counts, estimate_table_bytes
+
+    target_bytes = 1024**3
+    row_counts = compute_row_counts(
+        {"orders": 10, "customers": 1},
+        {"orders": 64, "customers": 128},
+        get_settings,
+        target_bytes=target_bytes,
+    )
+
+    assert row_counts["orders"] == pytest.approx(10 * row_counts["customers"], 1)
+    total_bytes = estimate_table_bytes(64, row_counts["orders"]) + estimate_table_bytes(
+        128, row_counts["customers"]
+    )
+    assert total_bytes == pytest.approx(target_bytes, rel=0.01)
+
+
+def test_compute_row_counts_without_size(get_settings):
+    from app.sizing_utils import compute_row_counts
+
+    with pytest.raises(ValueError) as excinfo:
+        compute_row_counts({"orders": 1}, {"orders": 64}, get_settings)
+    assert "Either scale_factor or target_bytes is required" in str(excinfo.value)
+
+
+def test_estimate_table_bytes():
+    from app.sizing_utils import estimate_table_bytes
+
+    assert estimate_table_bytes(64, 0) == 0
+    assert estimate_table_bytes(64, 127) == 8192
+    assert estimate_table_bytes(64, 128) == 16384
+
+
+def test_get_relation_sizes_success(mock_table, mock_async_engine_success):
+    from app.sizing_utils import get_relation_sizes
+
+    mock_table.schema = None
+    conn = mock_async_engine_success.connect.return_value.__aenter__.return_value
+    conn.execute.return_value.first.return_value = (8192, 16384, 24576)
+
+    sizes = asyncio.run(get_relation_sizes(mock_table, mock_async_engine_success))
+
+    assert sizes == {
+        "table_bytes": 8192,
+        "indexes_bytes": 16384,
+        "total_bytes": 24576,
+    }
+
+
+def test_get_relation_sizes_failure(mock_table, mock_async_engine_exception):
+    from app.sizing_utils import get_relation_sizes
+
+    mock_table.schema = None
+
+    with pytest.raises(Exception) as excinfo:
+        asyncio.run(get_relation_sizes(mock_table, mock_async_engine_exception))
+    assert "Mocked error" in str(excinfo.value)
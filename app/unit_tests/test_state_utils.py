@@ -0,0 +1,30 @@
+import pytest
+
+
+def test_ensure_state_tables_success(mocker, mock_engine_success):
+    from app.state_utils import ensure_state_tables, state_metadata
+
+    create_all = mocker.patch.object(state_metadata, "create_all")
+
+    ensure_state_tables(mock_engine_success)
+
+    create_all.assert_called_once_with(mock_engine_success, checkfirst=True)
+
+
+def test_ensure_state_tables_failure(mocker, mock_engine_exception):
+    from app.state_utils import ensure_state_tables, state_metadata
+
+    mocker.patch.object(
+        state_metadata, "create_all", side_effect=Exception("Mocked error")
+    )
+
+    with pytest.raises(Exception) as excinfo:
+        ensure_state_tables(mock_engine_exception)
+    assert "Mocked error" in str(excinfo.value)
+
+
+def test_is_state_table():
+    from app.state_utils import is_state_table
+
+    assert is_state_table("_workload_runs")
+    assert not is_state_table("orders")
@@ -0,0 +1,162 @@
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def clear_corpus_cache():
+    from app import text_corpus_utils
+
+    text_corpus_utils._corpus_cache.clear()
+    yield
+    text_corpus_utils._corpus_cache.clear()
+
+
+def test_text_corpus_sample_word_counts():
+    from app.text_corpus_utils import TextCorpus
+
+    corpus = TextCorpus(["alpha", "beta", "gamma", "delta", "epsilon"])
+
+    texts = corpus.sample(1000, 2, 3)
+
+    assert len(texts) == 1000
+    for text in texts:
+        assert 2 <= len(text.split(" ")) <= 3
+        assert text in corpus.buffer
+        assert not text.startswith(" ") and not text.endswith(" ")
+
+
+def test_text_corpus_sample_max_length():
+    from app.text_corpus_utils import TextCorpus
+
+    corpus = TextCorpus(["alpha", "beta", "gamma", "delta", "epsilon"])
+
+    texts = corpus.sample(100, 2, 5, max_length=7)
+
+    assert all(len(text) <= 7 for text in texts)
+
+
+def test_text_corpus_sample_more_words_than_corpus():
+    from app.text_corpus_utils import TextCorpus
+
+    corpus = TextCorpus(["alpha", "beta"])
+
+    assert corpus.sample(1, 5, 10) == ["alpha beta"]
+
+
+def test_text_corpus_too_small():
+    from app.text_corpus_utils import TextCorpus
+
+    with pytest.raises(ValueError) as excinfo:
+        TextCorpus(["alpha"])
+    assert "Text corpus needs at least two words" in str(excinfo.value)
+
+
+def test_markov_chain():
+    import random
+
+    from app.text_corpus_utils import train_markov_chain, walk_markov_chain
+
+    chain = train_markov_chain(["The cat sat.", "The dog ran."])
+
+    assert chain[""] == ["The", "The"]
+    assert chain["The"] == ["cat", "dog"]
+
+    words = walk_markov_chain(chain, 100, random.Random(1))
+    for previous, word in zip(words, words[1:]):
+        if previous.endswith("."):
+            assert word == "The"
+        else:
+            assert word in chain[previous]
+
+
+def test_get_text_corpus_cached(faker, get_settings):
+    from app.text_corpus_utils import get_text_corpus
+
+    get_settings.text_corpus_size = 10_000
+
+    corpus = get_text_corpus(faker, get_settings)
+
+    assert len(corpus.buffer) >= 10_000
+    assert get_text_corpus(faker, get_settings) is corpus
+
+
+def test_get_text_corpus_built_once(mocker, faker, get_settings):
+    import threading
+    import time
+
+    from app import text_corpus_utils
+
+    def build(fake, settings):
+        time.sleep(0.05)
+        return text_corpus_utils.TextCorpus(["alpha", "beta"])
+
+    build_text_corpus = mocker.patch.object(
+        text_corpus_utils, "build_text_corpus", side_effect=build
+    )
+    corpora = []
+    threads = [
+        threading.Thread(
+            target=lambda: corpora.append(
+                text_corpus_utils.get_text_corpus(faker, get_settings)
+            )
+        )
+        for _ in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    build_text_corpus.assert_called_once()
+    assert all(corpus is corpora[0] for corpus in corpora)
+
+
+def test_get_text_corpus_markov(faker, get_settings):
+    from app.text_corpus_utils import get_text_corpus
+
+    get_settings.text_corpus_size = 10_000
+    get_settings.text_corpus_markov = True
+    get_settings.text_markov_sentences = 100
+
+    corpus = get_text_corpus(faker, get_settings)
+
+    assert len(corpus.buffer) >= 10_000
+    assert "." in corpus.buffer
+
+
+def test_get_text_corpus_from_file(tmp_path, faker, get_settings):
+    from app.text_corpus_utils import get_text_corpus
+
+    corpus_file = tmp_path / "corpus.txt"
+    corpus_file.write_text("select the second highest salary\nfrom employee")
+    get_settings.text_corpus_file = str(corpus_file)
+    get_settings.text_corpus_size = 1000
+
+    corpus = get_text_corpus(faker, get_settings)
+
+    assert corpus.buffer.startswith("select the second highest salary from employee ")
+    assert len(corpus.buffer) >= 1000
+
+
+def test_get_text_corpus_from_empty_file(tmp_path, faker, get_settings):
+    from app.text_corpus_utils import get_text_corpus
+
+    corpus_file = tmp_path / "corpus.txt"
+    corpus_file.write_text("")
+    get_settings.text_corpus_file = str(corpus_file)
+
+    with pytest.raises(ValueError) as excinfo:
+        get_text_corpus(faker, get_settings)
+    assert "has fewer than two words" in str(excinfo.value)
+
+
+def test_generate_texts(faker, get_settings):
+    from app.text_corpus_utils import generate_texts
+
+    get_settings.text_corpus_size = 10_000
+
+    texts = generate_texts(faker, get_settings, 50, max_length=20)
+
+    assert len(texts) == 50
+    for text in texts:
+        assert len(text) <= 20
+        assert len(text.split(" ")) <= get_settings.text_max_word_count
@@ -0,0 +1,138 @@
+import asyncio
+from unittest.mock import AsyncMock
+
+import pytest
+
+
+def get_spec(**kwargs):
+    from app.models import ThrottleSpec
+
+    return ThrottleSpec(**kwargs)
+
+
+def get_table():
+    from sqlalchemy import Column, Integer, MetaData, Table
+
+    return Table("dummy", MetaData(), Column("value", Integer))
+
+
+def get_pressure(**kwargs):
+    return {
+        "replication_lag_bytes": 0,
+        "checkpoint_ratio": 0.1,
+        "probe_ms": 1.0,
+        **kwargs,
+    }
+
+
+def test_token_bucket(mocker):
+    from app.throttle_utils import TokenBucket
+
+    clock = mocker.patch("app.throttle_utils.time.monotonic", return_value=100.0)
+    bucket = TokenBucket(1000)
+
+    # one second of burst is free, the rest is paid for in time
+    assert bucket.reserve(1000) == 0
+    assert bucket.reserve(500) == 0.5
+    clock.return_value = 101.0
+    assert bucket.reserve(500) == 0
+
+
+@pytest.mark.parametrize(
+    "pressure, reasons",
+    [
+        (get_pressure(), []),
+        (get_pressure(replication_lag_bytes=2**30), ["replication_lag"]),
+        (get_pressure(checkpoint_ratio=0.95, probe_ms=500), ["checkpoint", "latency"]),
+    ],
+)
+def test_get_pressure_reasons(get_settings, pressure, reasons):
+    from app.throttle_utils import get_pressure_reasons
+
+    assert get_pressure_reasons(pressure, get_settings) == reasons
+
+
+def test_throttle_rate_limit(mocker, mock_async_engine_success, get_settings):
+    from app.throttle_utils import Throttle
+
+    sleep = mocker.patch("app.throttle_utils.asyncio.sleep", AsyncMock())
+    throttle = Throttle(
+        get_table(),
+        get_spec(rows_per_second=100, backoff=False),
+        get_settings,
+        mock_async_engine_success,
+    )
+    rows = [{"value": i} for i in range(300)]
+
+    asyncio.run(throttle.wait(rows))
+
+    assert sleep.call_args.args[0] == pytest.approx(2, abs=0.01)
+    assert throttle.get_stats()["rate_wait_seconds"] == pytest.approx(2, abs=0.01)
+    mock_async_engine_success.connect.assert_not_called()
+
+
+def test_throttle_byte_rate_uses_disk_width(
+    mocker, mock_async_engine_success, get_settings
+):
+    from app.throttle_utils import Throttle
+
+    sleep = mocker.patch("app.throttle_utils.asyncio.sleep", AsyncMock())
+    throttle = Throttle(
+        get_table(),
+        get_spec(mb_per_second=1000 / 1024**2, backoff=False),
+        get_settings,
+        mock_async_engine_success,
+    )
+    # 28 bytes of tuple overhead plus a 4 byte integer
+    rows = [{"value": i} for i in range(100)]
+
+    asyncio.run(throttle.wait(rows))
+
+    assert sleep.call_args.args[0] == pytest.approx(2.2, abs=0.01)
+
+
+def test_throttle_backs_off_under_pressure(
+    mocker, mock_async_engine_success, get_settings
+):
+    from app.throttle_utils import Throttle
+
+    sleep = mocker.patch("app.throttle_utils.asyncio.sleep", AsyncMock())
+    get_settings.throttle_probe_interval = 0
+    throttle = Throttle(
+        get_table(), get_spec(), get_settings, mock_async_engine_success
+    )
+    probe = mocker.patch.object(
+        throttle,
+        "probe",
+        AsyncMock(
+            side_effect=[
+                get_pressure(checkpoint_ratio=0.9),
+                get_pressure(checkpoint_ratio=0.9),
+                get_pressure(),
+            ]
+        ),
+    )
+
+    for _ in range(3):
+        asyncio.run(throttle.wait([{"value": 1}]))
+
+    assert probe.call_count == 3
+    assert [call.args[0] for call in sleep.call_args_list] == [0.5, 1.0]
+    stats = throttle.get_stats()
+    assert stats["backoffs"] == 2
+    assert stats["backoff_wait_seconds"] == 1.5
+    assert throttle.backoff_seconds == 0
+
+
+def test_throttle_probe_failure(mocker, mock_async_engine_exception, get_settings):
+    from app.throttle_utils import Throttle
+
+    sleep = mocker.patch("app.throttle_utils.asyncio.sleep", AsyncMock())
+    throttle = Throttle(
+        get_table(), get_spec(), get_settings, mock_async_engine_exception
+    )
+
+    asyncio.run(throttle.wait([{"value": 1}]))
+
+    sleep.assert_not_called()
+    assert throttle.get_stats()["last_pressure"] is None
@@ -1,4 +1,5 @@
-from unittest.mock import MagicMock
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, Mock
 
 import pytest
 
@@ -20,3 +21,112 @@ def test_get_db_conn_failure(mocker, get_settings):
     with pytest.raises(Exception) as excinfo:
         get_db_engine(get_settings)
     assert "Mocked error" in str(excinfo.value)
+
+
+def test_get_async_db_engine_success(mocker, get_settings):
+    from app.utils import get_async_db_engine
+
+    create_async_engine = mocker.patch(
+        "app.utils.create_async_engine", MagicMock(return_value="mocked_engine")
+    )
+
+    engine = get_async_db_engine(get_settings, pool_size=3)
+    assert engine == "mocked_engine"
+    assert create_async_engine.call_args[0][0] == "postgresql+asyncpg://"
+    assert create_async_engine.call_args[1]["pool_size"] == 3
+    assert "async_creator" in create_async_engine.call_args[1]
+
+
+def test_get_async_db_engine_failure(mocker, get_settings):
+    from app.utils import get_async_db_engine
+
+    mocker.patch("app.utils.create_async_engine", side_effect=Exception("Mocked error"))
+
+    with pytest.raises(Exception) as excinfo:
+        get_async_db_engine(get_settings)
+    assert "Mocked error" in str(excinfo.value)
+
+
+def test_connect_with_retry_success(mocker, get_settings):
+    from app.utils import connect_with_retry
+
+    sleep = mocker.patch("app.utils.time.sleep")
+    connect = Mock(side_effect=[Exception("Mocked error"), "connection"])
+
+    assert connect_with_retry(connect, get_settings) == "connection"
+    sleep.assert_called_once_with(get_settings.db_connect_backoff)
+
+
+def test_connect_with_retry_failure(mocker, get_settings):
+    from app.utils import connect_with_retry
+
+    sleep = mocker.patch("app.utils.time.sleep")
+    get_settings.db_connect_retries = 3
+    connect = Mock(side_effect=Exception("Mocked error"))
+
+    with pytest.raises(Exception) as excinfo:
+        connect_with_retry(connect, get_settings)
+    assert "Mocked error" in str(excinfo.value)
+    assert connect.call_count == 3
+    assert sleep.call_count == 2
+
+
+def test_get_retry_delays(get_settings):
+    from app.utils import get_retry_delays
+
+    get_settings.db_connect_retries = 6
+    get_settings.db_connect_backoff = 1
+    get_settings.db_connect_max_backoff = 5
+
+    assert list(get_retry_delays(get_settings)) == [1, 2, 4, 5, 5]
+
+
+def test_connect_with_retry_async_success(mocker, get_settings):
+    from app.utils import connect_with_retry_async
+
+    sleep = mocker.patch("app.utils.asyncio.sleep", AsyncMock())
+    connect = AsyncMock(side_effect=[Exception("Mocked error"), "connection"])
+
+    result = asyncio.run(connect_with_retry_async(connect, get_settings))
+    assert result == "connection"
+    assert sleep.call_count == 1
+
+
+def test_check_db_ready(mock_async_engine_success, mock_async_engine_exception):
+    from app.utils import check_db_ready
+
+    assert asyncio.run(check_db_ready(mock_async_engine_success, 1)) is True
+    assert asyncio.run(check_db_ready(mock_async_engine_exception, 1)) is False
+
+
+def test_get_target_settings(get_settings):
+    from app.config import DbTarget
+    from app.utils import get_target_settings
+
+    target = DbTarget(name="replica", host="replica_host", port=5433, db_name="other")
+    result = get_target_settings(get_settings, target)
+
+    assert result.db_host == "replica_host"
+    assert result.db_port == 5433
+    assert result.db_name == "other"
+    assert result.db_user == get_settings.db_user
+    assert get_settings.db_host == "mocked_postgres_host"
+
+
+def test_get_target_engines(mocker, get_settings):
+    from app.config import DbTarget
+    from app.utils import get_target_engines
+
+    create_async_engine = mocker.patch("app.utils.create_async_engine")
+    default_engine = Mock()
+    get_settings.db_targets = [DbTarget(name="replica", host="replica_host")]
+
+    engines = get_target_engines(get_settings, default_engine)
+    assert list(engines) == ["default", "replica"]
+    assert engines["default"] is default_engine
+    assert create_async_engine.call_count == 1
+
+    get_settings.db_targets.append(DbTarget(name="replica", host="other_host"))
+    with pytest.raises(ValueError) as excinfo:
+        get_target_engines(get_settings, default_engine)
+    assert "Duplicate DB target name replica" in str(excinfo.value)
@@ -0,0 +1,146 @@
+import asyncio
+
+import pytest
+
+
+def get_payload(**kwargs):
+    from app.models import WorkloadPayload
+
+    params = {
+        "name": "dummy_workload",
+        "queries": [
+            {"name": "fast", "sql": "SELECT 1", "weight": 3},
+            {"name": "slow", "sql": "SELECT pg_sleep(1)", "weight": 1},
+        ],
+        "clients": 4,
+        "duration_seconds": None,
+        "transactions": 25,
+    }
+    params.update(kwargs)
+    return WorkloadPayload(**params)
+
+
+def test_percentile():
+    from app.workload_utils import percentile
+
+    values = [float(v) for v in range(1, 101)]
+
+    assert percentile(values, 50) == 50
+    assert percentile(values, 95) == 95
+    assert percentile(values, 99) == 99
+    assert percentile([7.0], 99) == 7
+    assert percentile([], 50) is None
+
+
+def test_summarize_latencies():
+    from app.workload_utils import summarize_latencies
+
+    result = summarize_latencies([1.0, 2.0, 3.0, 4.0], 1, 2)
+
+    assert result["transactions"] == 4
+    assert result["errors"] == 1
+    assert result["tps"] == 2
+    assert result["latency_avg_ms"] == 2.5
+    assert result["latency_p50_ms"] == 2
+
+
+def test_run_workload_transactions(mocker, mock_engine_success):
+    from app.workload_utils import run_workload
+
+    execute_query = mocker.patch("app.workload_utils.execute_query")
+
+    result = asyncio.run(run_workload(mock_engine_success, get_payload()))
+
+    assert execute_query.call_count == 100
+    assert result["transactions"] == 100
+    assert result["errors"] == 0
+    assert set(result["queries"]) == {"fast", "slow"}
+    assert (
+        result["queries"]["fast"]["transactions"]
+        + result["queries"]["slow"]["transactions"]
+        == 100
+    )
+
+
+def test_run_workload_errors(mocker, mock_engine_success):
+    from app.workload_utils import run_workload
+
+    mocker.patch(
+        "app.workload_utils.execute_query", side_effect=Exception("Mocked error")
+    )
+
+    result = asyncio.run(
+        run_workload(mock_engine_success, get_payload(clients=1, transactions=5))
+    )
+
+    assert result["transactions"] == 0
+    assert result["errors"] == 5
+    assert result["latency_p99_ms"] is None
+
+
+def test_run_workload_duration_and_rate(mocker, mock_engine_success):
+    from app.workload_utils import run_workload
+
+    execute_query = mocker.patch("app.workload_utils.execute_query")
+
+    payload = get_payload(
+        clients=2, transactions=None, duration_seconds=0.5, target_rate=20
+    )
+    result = asyncio.run(run_workload(mock_engine_success, payload))
+
+    assert 6 <= execute_query.call_count <= 12
+    assert result["duration_seconds"] >= 0.5
+
+
+def test_get_dataset_snapshot(mock_engine_success):
+    from app.workload_utils import get_dataset_snapshot
+
+    conn = mock_engine_success.connect.return_value.__enter__.return_value
+    conn.execute.return_value.fetchall.return_value = [
+        ("orders", 1000),
+        ("_workload_runs", 3),
+    ]
+
+    assert get_dataset_snapshot(mock_engine_success) == {"orders": 1000}
+
+
+def test_save_workload_run_success(mock_engine_success):
+    from app.workload_utils import save_workload_run
+
+    conn = mock_engine_success.begin.return_value.__enter__.return_value
+    conn.execute.return_value.scalar_one.return_value = 7
+
+    run_id = save_workload_run(
+        mock_engine_success, get_payload(), {}, {"duration_seconds": 1}
+    )
+
+    assert run_id == 7
+
+
+def test_save_workload_run_failure(mock_engine_exception):
+    from app.workload_utils import save_workload_run
+
+    mock_engine_exception.begin.side_effect = Exception("Mocked error")
+
+    with pytest.raises(Exception) as excinfo:
+        save_workload_run(
+            mock_engine_exception, get_payload(), {}, {"duration_seconds": 1}
+        )
+    assert "Mocked error" in str(excinfo.value)
+
+
+def test_workload_payload_requires_limit():
+    with pytest.raises(ValueError) as excinfo:
+        get_payload(transactions=None, duration_seconds=None)
+    assert "Either duration_seconds or transactions is required." in str(excinfo.value)
+
+
+def test_workload_payload_duplicate_queries():
+    with pytest.raises(ValueError) as excinfo:
+        get_payload(
+            queries=[
+                {"name": "q", "sql": "SELECT 1"},
+                {"name": "q", "sql": "SELECT 2"},
+            ]
+        )
+    assert "queries[].name must be unique within the request." in str(excinfo.value)